@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import asyncio
+from timebase import now_ns
+from serialengine import READER_MAX_CHUNK
+
+
+class AsyncSerial(object):
+    """coroutine reads and writes on an open pyserial port
+
+    Meant for scripts and auto-responders running on the GUI's I/O loop
+    (PortMultiplexer.submit()) or a loop of their own. The port's handle
+    is watched with loop.add_reader()/add_writer(); ports without one are
+    polled. A port also shown in a tab is read there, so open a port here
+    that no tab has open.
+
+        async def responder(port):
+            while True:
+                data, t = await port.read_chunk()
+                if data == b'PING\\r\\n':
+                    await port.write(b'PONG\\r\\n')
+
+        mux.submit(responder(AsyncSerial(serialport)))
+    """
+
+    def __init__(self, port, gap = 0.002, pollInterval = 0.002):
+        self.serialport = port
+        self._gap = gap
+        self._pollInterval = pollInterval
+        self._fd = None
+        if os.name == 'posix' and hasattr(port, 'fileno'):
+            try:
+                self._fd = port.fileno()
+            except Exception:
+                self._fd = None
+        self._rest = b''
+
+    def setInterByteGap(self, seconds):
+        self._gap = seconds
+
+    async def _wait(self, register, unregister, timeout):
+        """wait for the handle to become ready, False on timeout"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        register(self._fd, lambda: ready.done() or ready.set_result(True))
+        try:
+            return await asyncio.wait_for(ready, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            unregister(self._fd)
+
+    async def readable(self, timeout = None):
+        """wait until the port has data, False on timeout"""
+        if self.serialport.in_waiting:
+            return True
+        if self._fd is not None:
+            loop = asyncio.get_running_loop()
+            return await self._wait(loop.add_reader, loop.remove_reader, timeout)
+        end = None if timeout is None else now_ns() + int(timeout * 1e9)
+        while not self.serialport.in_waiting:
+            if end is not None and now_ns() >= end:
+                return False
+            await asyncio.sleep(self._pollInterval)
+        return True
+
+    def _readNow(self):
+        # a readable handle with nothing waiting is a port that went away;
+        # pyserial raises for it
+        return self.serialport.read(min(self.serialport.in_waiting or 1, READER_MAX_CHUNK))
+
+    async def read_chunk(self, timeout = None, gap = None):
+        """wait up to timeout(sec) for data, then read until the line has been
+        idle for gap(sec); return (data, time of the first byte), (b'', None)
+        on timeout"""
+        if self._rest:
+            data, self._rest = self._rest, b''
+            return data, now_ns()
+        if not await self.readable(timeout):
+            return b'', None
+        t = now_ns()
+        data = bytearray(self._readNow())
+        gap = self._gap if gap is None else gap
+        while len(data) < READER_MAX_CHUNK and await self.readable(gap):
+            data += self._readNow()
+        return bytes(data), t
+
+    async def read_until(self, terminator = b'\n', timeout = None):
+        """read up to and including terminator; what came after it is kept
+        for the next read, what came so far is returned on timeout"""
+        loop = asyncio.get_running_loop()
+        end = None if timeout is None else loop.time() + timeout
+        data = bytearray()
+        while True:
+            left = None if end is None else max(end - loop.time(), 0)
+            chunk, t = await self.read_chunk(left)
+            if not chunk:
+                return bytes(data)
+            data += chunk
+            i = data.find(terminator)
+            if i >= 0:
+                i += len(terminator)
+                self._rest = bytes(data[i:]) + self._rest
+                return bytes(data[:i])
+
+    async def write(self, data):
+        """write all of data without blocking the loop, return its length"""
+        data = memoryview(bytes(data))
+        total = len(data)
+        if self._fd is None:
+            self.serialport.write(data)
+            return total
+        loop = asyncio.get_running_loop()
+        while data:
+            try:
+                n = os.write(self._fd, data)
+            except BlockingIOError:
+                n = 0
+            data = data[n:]
+            if data:
+                await self._wait(loop.add_writer, loop.remove_writer, None)
+        return total
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import gzip
+import lzma
+import queue
+import shutil
+import threading
+from collections import deque
+from timebase import now_ns, to_datetime, to_seconds
+from logexport import timestamped_pieces
+
+COMPRESS_NONE            = ''
+COMPRESS_GZIP            = 'gz'
+COMPRESS_LZMA            = 'xz'
+
+# (menu text, compression)
+COMPRESSIONS = [
+    ('No Compression', COMPRESS_NONE),
+    ('gzip (.gz)', COMPRESS_GZIP),
+    ('lzma (.xz)', COMPRESS_LZMA),
+]
+
+_OPENERS = {
+    COMPRESS_GZIP: gzip.open,
+    COMPRESS_LZMA: lzma.open,
+}
+
+
+def compress_file(path, compression):
+    """compress path to path.gz / path.xz and remove the original"""
+    opener = _OPENERS.get(compression)
+    if opener is None:
+        return path
+    target = '%s.%s' % (path, compression)
+    partial = target + '.part'
+    with open(path, 'rb') as src, opener(partial, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(partial, target)
+    os.remove(path)
+    return target
+
+
+class AutoLogger(object):
+    """continuous log of sent and received chunks, one timestamped line each
+
+    log() only appends to an in-memory queue, so the GUI thread never waits
+    on the disk. A writer thread takes everything queued at once, formats it
+    and writes it with a single buffered write, at most every flushInterval
+    seconds. A segment is closed once it reaches maxBytes or is older than
+    maxSeconds (0 disables either), and handed to a second thread that
+    compresses it. If the disk falls behind by more than maxPending bytes,
+    new chunks are dropped and counted instead of queued.
+
+    close() only tells the threads to finish; they are not daemons, so the
+    last segment is still written and compressed if the program exits
+    first.
+    """
+
+    def __init__(self, directory, prefix = 'myterm', maxBytes = 16 << 20, maxSeconds = 3600,
+                 compression = COMPRESS_GZIP, hexGroup = 1, flushInterval = 0.5,
+                 maxPending = 64 << 20):
+        self._directory = directory
+        self._prefix = prefix
+        self._maxBytes = maxBytes
+        self._maxSeconds = maxSeconds
+        self._compression = compression
+        self._hexGroup = hexGroup
+        self._flushInterval = flushInterval
+        self._maxPending = maxPending
+        self._pending = deque()
+        self._pendingBytes = 0
+        self._cond = threading.Condition()
+        self._alive = True
+        self._file = None
+        self._path = None
+        self._written = 0
+        self._opened = 0
+        self.droppedBytes = 0
+        self.writtenBytes = 0
+        self.segments = 0
+        self.error = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._compressQueue = queue.Queue()
+        self._writer = threading.Thread(target = self._writeLoop, name = 'AutoLogWriter')
+        self._compressor = threading.Thread(target = self._compressLoop, name = 'AutoLogCompressor')
+        self._writer.start()
+        self._compressor.start()
+
+    def path(self):
+        """the segment being written, None between segments"""
+        return self._path
+
+    def setCompression(self, compression):
+        self._compression = compression
+
+    def setRotation(self, maxBytes, maxSeconds):
+        with self._cond:
+            self._maxBytes = maxBytes
+            self._maxSeconds = maxSeconds
+
+    def setHexGroup(self, n):
+        self._hexGroup = n
+
+    def log(self, t, direction, flags, data):
+        """queue one chunk; never blocks on I/O"""
+        with self._cond:
+            if self._pendingBytes + len(data) > self._maxPending:
+                self.droppedBytes += len(data)
+                return
+            self._pending.append((t, direction, flags, data))
+            self._pendingBytes += len(data)
+
+    def rotate(self):
+        """close the current segment now"""
+        with self._cond:
+            self._pending.append(None)
+            self._cond.notify()
+
+    def close(self):
+        """write out everything queued, close and compress the last segment,
+        in the background; never blocks"""
+        with self._cond:
+            self._alive = False
+            self._cond.notify()
+
+    def join(self, timeout = None):
+        """wait for close() to finish, return False if timeout(sec) expired"""
+        self._writer.join(timeout)
+        self._compressor.join(timeout)
+        return not self._compressor.is_alive()
+
+    def _take(self):
+        with self._cond:
+            if self._alive and not self._pending:
+                self._cond.wait(self._flushInterval)
+            batch, self._pending = self._pending, deque()
+            self._pendingBytes = 0
+            return batch, self._alive
+
+    def _writeLoop(self):
+        alive = True
+        while alive:
+            batch, alive = self._take()
+            try:
+                self._writeBatch(batch)
+                # an idle port still gets its segment closed on time
+                self._rotateIfDue(now_ns())
+                if self._file is not None:
+                    self._file.flush()
+            except (IOError, OSError) as e:
+                print("Exception on AutoLogger, {}".format(e))
+                self.error = e
+                self._closeSegment()
+        self._closeSegment()
+        self._compressQueue.put(None)
+
+    def _writeBatch(self, batch):
+        records = []
+        for record in batch:
+            if record is None:
+                self._writeRecords(records)
+                records = []
+                self._closeSegment()
+            else:
+                records.append(record)
+        self._writeRecords(records)
+
+    def _writeRecords(self, records):
+        if not records:
+            return
+        self._rotateIfDue(records[0][0])
+        start = 0
+        pieces = []
+        size = 0
+        for i, piece in enumerate(timestamped_pieces(records, self._hexGroup)):
+            piece = piece.encode('utf-8')
+            pieces.append(piece)
+            size += len(piece)
+            if self._maxBytes and self._written + size >= self._maxBytes:
+                self._writePieces(records[start][0], pieces)
+                self._closeSegment()
+                start = i + 1
+                pieces = []
+                size = 0
+        if pieces:
+            self._writePieces(records[start][0], pieces)
+
+    def _rotateIfDue(self, t):
+        if self._file is not None and self._maxSeconds and to_seconds(t - self._opened) >= self._maxSeconds:
+            self._closeSegment()
+
+    def _writePieces(self, t, pieces):
+        if self._file is None:
+            self._openSegment(t)
+        data = b''.join(pieces)
+        self._file.write(data)
+        self._written += len(data)
+        self.writtenBytes += len(data)
+
+    def _openSegment(self, t):
+        stamp = to_datetime(t).strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self._directory, '%s-%s.log' % (self._prefix, stamp))
+        n = 1
+        while any(os.path.exists(p) for p in (path, path + '.gz', path + '.xz')):
+            path = os.path.join(self._directory, '%s-%s-%d.log' % (self._prefix, stamp, n))
+            n += 1
+        self._file = open(path, 'wb', buffering = 1 << 20)
+        self._path = path
+        self._written = 0
+        self._opened = t
+        self.segments += 1
+
+    def _closeSegment(self):
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except (IOError, OSError) as e:
+            print("Exception on AutoLogger, {}".format(e))
+            self.error = e
+        self._compressQueue.put((self._path, self._compression))
+        self._file = None
+        self._path = None
+
+    def _compressLoop(self):
+        while True:
+            item = self._compressQueue.get()
+            if item is None:
+                break
+            try:
+                compress_file(*item)
+            except (IOError, OSError, lzma.LZMAError) as e:
+                print("Exception on AutoLogger, {}".format(e))
+                self.error = e
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+"""Time loading Intel HEX and S-record files into a FirmwareImage and
+streaming it out flat, on generated images of growing size.
+
+usage: python3 benchmarks/bench_firmware.py [max image size in MB]
+"""
+
+import io, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from firmware import load_ihex, load_srec
+
+
+def ihex_text(address, data, width = 16):
+    lines = []
+    base = None
+    i = 0
+    while i < len(data):
+        a = address + i
+        if a >> 16 != base:
+            base = a >> 16
+            record = bytes((2, 0, 0, 4)) + base.to_bytes(2, 'big')
+            lines.append(':' + (record + bytes((-sum(record) & 0xff,))).hex().upper())
+        chunk = data[i:i + min(width, 0x10000 - (a & 0xffff))]
+        record = bytes((len(chunk), (a >> 8) & 0xff, a & 0xff, 0)) + chunk
+        lines.append(':' + (record + bytes((-sum(record) & 0xff,))).hex().upper())
+        i += len(chunk)
+    lines.append(':00000001FF')
+    return '\n'.join(lines) + '\n'
+
+def srec_text(address, data, width = 32):
+    lines = []
+    for i in range(0, len(data), width):
+        record = bytes((len(data[i:i+width]) + 5,)) + (address + i).to_bytes(4, 'big') + data[i:i+width]
+        lines.append('S3' + (record + bytes((~sum(record) & 0xff,))).hex().upper())
+    return '\n'.join(lines) + '\n'
+
+
+FORMATS = [
+    ('Intel HEX', ihex_text, load_ihex),
+    ('S-record', srec_text, load_srec),
+]
+
+def main():
+    maxMB = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    print('%-8s%-12s%12s%14s%16s' % ('image', 'format', 'text', 'load', 'flat chunks'))
+    size = 1 << 20
+    while size <= maxMB << 20:
+        data = os.urandom(size)
+        for name, write, load in FORMATS:
+            text = write(0x08000000, data)
+            t0 = time.perf_counter()
+            image = load(io.StringIO(text))
+            t1 = time.perf_counter()
+            flat = sum(len(chunk) for chunk in image.flat_chunks(1024))
+            t2 = time.perf_counter()
+            assert image.segments() == [(0x08000000, data)] and flat == size
+            print('%-8s%-12s%9.1f MB%9.1f MB/s%11.0f MB/s' % ('%dMB' % (size >> 20), name,
+                len(text) / 1e6, len(text) / (t1 - t0) / 1e6, size / (t2 - t1) / 1e6))
+        size *= 4
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+"""Compare the hex formatters against the old per-byte '%02X ' generator.
+
+usage: python3 benchmarks/bench_hexformat.py [max size in KB]
+"""
+
+import os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dataformat import hex_string
+
+
+def legacy(data):
+    return ''.join('%02X ' % t for t in data)
+
+def table(data):
+    t = tuple('%02X ' % i for i in range(256))
+    return ''.join(map(t.__getitem__, data))
+
+def current(data):
+    return hex_string(data)
+
+def current_grouped(data):
+    return hex_string(data, group = 4)
+
+
+CANDIDATES = [
+    ('legacy %02X', legacy),
+    ('table', table),
+    ('hex_string', current),
+    ('hex_string g4', current_grouped),
+]
+
+def measure(func, data):
+    """best time of a few runs, keeping big buffers to a handful of calls"""
+    number = max(1, (1 << 20) // len(data))
+    repeat = 3 if len(data) < (4 << 20) else 1
+    return min(timeit.repeat(lambda: func(data), number = number, repeat = repeat)) / number
+
+def main():
+    maxKB = int(sys.argv[1]) if len(sys.argv) > 1 else 16 * 1024
+    assert legacy(b'\x00\x7f\xff') == current(b'\x00\x7f\xff')
+
+    print('%-10s' % 'size' + ''.join('%16s' % name for name, f in CANDIDATES))
+    size = 1024
+    while size <= maxKB * 1024:
+        data = os.urandom(size)
+        row = []
+        for name, func in CANDIDATES:
+            sec = measure(func, data)
+            row.append('%11.1f MB/s' % (size / sec / 1e6))
+        label = '%dKB' % (size // 1024) if size < (1 << 20) else '%dMB' % (size >> 20)
+        print('%-10s' % label + ''.join('%16s' % r for r in row))
+        size *= 4
+
+if __name__ == '__main__':
+    main()
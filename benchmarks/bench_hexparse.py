@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+"""Compare parse_hex() against the old strip-and-int() hex parser on HEX
+file sized inputs in the common layouts.
+
+usage: python3 benchmarks/bench_hexparse.py [max size in KB]
+"""
+
+import os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from hexparse import parse_hex
+
+
+def legacy(text):
+    """the parser before hexparse: drop spaces and newlines, then int() pairs"""
+    text = text.replace(' ', '').replace('\r', '').replace('\n', '')
+    out = bytearray()
+    for i in range(0, len(text), 2):
+        out.append(int(text[i:i+2], 16))
+    return bytes(out)
+
+def spaced(data):
+    return '\n'.join(data[i:i+16].hex(' ').upper() for i in range(0, len(data), 16))
+
+def prefixed(data):
+    return '\n'.join(', '.join('0x%02x' % b for b in data[i:i+16]) for i in range(0, len(data), 16))
+
+def colons(data):
+    return '\n'.join(data[i:i+16].hex(':') for i in range(0, len(data), 16))
+
+
+LAYOUTS = [
+    ('"AB CD"', spaced),
+    ('"0xab, 0xcd"', prefixed),
+    ('"ab:cd"', colons),
+]
+
+def measure(func, text):
+    """best time of a few runs, keeping big inputs to a handful of calls"""
+    number = max(1, (1 << 20) // len(text))
+    repeat = 3 if len(text) < (4 << 20) else 1
+    return min(timeit.repeat(lambda: func(text), number = number, repeat = repeat)) / number
+
+def main():
+    maxKB = int(sys.argv[1]) if len(sys.argv) > 1 else 4 * 1024
+    for name, layout in LAYOUTS:
+        assert parse_hex(layout(b'\x00\x7f\xff' * 7)) == b'\x00\x7f\xff' * 7
+
+    print('%-10s%-14s%16s%16s' % ('bytes', 'layout', 'legacy', 'parse_hex'))
+    size = 1024
+    while size <= maxKB * 1024:
+        data = os.urandom(size)
+        label = '%dKB' % (size // 1024) if size < (1 << 20) else '%dMB' % (size >> 20)
+        for name, layout in LAYOUTS:
+            text = layout(data)
+            row = []
+            # the old parser only ever took the spaced layout
+            row.append('%11.1f MB/s' % (len(text) / measure(legacy, text) / 1e6)
+                       if layout is spaced else '%16s' % '-')
+            row.append('%11.1f MB/s' % (len(text) / measure(parse_hex, text) / 1e6))
+            print('%-10s%-14s' % (label, name) + ''.join('%16s' % r for r in row))
+        size *= 4
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+import os
+import mmap
+import struct
+
+DIR_RX                   = 0
+DIR_TX                   = 1
+DIR_NOTE                 = 2
+
+# offset, first display line, timestamp(ns), length, direction, flags
+_INDEX = struct.Struct('<QQqIBB2x')
+
+
+class CaptureStore(object):
+    """append-only session capture on disk
+
+    Every chunk goes to <path> and gets a fixed-size entry in <path>.idx
+    with its offset, timestamp, direction and a caller-defined flags byte.
+    The entry also carries the number of the chunk's first display line,
+    so a view can find the chunk behind any line with a binary search.
+    Both files are read back through mmap, so only the pages that are
+    looked at are ever in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.indexPath = path + '.idx'
+        self._data = open(self.path, 'w+b')
+        self._index = open(self.indexPath, 'w+b')
+        self._dataMap = None
+        self._indexMap = None
+        self._mappedCount = 0
+        self._count = 0
+        self._size = 0
+        self._lines = 0
+
+    def count(self):
+        """number of chunks"""
+        return self._count
+
+    def size(self):
+        """number of data bytes"""
+        return self._size
+
+    def lineCount(self):
+        return self._lines
+
+    def append(self, data, t, direction, flags = 0, lines = 1):
+        """store data read or written at time t(ns since the epoch)"""
+        self._data.write(data)
+        self._index.write(_INDEX.pack(self._size, self._lines, t,
+                                      len(data), direction, flags))
+        self._size += len(data)
+        self._count += 1
+        self._lines += lines
+
+    def flush(self):
+        self._data.flush()
+        self._index.flush()
+
+    def reader(self):
+        """a CaptureReader over the chunks stored so far, for another thread"""
+        self.flush()
+        return CaptureReader(self.path, self._count)
+
+    def _sync(self):
+        if self._mappedCount == self._count:
+            return
+        self.flush()
+        self._unmap()
+        if self._size:
+            self._dataMap = mmap.mmap(self._data.fileno(), 0, access = mmap.ACCESS_READ)
+        self._indexMap = mmap.mmap(self._index.fileno(), 0, access = mmap.ACCESS_READ)
+        self._mappedCount = self._count
+
+    def _unmap(self):
+        if self._dataMap is not None:
+            self._dataMap.close()
+            self._dataMap = None
+        if self._indexMap is not None:
+            self._indexMap.close()
+            self._indexMap = None
+        self._mappedCount = 0
+
+    def entry(self, i):
+        """(offset, first line, timestamp(ns), length, direction, flags) of chunk i"""
+        self._sync()
+        return _INDEX.unpack_from(self._indexMap, i * _INDEX.size)
+
+    def record(self, i):
+        """(timestamp(ns), direction, flags, data) of chunk i"""
+        offset, line, t, length, direction, flags = self.entry(i)
+        data = self._dataMap[offset:offset+length] if length else b''
+        return t, direction, flags, data
+
+    def records(self, start = 0, end = None):
+        end = self._count if end is None else min(end, self._count)
+        for i in range(start, end):
+            yield self.record(i)
+
+    def findLine(self, line):
+        """index of the chunk that displays line, or -1"""
+        if line < 0 or line >= self._lines:
+            return -1
+        self._sync()
+        lo, hi = 0, self._count - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if _INDEX.unpack_from(self._indexMap, mid * _INDEX.size)[1] <= line:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def close(self, remove = False):
+        self._unmap()
+        self._data.close()
+        self._index.close()
+        if remove:
+            for path in (self.path, self.indexPath):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class CaptureReader(object):
+    """read-only view of the first count chunks of a capture, with its own
+    file handles so it can be used while the capture keeps growing"""
+
+    def __init__(self, path, count):
+        self._count = count
+        self._data = open(path, 'rb')
+        self._index = open(path + '.idx', 'rb')
+        self._dataMap = None
+        self._indexMap = None
+        if count:
+            self._indexMap = mmap.mmap(self._index.fileno(), count * _INDEX.size,
+                                       access = mmap.ACCESS_READ)
+            offset, line, t, length, direction, flags = self.entry(count - 1)
+            if offset + length:
+                self._dataMap = mmap.mmap(self._data.fileno(), offset + length,
+                                          access = mmap.ACCESS_READ)
+
+    def count(self):
+        return self._count
+
+    def entry(self, i):
+        return _INDEX.unpack_from(self._indexMap, i * _INDEX.size)
+
+    def record(self, i):
+        offset, line, t, length, direction, flags = self.entry(i)
+        data = self._dataMap[offset:offset+length] if length else b''
+        return t, direction, flags, data
+
+    def records(self, start = 0, end = None):
+        end = self._count if end is None else min(end, self._count)
+        for i in range(start, end):
+            yield self.record(i)
+
+    def close(self):
+        if self._dataMap is not None:
+            self._dataMap.close()
+        if self._indexMap is not None:
+            self._indexMap.close()
+        self._data.close()
+        self._index.close()
@@ -37,3 +37,14 @@ def get_config_path(file_name):
     ensure_root()
     return os.path.join(setting_root, file_name)
 
+def get_capture_path(file_name):
+    capture_root = os.path.join(setting_root, 'Capture')
+    if not os.path.isdir(capture_root):
+        os.makedirs(capture_root)
+    return os.path.join(capture_root, file_name)
+
+def get_log_dir():
+    log_root = os.path.join(setting_root, 'Logs')
+    if not os.path.isdir(log_root):
+        os.makedirs(log_root)
+    return log_root
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import binascii
+
+
+def _reflected_table(poly):
+    table = []
+    for n in range(256):
+        crc = n
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_MODBUS_TABLE = _reflected_table(0xa001)
+
+
+def crc16_modbus(data, crc = 0xffff):
+    """CRC-16/MODBUS of data, one table lookup per byte"""
+    table = _MODBUS_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xff]
+    return crc
+
+
+def crc16_xmodem(data, crc = 0):
+    """CRC-16/XMODEM (CCITT, polynomial 0x1021) of data"""
+    return binascii.crc_hqx(data, crc)
+
+
+def crc32(data, crc = 0):
+    """CRC-32 (ZMODEM, zlib) of data"""
+    return binascii.crc32(data, crc)
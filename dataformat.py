@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+import sys
+import codecs
+from timebase import now_ns, to_datetime
+from capturestore import DIR_RX, DIR_TX, DIR_NOTE
+from modbus import annotate as modbus_annotate
+
+VIEWMODE_ASCII           = 0
+VIEWMODE_HEX_LOWERCASE   = 1
+VIEWMODE_HEX_UPPERCASE   = 2
+
+_HEX_UPPER = tuple('%02X' % i for i in range(256))
+_HEX_LOWER = tuple('%02x' % i for i in range(256))
+
+ENCODING_ESCAPE          = 'escape'
+
+# (menu text, codec) for the ascii view
+ENCODINGS = [
+    ('UTF-8',   'utf-8'),
+    ('Latin-1', 'latin-1'),
+    ('CP932',   'cp932'),
+    ('Escape',  ENCODING_ESCAPE),
+]
+
+# control chars other than \t \n \r are shown as \xNN in the escape view
+_ESCAPE_TABLE = dict((c, '\\x%02x' % c) for c in list(range(0x20)) + [0x7f]
+                     if c not in (0x09, 0x0a, 0x0d))
+
+# flags byte kept with every captured chunk, saying how it is shown
+FLAG_VIEWMODE_MASK       = 0x03
+FLAG_ENCODING_SHIFT      = 2
+FLAG_ENCODING_MASK       = 0x1c
+FLAG_FRAMED              = 0x20
+FLAG_MODBUS              = 0x40
+FLAG_HIDDEN              = 0x80
+
+DIRECTION_PREFIX = {
+    DIR_RX: ' R<-:',
+    DIR_TX: ' Tx:',
+}
+
+# bytes.hex() takes a separator since python 3.8
+_HEX_HAS_SEP = sys.version_info >= (3, 8)
+
+
+def hex_string(data, uppercase = True, group = 1, sep = ' '):
+    """render data as hex, with sep after every group of bytes
+
+    e.g. hex_string(b'1234', group = 2) -> '3132 3334 '
+    """
+    if not data:
+        return ''
+    if _HEX_HAS_SEP and len(sep) == 1:
+        text = data.hex(sep, -group) if group > 0 else data.hex()
+        if uppercase:
+            text = text.upper()
+    else:
+        table = _HEX_UPPER if uppercase else _HEX_LOWER
+        if group > 0:
+            text = sep.join(''.join(map(table.__getitem__, data[i:i+group]))
+                            for i in range(0, len(data), group))
+        else:
+            text = ''.join(map(table.__getitem__, data))
+    return text + sep if group > 0 else text
+
+
+def format_timestamp(t = None, digits = 3):
+    """HH:MM:SS.mmm (digits=3) or HH:MM:SS.uuuuuu (digits=6) of
+    t(ns since the epoch), or of now"""
+    ts = to_datetime(now_ns() if t is None else t)
+    return ts.strftime('%H:%M:%S.%f')[:digits - 6 or None]
+
+
+def make_flags(viewMode, encoding = 'utf-8', hidden = False, framed = False, modbus = False):
+    for n, (text, codec) in enumerate(ENCODINGS):
+        if codec == encoding:
+            break
+    else:
+        n = 0
+    return viewMode | (n << FLAG_ENCODING_SHIFT) | (hidden and FLAG_HIDDEN or 0) | \
+        (framed and FLAG_FRAMED or 0) | (modbus and FLAG_MODBUS or 0)
+
+
+def strip_line_end(text):
+    """a framed chunk is a line of its own, its line break is not shown"""
+    if text.endswith('\n'):
+        text = text[:-1]
+    if text.endswith('\r'):
+        text = text[:-1]
+    return text
+
+
+def _codec(flags):
+    n = (flags & FLAG_ENCODING_MASK) >> FLAG_ENCODING_SHIFT
+    encoding = ENCODINGS[n][1] if n < len(ENCODINGS) else 'utf-8'
+    return encoding, 'ascii' if encoding == ENCODING_ESCAPE else encoding
+
+
+def record_lines(direction, flags, data):
+    """how many display lines a captured chunk takes"""
+    if direction == DIR_NOTE:
+        return data.count(b'\n') + 1
+    if flags & FLAG_HIDDEN:
+        return 0
+    if flags & FLAG_VIEWMODE_MASK == VIEWMODE_ASCII:
+        if flags & FLAG_FRAMED and data.endswith(b'\n'):
+            return data.count(b'\n')
+        return data.count(b'\n') + 1
+    return 1
+
+
+def pending_tail(flags, data):
+    """the incomplete multi-byte sequence data ends with, if any"""
+    if flags & FLAG_VIEWMODE_MASK != VIEWMODE_ASCII or not data:
+        return b''
+    decoder = codecs.getincrementaldecoder(_codec(flags)[1])(errors = 'backslashreplace')
+    decoder.decode(data[-8:])
+    return decoder.getstate()[0]
+
+
+def render_data(flags, data, hexGroup = 1, carry = b''):
+    """display text of one chunk, as the live view showed it
+
+    carry is the pending_tail() of the previous chunk; an incomplete
+    sequence at the end of data is left for the next chunk.
+    """
+    mode = flags & FLAG_VIEWMODE_MASK
+    if mode == VIEWMODE_ASCII:
+        encoding, codec = _codec(flags)
+        text = codecs.getincrementaldecoder(codec)(errors = 'backslashreplace').decode(carry + data)
+        if encoding == ENCODING_ESCAPE:
+            text = text.translate(_ESCAPE_TABLE)
+        if flags & FLAG_FRAMED:
+            text = strip_line_end(text)
+        return text
+    if flags & FLAG_MODBUS:
+        return hex_string(data, mode == VIEWMODE_HEX_UPPERCASE, hexGroup) + ' ' + modbus_annotate(data)
+    return hex_string(data, mode == VIEWMODE_HEX_UPPERCASE, hexGroup)
+
+
+def render_record(t, direction, flags, data, hexGroup = 1, carry = b'', digits = 3):
+    """display text of a captured chunk, without the leading newline"""
+    if direction == DIR_NOTE:
+        return data.decode('utf-8', 'replace')
+    return format_timestamp(t, digits) + DIRECTION_PREFIX.get(direction, ' ') + \
+        render_data(flags, data, hexGroup, carry)
+
+
+class Formatter(object):
+    """turn raw received chunks into display text"""
+
+    def __init__(self, viewMode = VIEWMODE_HEX_UPPERCASE):
+        self._viewMode = viewMode
+        self._hexGroup = 1
+        self._timestampDigits = 3
+        self._encoding = 'utf-8'
+        self._framed = False
+        self._modbus = False
+        self._decoder = None
+        self.resetDecoder()
+
+    def setViewMode(self, mode):
+        if mode != self._viewMode:
+            self.resetDecoder()
+        self._viewMode = mode
+
+    def viewMode(self):
+        return self._viewMode
+
+    def setHexGroup(self, n):
+        """bytes between separators in hex views, 0 for none"""
+        self._hexGroup = n
+
+    def hexGroup(self):
+        return self._hexGroup
+
+    def setTimestampDigits(self, digits):
+        """3 for milliseconds, 6 for microseconds"""
+        self._timestampDigits = digits
+
+    def timestampDigits(self):
+        return self._timestampDigits
+
+    def setEncoding(self, encoding):
+        """codec name for the ascii view, or ENCODING_ESCAPE"""
+        self._encoding = encoding
+        self.resetDecoder()
+
+    def encoding(self):
+        return self._encoding
+
+    def setFramed(self, framed):
+        """chunks are whole frames, each shown on a line of its own"""
+        self._framed = framed
+
+    def framed(self):
+        return self._framed
+
+    def setModbus(self, modbus):
+        """annotate hex views of frames as Modbus RTU"""
+        self._modbus = modbus
+
+    def modbus(self):
+        return self._modbus
+
+    def flags(self):
+        """flags byte to capture a chunk shown the current way"""
+        return make_flags(self._viewMode, self._encoding, framed = self._framed, modbus = self._modbus)
+
+    def resetDecoder(self):
+        """drop any partial multi-byte sequence held from the last chunk"""
+        if self._encoding == ENCODING_ESCAPE:
+            codec = 'ascii'
+        else:
+            codec = self._encoding
+        # undecodable bytes come out as \xNN instead of being dropped
+        self._decoder = codecs.getincrementaldecoder(codec)(errors = 'backslashreplace')
+
+    def flush(self):
+        """return whatever the decoder still holds, e.g. a truncated sequence"""
+        if self._viewMode != VIEWMODE_ASCII:
+            return ''
+        text = self._decoder.decode(b'', True)
+        self._decoder.reset()
+        return text
+
+    def format(self, data):
+        """return the display text of data
+
+        In the ascii view a multi-byte sequence split across chunks is
+        carried over and shown with the chunk that completes it.
+        """
+        if self._viewMode == VIEWMODE_ASCII:
+            text = self._decoder.decode(data)
+            if self._encoding == ENCODING_ESCAPE:
+                text = text.translate(_ESCAPE_TABLE)
+            if self._framed:
+                text = strip_line_end(text)
+            return text
+        text = hex_string(data, self._viewMode == VIEWMODE_HEX_UPPERCASE, self._hexGroup)
+        if self._modbus:
+            text += ' ' + modbus_annotate(data)
+        return text
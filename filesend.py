@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import threading
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QThread, pyqtSignal
+from hexparse import iter_hex
+from firmware import FIRMWARE_FLAT, FIRMWARE_SEGMENTS, FIRMWARE_RAW, \
+    load_firmware, sniff_firmware
+from metrics import format_size
+from timebase import now_ns
+
+TRANSMIT_CHUNK           = 1024
+TRANSMIT_DELAY_MS        = 0
+PROGRESS_INTERVAL        = 100 * 1000000   # ns between progress signals
+STOP_POLL_MS             = 100             # ms to wait for a cancel before forcing it
+
+
+def file_chunks(path, form, size = TRANSMIT_CHUNK, firmware = FIRMWARE_FLAT, fill = 0xff):
+    """chunks for sending the file at path in the quick send form 'HF',
+    'AF' or 'BF', yielding (data, position, total): at most size bytes of
+    data at a time and how far through the total that is
+
+    The file is opened here, so a missing one raises at once; a HEX text
+    file is checked whole before its first chunk, so a bad one sends
+    nothing. A 'BF' file in Intel HEX or S-record form is loaded as a
+    firmware image and sent as firmware says, gaps as fill when flat.
+    """
+    f = open(path, 'rb' if 'BF' == form else 'rt')
+    if 'BF' == form and firmware != FIRMWARE_RAW:
+        kind = sniff_firmware(f.read(64))
+        f.seek(0)
+        if kind is not None:
+            f.close()
+            return _firmware_chunks(path, firmware, size, fill)
+    return _chunks(f, form, size)
+
+
+def _chunks(f, form, size):
+    with f:
+        total = os.fstat(f.fileno()).st_size
+        if 'BF' == form:
+            while True:
+                data = f.read(size)
+                if not data:
+                    break
+                yield data, f.tell(), total
+        elif 'AF' == form:
+            while True:
+                text = f.read(size)
+                if not text:
+                    break
+                yield text.encode('latin-1'), f.buffer.tell(), total
+        else:
+            for data in iter_hex(f):
+                pass
+            f.seek(0)
+            pending = bytearray()
+            for data in iter_hex(f):
+                pending += data
+                while len(pending) >= size:
+                    yield bytes(pending[:size]), f.buffer.tell(), total
+                    del pending[:size]
+            if pending:
+                yield bytes(pending), f.buffer.tell(), total
+
+
+def _firmware_chunks(path, firmware, size, fill):
+    image = load_firmware(path)
+    position = 0
+    if firmware == FIRMWARE_SEGMENTS:
+        total = image.size()
+        for address, data in image.segment_chunks(size):
+            position += len(data)
+            yield data, position, total
+    else:
+        total = image.end() - image.start()
+        for data in image.flat_chunks(size, fill):
+            position += len(data)
+            yield data, position, total
+
+
+def progress_text(done, total, sent, elapsed):
+    """"1.2 MB of 4.0 MB  11.5 kB/s  5:32 left", elapsed in ns; a total of
+    0 is unknown"""
+    text = '%s of %s' % (format_size(done), format_size(total)) if total else format_size(done)
+    if elapsed > 0 and done:
+        text += '  %s' % format_size(sent * 1e9 / elapsed, 'B/s')
+        if total:
+            left = int(elapsed * (total - done) / done / 1e9) if total > done else 0
+            text += '  %d:%02d left' % (left // 60, left % 60)
+    return text
+
+
+def stop_thread(thread, port):
+    """wait for a cancelled thread writing to port
+
+    A write held up by flow control (RTS/CTS, XON/XOFF) with no write
+    timeout never sees the cancel, so one still running after a moment is
+    unblocked with the port's cancel_write().
+    """
+    while not thread.wait(STOP_POLL_MS):
+        if hasattr(port, 'cancel_write'):
+            port.cancel_write()
+
+
+class TransmitThread(QThread):
+    """write a file's chunks to a port off the GUI thread
+
+    sent carries each chunk written with its time, for the GUI to log and
+    count; progress is (position, total, bytes sent, ns spent sending).
+    """
+    sent = pyqtSignal(bytes, object)
+    progress = pyqtSignal(object, object, object, object)
+    done = pyqtSignal(bool, str)
+
+    def __init__(self, parent=None):
+        super(TransmitThread, self).__init__(parent)
+        self._port = None
+        self._chunks = None
+        self._delay = 0
+        self._cancelled = False
+        self._running = threading.Event()
+        self._running.set()
+        self._wake = threading.Event()
+
+    def start(self, port, chunks, delay = 0, priority = QThread.InheritPriority):
+        """send chunks from file_chunks() to port, waiting delay seconds
+        after each"""
+        if not self.isRunning():
+            self._port = port
+            self._chunks = chunks
+            self._delay = delay
+            self._cancelled = False
+            self._running.set()
+            self._wake.clear()
+            super(TransmitThread, self).start(priority)
+
+    def port(self):
+        return self._port if self.isRunning() else None
+
+    def setPaused(self, paused):
+        if paused:
+            self._running.clear()
+        else:
+            self._running.set()
+        self._wake.set()
+
+    def cancel(self):
+        self._cancelled = True
+        self._running.set()
+        self._wake.set()
+
+    def stop(self):
+        """cancel and wait for the thread, even if a write is held up"""
+        self.cancel()
+        stop_thread(self, self._port)
+
+    def run(self):
+        sent = 0
+        position = total = 0
+        elapsed = 0         # ns spent sending, pauses left out
+        lastProgress = 0
+        try:
+            start = now_ns()
+            for data, position, total in self._chunks:
+                if not sent:
+                    # leave out loading and checking the file
+                    start = now_ns()
+                if not self._running.is_set():
+                    elapsed += now_ns() - start
+                    self._running.wait()
+                    start = now_ns()
+                if self._cancelled:
+                    break
+                self._port.write(data)
+                t = now_ns()
+                sent += len(data)
+                self.sent.emit(data, t)
+                if t - lastProgress >= PROGRESS_INTERVAL:
+                    lastProgress = t
+                    self.progress.emit(position, total, sent, elapsed + t - start)
+                if self._delay > 0:
+                    # a cancel or pause cuts the wait short
+                    self._wake.wait(self._delay)
+                    self._wake.clear()
+            self.progress.emit(position, total, sent, elapsed + now_ns() - start)
+        except Exception as e:
+            self.done.emit(False, '' if self._cancelled else '{}'.format(e))
+        else:
+            self.done.emit(not self._cancelled, '')
+        finally:
+            self._chunks.close()
+            self._chunks = None
+
+
+class TransferThread(QThread):
+    """run a file transfer protocol on a port off the GUI thread
+
+    job(progress, cancelled) is send_files() or receive_files() bound to
+    their other arguments and returns the paths it sent or wrote.
+    fileStarted names each file as it begins, progress is as
+    TransmitThread's for that file.
+    """
+    fileStarted = pyqtSignal(str)
+    progress = pyqtSignal(object, object, object, object)
+    done = pyqtSignal(bool, str, object)
+
+    def __init__(self, parent=None):
+        super(TransferThread, self).__init__(parent)
+        self._port = None
+        self._job = None
+        self._cancelled = False
+        self._name = None
+        self._start = 0
+        self._lastProgress = 0
+
+    def start(self, port, job, priority = QThread.InheritPriority):
+        if not self.isRunning():
+            self._port = port
+            self._job = job
+            self._cancelled = False
+            self._name = None
+            super(TransferThread, self).start(priority)
+
+    def port(self):
+        return self._port if self.isRunning() else None
+
+    def cancel(self):
+        self._cancelled = True
+
+    def stop(self):
+        """cancel and wait for the thread, even if a write is held up"""
+        self.cancel()
+        stop_thread(self, self._port)
+
+    def _progress(self, name, done, total):
+        t = now_ns()
+        if name != self._name:
+            self._name = name
+            self._start = t
+            self.fileStarted.emit(name)
+        if t - self._lastProgress >= PROGRESS_INTERVAL or done == total:
+            self._lastProgress = t
+            self.progress.emit(done, total, done, t - self._start)
+
+    def run(self):
+        try:
+            paths = self._job(self._progress, lambda: self._cancelled)
+        except Exception as e:
+            self.done.emit(False, '' if self._cancelled else '{}'.format(e), [])
+        else:
+            self.done.emit(True, '', paths)
+        self._job = None
+
+
+class TransmitBar(QtWidgets.QWidget):
+    """status bar progress of a file send, with pause and cancel buttons"""
+    pauseToggled = pyqtSignal(bool)
+    cancelled = pyqtSignal()
+
+    def __init__(self, parent = None):
+        super(TransmitBar, self).__init__(parent)
+        self._title = ''
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.bar = QtWidgets.QProgressBar(self)
+        self.bar.setRange(0, 1000)
+        self.bar.setTextVisible(False)
+        self.bar.setMaximumWidth(160)
+        self.label = QtWidgets.QLabel(self)
+        self.btnPause = QtWidgets.QToolButton(self)
+        self.btnPause.setText("Pause")
+        self.btnPause.setCheckable(True)
+        self.btnCancel = QtWidgets.QToolButton(self)
+        self.btnCancel.setText("Cancel")
+        for widget in (self.label, self.bar, self.btnPause, self.btnCancel):
+            layout.addWidget(widget)
+        self.btnPause.toggled.connect(self.onPauseToggled)
+        self.btnCancel.clicked.connect(self.cancelled)
+        self.hide()
+
+    def start(self, title, pausable = True):
+        self.bar.setValue(0)
+        self.btnPause.setChecked(False)
+        self.btnPause.setVisible(pausable)
+        self.setTitle(title)
+        self.show()
+
+    def setTitle(self, title):
+        self._title = title
+        self.label.setText(title)
+
+    def setProgress(self, done, total, sent, elapsed):
+        if total:
+            self.bar.setValue(min(1000, done * 1000 // total))
+        self.label.setText('%s  %s' % (self._title, progress_text(done, total, sent, elapsed)))
+
+    def onPauseToggled(self, paused):
+        self.btnPause.setText("Resume" if paused else "Pause")
+        self.pauseToggled.emit(paused)
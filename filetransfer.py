@@ -0,0 +1,822 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+"""XMODEM, XMODEM-1K, YMODEM and ZMODEM transfers over an open port
+
+send_files() and receive_files() run a whole transfer and block until
+it ends, so they belong on a thread of their own; nothing else may read
+the port meanwhile.
+"""
+
+import os
+import re
+import time
+from crc import crc16_xmodem, crc32
+
+PROTO_XMODEM             = 'xmodem'
+PROTO_XMODEM1K           = 'xmodem1k'
+PROTO_YMODEM             = 'ymodem'
+PROTO_ZMODEM             = 'zmodem'
+
+PROTOCOLS = [
+    ('XMODEM', PROTO_XMODEM),
+    ('XMODEM-1K', PROTO_XMODEM1K),
+    ('YMODEM', PROTO_YMODEM),
+    ('ZMODEM', PROTO_ZMODEM),
+]
+
+# protocols that send several files and their names
+BATCH_PROTOCOLS = (PROTO_YMODEM, PROTO_ZMODEM)
+
+LINK_POLL                = 0.05     # s a port read waits, between cancel checks
+START_TIMEOUT            = 60.0     # s to wait for the other end to start
+BLOCK_TIMEOUT            = 10.0     # s to wait for a reply
+MAX_ERRORS               = 10
+ZMODEM_BLOCK             = 1024
+ZMODEM_WINDOW            = 32768    # bytes sent ahead of the last ZACK
+ZMODEM_ACK_EVERY         = 8192     # bytes between ZCRCQ acknowledgement requests
+
+SOH = 0x01
+STX = 0x02
+EOT = 0x04
+ACK = 0x06
+NAK = 0x15
+CAN = 0x18
+SUB = 0x1a
+CRC = ord('C')
+
+# eight CANs stop XMODEM, YMODEM and ZMODEM peers alike; the backspaces
+# erase them if the peer turns out to be a shell
+CANCEL_SEQUENCE = bytes((CAN,)) * 8 + b'\x08' * 8
+
+
+class TransferError(Exception):
+    """a transfer that failed, or that the other end cancelled"""
+
+
+class TransferCancelled(TransferError):
+    """a transfer cancelled from this end"""
+
+
+class Link(object):
+    """buffered, timed reads on a pyserial port, checking cancelled()
+    every LINK_POLL seconds while waiting
+
+    Sets the port's read timeout for its lifetime; close() puts it back.
+    """
+
+    def __init__(self, port, cancelled = None):
+        self._port = port
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+        self._timeout = port.timeout
+        port.timeout = LINK_POLL
+        self.rxBytes = 0
+        self.txBytes = 0
+
+    def close(self):
+        self._port.timeout = self._timeout
+
+    def _fill(self, wait = True):
+        """read what is waiting, or wait up to LINK_POLL for a byte"""
+        if self._cancelled is not None and self._cancelled():
+            raise TransferCancelled('cancelled')
+        waiting = self._port.in_waiting
+        if not waiting and not wait:
+            return 0
+        data = self._port.read(waiting or 1)
+        self.rxBytes += len(data)
+        self._buffer += data
+        return len(data)
+
+    def pending(self):
+        """whether a read would return at once"""
+        return bool(self._buffer) or self._port.in_waiting > 0
+
+    def getc(self, timeout):
+        """the next byte as an int, None after timeout seconds; a timeout
+        of 0 doesn't wait"""
+        if not self._buffer:
+            deadline = time.monotonic() + timeout
+            while not self._fill(timeout > 0):
+                if time.monotonic() >= deadline:
+                    return None
+        c = self._buffer[0]
+        del self._buffer[0]
+        return c
+
+    def read(self, n, timeout):
+        """n bytes, fewer if timeout seconds pass first"""
+        deadline = time.monotonic() + timeout
+        while len(self._buffer) < n:
+            if not self._fill() and time.monotonic() >= deadline:
+                break
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    def read_until(self, c, timeout):
+        """the bytes before the next c, which is consumed too; None after
+        timeout seconds"""
+        deadline = time.monotonic() + timeout
+        start = 0
+        while True:
+            i = self._buffer.find(c, start)
+            if i >= 0:
+                data = bytes(self._buffer[:i])
+                del self._buffer[:i+1]
+                return data
+            start = len(self._buffer)
+            if not self._fill() and time.monotonic() >= deadline:
+                return None
+
+    def purge(self, quiet = 1.0):
+        """drop input until the line has been quiet for quiet seconds"""
+        self._buffer.clear()
+        deadline = time.monotonic() + quiet
+        while time.monotonic() < deadline:
+            if self._fill():
+                self._buffer.clear()
+                deadline = time.monotonic() + quiet
+
+    def write(self, data):
+        self._port.write(data)
+        self.txBytes += len(data)
+
+
+# XMODEM and YMODEM
+
+def _block(seq, data, crc):
+    header = bytes((SOH if len(data) == 128 else STX, seq, 0xff - seq))
+    if crc:
+        return header + data + crc16_xmodem(data).to_bytes(2, 'big')
+    return header + data + bytes((sum(data) & 0xff,))
+
+
+def _wait_start(link, timeout = START_TIMEOUT):
+    """wait for a receiver's 'C' (True, CRC mode) or NAK (False, checksum)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        c = link.getc(deadline - time.monotonic())
+        if c == CRC:
+            return True
+        if c == NAK:
+            return False
+        if c == CAN and link.getc(1) == CAN:
+            raise TransferError('cancelled by the receiver')
+    raise TransferError('the receiver did not start')
+
+
+def _send_block(link, block):
+    for attempt in range(MAX_ERRORS):
+        link.write(block)
+        while True:
+            c = link.getc(BLOCK_TIMEOUT)
+            if c == ACK:
+                return
+            if c in (NAK, CRC, None):
+                break
+            if c == CAN and link.getc(1) == CAN:
+                raise TransferError('cancelled by the receiver')
+    raise TransferError('block %d not acknowledged' % block[1])
+
+
+def _send_blocks(link, stream, crc, blockSize, name, total, progress):
+    seq = 1
+    done = 0
+    while True:
+        data = stream.read(blockSize)
+        if not data:
+            break
+        size = 128 if len(data) <= 128 else blockSize
+        _send_block(link, _block(seq, data.ljust(size, bytes((SUB,))), crc))
+        seq = (seq + 1) & 0xff
+        done += len(data)
+        if progress is not None:
+            progress(name, done, total)
+    return done
+
+
+def _send_eot(link):
+    # YMODEM receivers NAK the first EOT
+    for attempt in range(MAX_ERRORS):
+        link.write(bytes((EOT,)))
+        c = link.getc(BLOCK_TIMEOUT)
+        if c == ACK:
+            return
+        if c == CAN and link.getc(1) == CAN:
+            raise TransferError('cancelled by the receiver')
+    raise TransferError('end of file not acknowledged')
+
+
+def _recv_start(link, crcTries = 5):
+    """ask the sender to start, in CRC mode for the first crcTries tries
+    and checksum mode after; returns (crc, first header byte)"""
+    for attempt in range(int(START_TIMEOUT // 3)):
+        useCrc = attempt < crcTries
+        link.write(bytes((CRC if useCrc else NAK,)))
+        c = link.getc(3.0)
+        if c in (SOH, STX, EOT):
+            return useCrc, c
+        if c == CAN and link.getc(1) == CAN:
+            raise TransferError('cancelled by the sender')
+    raise TransferError('the sender did not start')
+
+
+def _recv_block(link, first, crc):
+    """(seq, data) of the block whose header byte was first, None if it
+    arrived damaged"""
+    size = 128 if first == SOH else 1024
+    rest = link.read(size + (4 if crc else 3), 1.0)
+    if len(rest) < size + (4 if crc else 3) or rest[0] + rest[1] != 0xff:
+        return None
+    data = rest[2:2+size]
+    if crc:
+        if crc16_xmodem(data) != int.from_bytes(rest[2+size:], 'big'):
+            return None
+    elif sum(data) & 0xff != rest[-1]:
+        return None
+    return rest[0], data
+
+
+def _recv_blocks(link, out, crc, first, name, size, progress):
+    """receive blocks 1.. into out until EOT, keeping at most size bytes
+    if given; returns the bytes written"""
+    seq = 1
+    done = 0
+    errors = 0
+    c = first
+    while True:
+        if c == EOT:
+            link.write(bytes((ACK,)))
+            return done
+        if c in (SOH, STX):
+            block = _recv_block(link, c, crc)
+            if block is None:
+                errors += 1
+                link.purge()
+                link.write(bytes((NAK,)))
+            elif block[0] == (seq - 1) & 0xff:
+                # our ACK got lost, the sender repeats the block
+                link.write(bytes((ACK,)))
+            elif block[0] != seq:
+                raise TransferError('block %d out of sequence' % block[0])
+            else:
+                data = block[1]
+                if size is not None:
+                    data = data[:max(0, size - done)]
+                out.write(data)
+                done += len(data)
+                seq = (seq + 1) & 0xff
+                errors = 0
+                link.write(bytes((ACK,)))
+                if progress is not None:
+                    progress(name, done, size or 0)
+        elif c == CAN:
+            if link.getc(1) == CAN:
+                raise TransferError('cancelled by the sender')
+        elif c is None:
+            errors += 1
+            link.write(bytes((NAK,)))
+        if errors > MAX_ERRORS:
+            raise TransferError('too many errors')
+        c = link.getc(BLOCK_TIMEOUT)
+
+
+def _file_info(path):
+    st = os.stat(path)
+    return os.path.basename(path), st.st_size, int(st.st_mtime)
+
+
+def _free_path(directory, name):
+    """a path for name in directory that doesn't overwrite a file"""
+    name = os.path.basename(name.replace('\\', '/')) or 'received'
+    path = os.path.join(directory, name)
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, '%s.%d' % (name, n))
+        n += 1
+    return path
+
+
+def _parse_info(info):
+    """(name, size or None) of a YMODEM block 0 or ZMODEM ZFILE packet"""
+    name, _, rest = info.partition(b'\0')
+    fields = rest.split(b'\0')[0].split()
+    size = int(fields[0]) if fields and fields[0].isdigit() else None
+    return name.decode('latin-1'), size
+
+
+def xmodem_send(link, path, protocol = PROTO_XMODEM, progress = None):
+    name, size, mtime = _file_info(path)
+    crc = _wait_start(link)
+    with open(path, 'rb') as f:
+        _send_blocks(link, f, crc, 1024 if crc and protocol == PROTO_XMODEM1K else 128,
+                     name, size, progress)
+    _send_eot(link)
+    return [path]
+
+
+def xmodem_receive(link, path, progress = None):
+    """receive one file into path; it keeps the SUB padding of the last
+    block, as XMODEM has no file size"""
+    crc, first = _recv_start(link)
+    with open(path, 'wb') as f:
+        _recv_blocks(link, f, crc, first, os.path.basename(path), None, progress)
+    return [path]
+
+
+def ymodem_send(link, paths, progress = None):
+    for path in paths:
+        name, size, mtime = _file_info(path)
+        info = name.encode('latin-1', 'replace') + b'\0' + ('%d %o' % (size, mtime)).encode()
+        _wait_start(link)
+        _send_block(link, _block(0, info.ljust(128 if len(info) < 128 else 1024, b'\0'), True))
+        _wait_start(link)
+        with open(path, 'rb') as f:
+            _send_blocks(link, f, True, 1024, name, size, progress)
+        _send_eot(link)
+    # an empty block 0 ends the batch
+    _wait_start(link)
+    _send_block(link, _block(0, bytes(128), True))
+    return paths
+
+
+def ymodem_receive(link, directory, progress = None):
+    """receive a batch into directory, renaming files that would overwrite
+    one there; returns their paths"""
+    paths = []
+    always = int(START_TIMEOUT // 3)
+    while True:
+        crc, first = _recv_start(link, always)
+        if first == EOT:
+            link.write(bytes((ACK,)))
+            continue
+        block = _recv_block(link, first, crc)
+        if block is None or block[0] != 0:
+            link.purge()
+            continue
+        name, size = _parse_info(block[1])
+        link.write(bytes((ACK,)))
+        if not name:
+            return paths
+        path = _free_path(directory, name)
+        crc, first = _recv_start(link, always)
+        with open(path, 'wb') as f:
+            _recv_blocks(link, f, crc, first, name, size, progress)
+        paths.append(path)
+
+
+# ZMODEM
+
+ZPAD = 0x2a
+ZDLE = 0x18
+ZBIN = 0x41
+ZHEX = 0x42
+ZBIN32 = 0x43
+
+ZRQINIT, ZRINIT, ZSINIT, ZACK, ZFILE, ZSKIP, ZNAK, ZABORT, ZFIN, ZRPOS, \
+    ZDATA, ZEOF, ZFERR, ZCRC, ZCHALLENGE, ZCOMPL, ZCAN, ZFREECNT, ZCOMMAND = range(19)
+
+# subpacket ends: CRC next, frame ends; go on; go on, ZACK wanted; ZACK wanted
+ZCRCE = 0x68
+ZCRCG = 0x69
+ZCRCQ = 0x6a
+ZCRCW = 0x6b
+ZRUB0 = 0x6c
+ZRUB1 = 0x6d
+_FRAME_ENDS = (ZCRCE, ZCRCG, ZCRCQ, ZCRCW)
+
+# ZRINIT flags
+CANFDX = 0x01
+CANOVIO = 0x02
+CANFC32 = 0x20
+
+ZCBIN = 1
+
+_ESCAPED = bytes((0x10, 0x11, 0x13, ZDLE, 0x90, 0x91, 0x93))
+_ESCAPE = re.compile(b'[' + re.escape(_ESCAPED) + b']')
+_ESCAPES = dict((bytes((c,)), bytes((ZDLE, c ^ 0x40))) for c in _ESCAPED)
+_FLOW_CONTROL = bytes((0x11, 0x13, 0x91, 0x93))
+
+
+class _BadPacket(Exception):
+    pass
+
+
+def _zescape(data):
+    return _ESCAPE.sub(lambda m: _ESCAPES[m.group()], data)
+
+
+def _zheader(kind, arg, use32 = False):
+    """a header with a position (int) or flags (4 bytes) arg, binary with
+    CRC-32 if use32"""
+    body = bytes((kind,)) + (arg if isinstance(arg, bytes) else arg.to_bytes(4, 'little'))
+    if use32:
+        return bytes((ZPAD, ZDLE, ZBIN32)) + _zescape(body + crc32(body).to_bytes(4, 'little'))
+    return bytes((ZPAD, ZDLE, ZBIN)) + _zescape(body + crc16_xmodem(body).to_bytes(2, 'big'))
+
+
+def _zhexheader(kind, arg):
+    body = bytes((kind,)) + (arg if isinstance(arg, bytes) else arg.to_bytes(4, 'little'))
+    text = (body + crc16_xmodem(body).to_bytes(2, 'big')).hex().encode()
+    # XON so a peer stopped by flow control picks up again
+    end = b'\r\n' if kind in (ZACK, ZFIN) else b'\r\n\x11'
+    return bytes((ZPAD, ZPAD, ZDLE, ZHEX)) + text + end
+
+
+def _zsubpacket(data, end, use32):
+    if use32:
+        check = crc32(data + bytes((end,))).to_bytes(4, 'little')
+    else:
+        check = crc16_xmodem(data + bytes((end,))).to_bytes(2, 'big')
+    return _zescape(data) + bytes((ZDLE, end)) + _zescape(check)
+
+
+def _zgetc(link, timeout):
+    """the next byte of an escaped stream, ZDLE sequences undone;
+    frame ends come back as (end,)"""
+    while True:
+        c = link.getc(timeout)
+        if c is None:
+            raise _BadPacket('timed out')
+        if c in _FLOW_CONTROL:
+            continue
+        if c != ZDLE:
+            return c
+        c = link.getc(timeout)
+        if c is None:
+            raise _BadPacket('timed out')
+        if c in _FRAME_ENDS:
+            return (c,)
+        if c == ZRUB0:
+            return 0x7f
+        if c == ZRUB1:
+            return 0xff
+        if c == CAN:
+            if link.read(3, 1.0) == bytes((CAN,)) * 3:
+                raise TransferError('cancelled by the other end')
+            raise _BadPacket('bad escape')
+        if c & 0x60 == 0x40:
+            return c ^ 0x40
+        raise _BadPacket('bad escape')
+
+
+def _zread_header(link, timeout):
+    """(kind, 4 argument bytes, CRC-32 used) of the next header, None if
+    none came in timeout seconds; damaged headers are skipped"""
+    deadline = time.monotonic() + timeout
+    cans = 0
+    while True:
+        left = deadline - time.monotonic()
+        c = link.getc(max(0, left))
+        if c is None:
+            return None
+        if c == CAN:
+            cans += 1
+            if cans >= 5:
+                raise TransferError('cancelled by the other end')
+            continue
+        cans = 0
+        if c != ZPAD:
+            continue
+        while c == ZPAD:
+            c = link.getc(1.0)
+        if c != ZDLE:
+            continue
+        kind = link.getc(1.0)
+        try:
+            if kind == ZHEX:
+                text = link.read(14, 1.0)
+                body = bytes.fromhex(text.decode('latin-1'))
+                if crc16_xmodem(body[:5]) != int.from_bytes(body[5:], 'big'):
+                    continue
+                return body[0], body[1:5], False
+            if kind in (ZBIN, ZBIN32):
+                n = 9 if kind == ZBIN32 else 7
+                body = bytes(_zgetc(link, 1.0) for i in range(n))
+                if kind == ZBIN32:
+                    good = crc32(body[:5]) == int.from_bytes(body[5:], 'little')
+                else:
+                    good = crc16_xmodem(body[:5]) == int.from_bytes(body[5:], 'big')
+                if good:
+                    return body[0], body[1:5], kind == ZBIN32
+        except (_BadPacket, ValueError, TypeError):
+            pass
+
+
+def _zread_subpacket(link, use32, limit = 8192):
+    """(data, frame end) of the next data subpacket; raises _BadPacket if
+    it is damaged"""
+    data = bytearray()
+    while True:
+        run = link.read_until(ZDLE, BLOCK_TIMEOUT)
+        if run is None:
+            raise _BadPacket('timed out')
+        data += run.translate(None, _FLOW_CONTROL)
+        c = link.getc(BLOCK_TIMEOUT)
+        if c in _FRAME_ENDS:
+            end = c
+            break
+        if c == ZRUB0:
+            data.append(0x7f)
+        elif c == ZRUB1:
+            data.append(0xff)
+        elif c == CAN:
+            if link.read(3, 1.0) == bytes((CAN,)) * 3:
+                raise TransferError('cancelled by the other end')
+            raise _BadPacket('bad escape')
+        elif c is not None and c & 0x60 == 0x40:
+            data.append(c ^ 0x40)
+        else:
+            raise _BadPacket('bad escape')
+        if len(data) > limit:
+            raise _BadPacket('subpacket too long')
+    check = bytes(_zgetc(link, BLOCK_TIMEOUT) for i in range(4 if use32 else 2))
+    data.append(end)
+    if use32:
+        good = crc32(data) == int.from_bytes(check, 'little')
+    else:
+        good = crc16_xmodem(data) == int.from_bytes(check, 'big')
+    if not good:
+        raise _BadPacket('bad CRC')
+    del data[-1]
+    return bytes(data), end
+
+
+def _zposition(arg):
+    return int.from_bytes(arg, 'little')
+
+
+def _zwait(link, kinds, resend = None, timeout = BLOCK_TIMEOUT):
+    """the next header of one of kinds, writing resend again on each timeout"""
+    for attempt in range(MAX_ERRORS):
+        while True:
+            header = _zread_header(link, timeout)
+            if header is None:
+                break
+            if header[0] in kinds:
+                return header
+            if header[0] in (ZCAN, ZABORT):
+                raise TransferError('cancelled by the other end')
+        if resend is not None:
+            link.write(resend)
+    raise TransferError('no reply from the other end')
+
+
+def _zsend_file(link, path, use32, window, progress):
+    name, size, mtime = _file_info(path)
+    info = name.encode('latin-1', 'replace') + b'\0' + ('%d %o 0' % (size, mtime)).encode() + b'\0'
+    packet = _zheader(ZFILE, bytes((0, 0, 0, ZCBIN)), use32) + _zsubpacket(info, ZCRCW, use32)
+    link.write(packet)
+    errors = 0
+    with open(path, 'rb') as f:
+        while True:
+            kind, arg, _ = _zwait(link, (ZRPOS, ZSKIP, ZRINIT, ZNAK, ZCRC), packet)
+            if kind == ZSKIP:
+                return
+            if kind in (ZRINIT, ZNAK):
+                link.write(packet)
+                continue
+            if kind == ZCRC:
+                f.seek(0)
+                check = 0
+                for block in iter(lambda: f.read(1 << 16), b''):
+                    check = crc32(block, check)
+                link.write(_zhexheader(ZCRC, check))
+                continue
+            break
+        position = _zposition(arg)
+        while True:
+            # stream from position until the receiver asks for a resend
+            # with ZRPOS or confirms the whole file with ZRINIT
+            resend = _zsend_data(link, f, name, size, position, use32, window, progress)
+            if resend is None:
+                link.write(_zheader(ZEOF, size, use32))
+                kind, arg, _ = _zwait(link, (ZRPOS, ZRINIT, ZSKIP), _zheader(ZEOF, size, use32))
+                if kind != ZRPOS:
+                    return
+                resend = _zposition(arg)
+            # only resends that make no headway count against the file
+            errors = errors + 1 if resend <= position else 0
+            if errors > MAX_ERRORS:
+                raise TransferError('too many errors')
+            position = resend
+
+
+def _zsend_data(link, f, name, size, position, use32, window, progress):
+    """send the file from position in ZDATA subpackets; returns None at
+    the end, or the position a ZRPOS asked for"""
+    f.seek(position)
+    link.write(_zheader(ZDATA, position, use32))
+    acked = position
+    nextAck = position + ZMODEM_ACK_EVERY
+    data = f.read(ZMODEM_BLOCK)
+    while True:
+        ahead = f.read(ZMODEM_BLOCK)
+        position += len(data)
+        if not ahead:
+            end = ZCRCE
+        elif window is None or position - acked >= window:
+            # half duplex, or as far ahead as the receiver takes
+            end = ZCRCW
+        elif position >= nextAck:
+            end = ZCRCQ
+            nextAck = position + ZMODEM_ACK_EVERY
+        else:
+            end = ZCRCG
+        link.write(_zsubpacket(data, end, use32))
+        if progress is not None:
+            progress(name, position, size)
+        if end == ZCRCE:
+            return None
+        # take in the replies so far; a ZCRCW waits for its ZACK
+        while end == ZCRCW or link.pending():
+            header = _zread_header(link, BLOCK_TIMEOUT if end == ZCRCW else 0)
+            if header is None:
+                if end == ZCRCW:
+                    # the ZACK got lost, go again from what was acknowledged
+                    return acked
+                break
+            kind, arg, _ = header
+            if kind == ZACK:
+                acked = max(acked, _zposition(arg))
+                if end == ZCRCW and acked >= position:
+                    # ZCRCW ended the frame, a new one carries on
+                    link.write(_zheader(ZDATA, position, use32))
+                    break
+            elif kind == ZRPOS:
+                return _zposition(arg)
+            elif kind in (ZCAN, ZABORT, ZFERR):
+                raise TransferError('cancelled by the receiver')
+        data = ahead
+
+
+def zmodem_send(link, paths, progress = None):
+    link.write(b'rz\r' + _zhexheader(ZRQINIT, 0))
+    kind, arg, _ = _zwait(link, (ZRINIT,), _zhexheader(ZRQINIT, 0), START_TIMEOUT / MAX_ERRORS)
+    flags = arg[3]
+    use32 = bool(flags & CANFC32)
+    buffer = arg[0] | arg[1] << 8
+    if flags & CANFDX and flags & CANOVIO:
+        window = buffer or ZMODEM_WINDOW
+    else:
+        window = None
+    for path in paths:
+        _zsend_file(link, path, use32, window, progress)
+    link.write(_zhexheader(ZFIN, 0))
+    try:
+        _zwait(link, (ZFIN,), _zhexheader(ZFIN, 0))
+    finally:
+        link.write(b'OO')
+    return paths
+
+
+def zmodem_receive(link, directory, progress = None):
+    """receive files into directory, renaming ones that would overwrite a
+    file there; returns their paths"""
+    rinit = _zhexheader(ZRINIT, bytes((0, 0, 0, CANFDX | CANOVIO | CANFC32)))
+    link.write(rinit)
+    paths = []
+    f = None
+    name = None
+    size = None
+    position = 0
+    errors = 0
+    timeouts = 0
+    try:
+        while True:
+            header = _zread_header(link, BLOCK_TIMEOUT)
+            if header is None:
+                timeouts += 1
+                if timeouts > MAX_ERRORS:
+                    raise TransferError('the sender stopped')
+                link.write(rinit if f is None else _zhexheader(ZRPOS, position))
+                continue
+            timeouts = 0
+            kind, arg, use32 = header
+            if kind == ZRQINIT:
+                link.write(rinit)
+            elif kind == ZSINIT:
+                try:
+                    _zread_subpacket(link, use32)
+                    link.write(_zhexheader(ZACK, 0))
+                except _BadPacket:
+                    link.write(_zhexheader(ZNAK, 0))
+            elif kind == ZFILE:
+                try:
+                    info, end = _zread_subpacket(link, use32)
+                except _BadPacket:
+                    link.write(_zhexheader(ZNAK, 0))
+                    continue
+                if f is None:
+                    name, size = _parse_info(info)
+                    path = _free_path(directory, name)
+                    f = open(path, 'wb')
+                    position = 0
+                link.write(_zhexheader(ZRPOS, position))
+            elif kind == ZDATA and f is not None:
+                if _zposition(arg) != position:
+                    link.write(_zhexheader(ZRPOS, position))
+                    continue
+                try:
+                    while True:
+                        data, end = _zread_subpacket(link, use32)
+                        f.write(data)
+                        position += len(data)
+                        errors = 0
+                        if progress is not None:
+                            progress(name, position, size or 0)
+                        if end in (ZCRCQ, ZCRCW):
+                            link.write(_zhexheader(ZACK, position))
+                        if end in (ZCRCE, ZCRCW):
+                            break
+                except _BadPacket:
+                    errors += 1
+                    if errors > MAX_ERRORS:
+                        raise TransferError('too many errors')
+                    link.write(_zhexheader(ZRPOS, position))
+            elif kind == ZEOF:
+                # a ZEOF for another position trails a resend, skip it
+                if f is None:
+                    link.write(rinit)
+                elif _zposition(arg) == position:
+                    f.close()
+                    f = None
+                    paths.append(path)
+                    errors = 0
+                    link.write(rinit)
+            elif kind == ZFIN:
+                link.write(_zhexheader(ZFIN, 0))
+                # the sender's "OO", after the CR LF ending its header
+                if link.read_until(ord('O'), 1.0) is not None:
+                    link.read(1, 0.1)
+                return paths
+            elif kind in (ZCAN, ZABORT):
+                raise TransferError('cancelled by the sender')
+            elif kind == ZCOMMAND:
+                link.write(_zhexheader(ZCOMPL, 0))
+    finally:
+        if f is not None:
+            f.close()
+
+
+def send_files(port, protocol, paths, progress = None, cancelled = None):
+    """send paths over the open port; a protocol without batches sends only
+    the first; progress(name, done, total) follows each file"""
+    link = Link(port, cancelled)
+    try:
+        if protocol == PROTO_ZMODEM:
+            return zmodem_send(link, paths, progress)
+        if protocol == PROTO_YMODEM:
+            return ymodem_send(link, paths, progress)
+        return xmodem_send(link, paths[0], protocol, progress)
+    except TransferError:
+        # cancelled or failed here, don't leave the other end waiting
+        link.write(CANCEL_SEQUENCE)
+        raise
+    finally:
+        link.close()
+
+
+def receive_files(port, protocol, target, progress = None, cancelled = None):
+    """receive over the open port into target, a file for XMODEM and a
+    directory otherwise; returns the paths written"""
+    link = Link(port, cancelled)
+    try:
+        if protocol == PROTO_ZMODEM:
+            return zmodem_receive(link, target, progress)
+        if protocol == PROTO_YMODEM:
+            return ymodem_receive(link, target, progress)
+        return xmodem_receive(link, target, progress)
+    except TransferError:
+        # cancelled or failed here, don't leave the other end waiting
+        link.write(CANCEL_SEQUENCE)
+        raise
+    finally:
+        link.close()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import re
+
+# what send_chunks() does with a firmware file
+FIRMWARE_FLAT            = 'flat'
+FIRMWARE_SEGMENTS        = 'segments'
+FIRMWARE_RAW             = 'raw'
+
+FIRMWARE_MODES = [
+    ('Flat binary, gaps filled', FIRMWARE_FLAT),
+    ('Segment by segment', FIRMWARE_SEGMENTS),
+    ('Raw file, as is', FIRMWARE_RAW),
+]
+
+_IHEX_LINE = re.compile(r':[0-9A-Fa-f]{10}')
+_SREC_LINE = re.compile(r'S[0-9][0-9A-Fa-f]{6}')
+
+# S-record type -> address length
+_SREC_DATA = {'1': 2, '2': 3, '3': 4}
+_SREC_START = {'7': 4, '8': 3, '9': 2}
+
+
+class FirmwareError(ValueError):
+    """a firmware file that doesn't load; line is from 1, None when the
+    error isn't in one record"""
+
+    def __init__(self, message, line = None):
+        super(FirmwareError, self).__init__(message if line is None else '%s (line %d)' % (message, line))
+        self.line = line
+
+
+class FirmwareImage(object):
+    """a sparse memory image: sorted, non-overlapping segments of bytes,
+    adjacent ones merged
+
+    Loaders add records with add(), which only appends while they run on
+    from one another, and call coalesce() once at the end.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._data = []
+        self._sorted = True
+        self.entry = None       # start address from the file, if any
+
+    def add(self, address, data):
+        if self._data and self._starts[-1] + len(self._data[-1]) == address:
+            self._data[-1] += data
+        else:
+            if self._starts and address < self._starts[-1]:
+                self._sorted = False
+            self._starts.append(address)
+            self._data.append(bytearray(data))
+
+    def coalesce(self):
+        """sort and merge the segments; raises ValueError where two overlap"""
+        if not self._sorted:
+            order = sorted(range(len(self._starts)), key = self._starts.__getitem__)
+            self._starts = [self._starts[i] for i in order]
+            self._data = [self._data[i] for i in order]
+            self._sorted = True
+        starts, data = [], []
+        for start, block in zip(self._starts, self._data):
+            if starts:
+                end = starts[-1] + len(data[-1])
+                if start < end:
+                    raise ValueError('data overlaps at 0x%X' % start)
+                if start == end:
+                    data[-1] += block
+                    continue
+            starts.append(start)
+            data.append(block)
+        self._starts, self._data = starts, data
+
+    def segments(self):
+        """[(address, bytearray)] in address order"""
+        return list(zip(self._starts, self._data))
+
+    def start(self):
+        return self._starts[0] if self._starts else 0
+
+    def end(self):
+        """the address after the last byte"""
+        return self._starts[-1] + len(self._data[-1]) if self._starts else 0
+
+    def size(self):
+        """bytes of data, gaps left out"""
+        return sum(len(block) for block in self._data)
+
+    def flat_chunks(self, size, fill = 0xff):
+        """the image from start() to end() with gaps as fill, in pieces of
+        size bytes (the last may be shorter); gaps aren't materialized"""
+        pending = bytearray()
+        filler = bytes((fill,)) * size
+        address = self.start()
+        for start, block in zip(self._starts, self._data):
+            gap = start - address
+            while gap > 0:
+                n = min(gap, size - len(pending))
+                pending += filler[:n]
+                gap -= n
+                if len(pending) == size:
+                    yield bytes(pending)
+                    pending.clear()
+            view = memoryview(block)
+            i = 0
+            if pending:
+                i = min(len(block), size - len(pending))
+                pending += view[:i]
+                if len(pending) == size:
+                    yield bytes(pending)
+                    pending.clear()
+            while len(block) - i >= size:
+                yield bytes(view[i:i+size])
+                i += size
+            pending += view[i:]
+            address = start + len(block)
+        if pending:
+            yield bytes(pending)
+
+    def segment_chunks(self, size):
+        """(address, data) pieces of at most size bytes, none spanning two
+        segments"""
+        for start, block in zip(self._starts, self._data):
+            view = memoryview(block)
+            for i in range(0, len(block), size):
+                yield start + i, bytes(view[i:i+size])
+
+
+def load_ihex(lines):
+    """FirmwareImage of the Intel HEX lines, record checksums checked"""
+    image = FirmwareImage()
+    base = 0
+    for lineno, line in enumerate(lines, 1):
+        # fromhex() skips the line end, so lines aren't stripped
+        if line[:1] != ':':
+            if not line.strip():
+                continue
+            raise FirmwareError("record doesn't start with ':'", lineno)
+        try:
+            record = bytes.fromhex(line[1:])
+        except ValueError:
+            raise FirmwareError("record isn't hexadecimal", lineno)
+        if len(record) < 5 or record[0] != len(record) - 5:
+            raise FirmwareError('record length is wrong', lineno)
+        if sum(record) & 0xff:
+            raise FirmwareError('checksum is wrong', lineno)
+        kind = record[3]
+        if kind == 0:
+            image.add(base + (record[1] << 8 | record[2]), record[4:-1])
+        elif kind == 1:
+            break
+        elif kind == 2:
+            base = int.from_bytes(record[4:6], 'big') << 4
+        elif kind == 4:
+            base = int.from_bytes(record[4:6], 'big') << 16
+        elif kind == 3:
+            # CS:IP
+            image.entry = (int.from_bytes(record[4:6], 'big') << 4) + int.from_bytes(record[6:8], 'big')
+        elif kind == 5:
+            image.entry = int.from_bytes(record[4:8], 'big')
+        else:
+            raise FirmwareError('unknown record type %02X' % kind, lineno)
+    try:
+        image.coalesce()
+    except ValueError as e:
+        raise FirmwareError(str(e))
+    return image
+
+
+def load_srec(lines):
+    """FirmwareImage of the Motorola S-record lines, record checksums
+    checked"""
+    image = FirmwareImage()
+    for lineno, line in enumerate(lines, 1):
+        if line[:1] != 'S':
+            if not line.strip():
+                continue
+            raise FirmwareError("record doesn't start with 'S'", lineno)
+        try:
+            record = bytes.fromhex(line[2:])
+        except ValueError:
+            raise FirmwareError("record isn't hexadecimal", lineno)
+        if not record or record[0] != len(record) - 1:
+            raise FirmwareError('record length is wrong', lineno)
+        if sum(record) & 0xff != 0xff:
+            raise FirmwareError('checksum is wrong', lineno)
+        kind = line[1]
+        if kind in _SREC_DATA:
+            n = _SREC_DATA[kind] + 1
+            image.add(int.from_bytes(record[1:n], 'big'), record[n:-1])
+        elif kind in _SREC_START:
+            image.entry = int.from_bytes(record[1:_SREC_START[kind] + 1], 'big')
+        elif kind not in '0456':
+            raise FirmwareError('unknown record type S%s' % kind, lineno)
+    try:
+        image.coalesce()
+    except ValueError as e:
+        raise FirmwareError(str(e))
+    return image
+
+
+def sniff_firmware(head):
+    """'ihex', 'srec' or None, from the first bytes of a file"""
+    text = head.lstrip()[:16].decode('latin-1')
+    if _IHEX_LINE.match(text):
+        return 'ihex'
+    if _SREC_LINE.match(text):
+        return 'srec'
+    return None
+
+
+def load_firmware(path):
+    """FirmwareImage of an Intel HEX or S-record file"""
+    with open(path, 'rb') as f:
+        kind = sniff_firmware(f.read(64))
+    if kind is None:
+        raise FirmwareError('not an Intel HEX or S-record file')
+    with open(path, 'rt', encoding = 'latin-1') as f:
+        return load_ihex(f) if kind == 'ihex' else load_srec(f)
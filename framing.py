@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import codecs
+
+FRAMING_NONE             = 'none'
+FRAMING_LINE             = 'line'
+FRAMING_DELIMITER        = 'delimiter'
+FRAMING_FIXED            = 'fixed'
+FRAMING_IDLE             = 'idle'
+
+# (menu text, framing), in menu order; see register_framer()
+FRAMINGS = [
+    ('None', FRAMING_NONE),
+]
+
+MAX_FRAME                = 64 << 10
+
+
+def char_time_ns(baudrate, bytesize = 8, parity = 'N', stopbits = 1):
+    """how long one character takes on the wire, in ns"""
+    bits = 1 + int(bytesize) + (parity != 'N') + float(stopbits)
+    return int(bits * 1e9 / int(baudrate))
+
+
+def parse_delimiter(text):
+    """bytes of a delimiter typed with escapes, e.g. '\\r\\n' or '\\x03'"""
+    return codecs.escape_decode(text.encode('latin-1'))[0]
+
+
+def delimiter_text(delimiter):
+    return codecs.escape_encode(delimiter)[0].decode('latin-1')
+
+
+class Framer(object):
+    """split the received byte stream into frames
+
+    feed() takes each chunk as it is read, with the time its first byte
+    arrived, and returns the frames it completed as (frame, t), t being the
+    time of the frame's first byte. Bytes of a chunk are assumed to have
+    arrived one character time apart. Each byte is looked at once: a
+    partial frame is kept until a later chunk completes it, and its scan
+    resumes where it stopped.
+    """
+
+    def __init__(self, charTime = 0, maxFrame = MAX_FRAME):
+        self._charTime = charTime
+        self._maxFrame = maxFrame
+        self._buf = bytearray()
+        self._start = None
+        self._baudrate = 0
+        self.errors = 0
+
+    def setCharTime(self, ns):
+        self._charTime = ns
+
+    def setBaudrate(self, baudrate):
+        """the port's baud rate, 0 if unknown, for framers whose timing
+        rules depend on it"""
+        self._baudrate = baudrate
+
+    def pending(self):
+        """bytes held for an incomplete frame"""
+        return len(self._buf)
+
+    def reset(self):
+        del self._buf[:]
+        self._start = None
+
+    def feed(self, data, t):
+        raise NotImplementedError
+
+    def poll(self, now):
+        """frames completed by the line staying idle until now"""
+        return []
+
+    def deadline(self):
+        """the time poll() may complete a frame, None if it never will"""
+        return None
+
+    def idleGap(self):
+        """the shortest silence(ns) that ends a frame, None if silence doesn't"""
+        return None
+
+    def flush(self):
+        """the incomplete frame, if any, as a last frame"""
+        if not self._buf:
+            return []
+        frame = [(bytes(self._buf), self._start)]
+        self.reset()
+        return frame
+
+    def _byteTime(self, t, offset):
+        return t + offset * self._charTime
+
+    def _overlong(self, out):
+        # never hold more than maxFrame bytes waiting for an end
+        while len(self._buf) >= self._maxFrame:
+            out.append((bytes(self._buf[:self._maxFrame]), self._start))
+            del self._buf[:self._maxFrame]
+        if not self._buf:
+            self._start = None
+
+
+class PassthroughFramer(Framer):
+    """every chunk read is a frame"""
+
+    def feed(self, data, t):
+        return [(data, t)] if data else []
+
+
+class DelimiterFramer(Framer):
+    """frames end with, and include, a delimiter"""
+
+    def __init__(self, delimiter = b'\n', charTime = 0, maxFrame = MAX_FRAME):
+        super(DelimiterFramer, self).__init__(charTime, maxFrame)
+        self._delimiter = bytes(delimiter) or b'\n'
+        self._scan = 0
+
+    def reset(self):
+        super(DelimiterFramer, self).reset()
+        self._scan = 0
+
+    def feed(self, data, t):
+        out = []
+        if not data:
+            return out
+        base = len(self._buf)
+        if self._start is None:
+            self._start = t
+        self._buf += data
+        begin = 0
+        find = self._buf.find
+        n = len(self._delimiter)
+        i = find(self._delimiter, self._scan)
+        while i >= 0:
+            end = i + n
+            out.append((bytes(self._buf[begin:end]), self._start))
+            begin = end
+            self._start = self._byteTime(t, end - base)
+            i = find(self._delimiter, end)
+        if begin:
+            del self._buf[:begin]
+        if not self._buf:
+            self._start = None
+        self._overlong(out)
+        # a delimiter may straddle this chunk and the next one
+        self._scan = max(len(self._buf) - n + 1, 0)
+        return out
+
+
+class FixedFramer(Framer):
+    """frames of a fixed number of bytes"""
+
+    def __init__(self, length = 16, charTime = 0):
+        super(FixedFramer, self).__init__(charTime, max(int(length), 1))
+        self._length = max(int(length), 1)
+
+    def feed(self, data, t):
+        out = []
+        if not data:
+            return out
+        base = len(self._buf)
+        if self._start is None:
+            self._start = t
+        self._buf += data
+        length = self._length
+        begin = 0
+        while len(self._buf) - begin >= length:
+            end = begin + length
+            out.append((bytes(self._buf[begin:end]), self._start))
+            self._start = self._byteTime(t, end - base)
+            begin = end
+        if begin:
+            del self._buf[:begin]
+        if not self._buf:
+            self._start = None
+        return out
+
+
+class IdleFramer(Framer):
+    """a frame ends when the line stays idle for gapChars character times,
+    as with Modbus RTU's 3.5
+
+    minGap(ns) keeps the gap above what the OS and USB adapters can resolve.
+    """
+
+    def __init__(self, gapChars = 3.5, charTime = 0, minGap = 1000000, maxFrame = MAX_FRAME):
+        super(IdleFramer, self).__init__(charTime, maxFrame)
+        self._gapChars = gapChars
+        self._minGap = minGap
+        self._last = None
+
+    def reset(self):
+        super(IdleFramer, self).reset()
+        self._last = None
+
+    def feed(self, data, t):
+        out = self.poll(t)
+        if not data:
+            return out
+        if self._start is None:
+            self._start = t
+        self._buf += data
+        self._last = self._byteTime(t, len(data))
+        self._overlong(out)
+        return out
+
+    def poll(self, now):
+        if self._buf and now - self._last >= self.idleGap():
+            return self.flush()
+        return []
+
+    def deadline(self):
+        if not self._buf:
+            return None
+        return self._last + self.idleGap()
+
+    def idleGap(self):
+        return max(int(self._gapChars * self._charTime), self._minGap)
+
+
+# framing -> (factory(charTime, **options), default options)
+_FACTORIES = {}
+
+
+def register_framer(text, framing, factory, options = None):
+    """add a framing to the FRAMINGS menu
+
+    factory(charTime, **options) returns a new Framer; options maps each
+    option a user can set to its default value. A framing with options is
+    listed as 'text...' so the menu asks for them.
+    """
+    if framing not in _FACTORIES:
+        FRAMINGS.append((text + ('...' if options else ''), framing))
+    _FACTORIES[framing] = (factory, dict(options or {}))
+
+
+def framer_options(framing):
+    """the default options of a registered framing"""
+    return dict(_FACTORIES.get(framing, (None, {}))[1])
+
+
+def create_framer(framing, charTime = 0, baudrate = 0, **options):
+    """a new framer for one of the FRAMINGS, passthrough if unknown"""
+    if framing not in _FACTORIES:
+        framer = PassthroughFramer(charTime)
+    else:
+        factory, defaults = _FACTORIES[framing]
+        kwargs = dict(defaults)
+        kwargs.update((k, v) for k, v in options.items() if k in defaults)
+        framer = factory(charTime, **kwargs)
+    framer.setBaudrate(baudrate)
+    return framer
+
+
+def format_options(options):
+    """'name=value ...' text of an options dict"""
+    return ' '.join('%s=%s' % (k, delimiter_text(v) if isinstance(v, bytes) else v)
+                    for k, v in options.items())
+
+
+def parse_options(text, defaults):
+    """options from 'name=value ...' text, each converted to the type of its
+    default; raises ValueError on unknown names or bad values"""
+    options = dict(defaults)
+    for item in text.split():
+        name, sep, value = item.partition('=')
+        if not sep or name not in defaults:
+            raise ValueError("unknown option '%s'" % name)
+        default = defaults[name]
+        if isinstance(default, bool):
+            options[name] = value.lower() in ('1', 'on', 'yes', 'true')
+        elif isinstance(default, int):
+            options[name] = int(value, 0)
+        elif isinstance(default, float):
+            options[name] = float(value)
+        elif isinstance(default, bytes):
+            options[name] = parse_delimiter(value)
+        else:
+            options[name] = value
+    return options
+
+
+register_framer('Lines (LF)', FRAMING_LINE,
+                lambda charTime: DelimiterFramer(b'\n', charTime))
+register_framer('Custom Delimiter', FRAMING_DELIMITER,
+                lambda charTime, delimiter: DelimiterFramer(delimiter, charTime),
+                dict(delimiter = b'\r\n'))
+register_framer('Fixed Length', FRAMING_FIXED,
+                lambda charTime, length: FixedFramer(length, charTime),
+                dict(length = 16))
+register_framer('Idle Gap', FRAMING_IDLE,
+                lambda charTime, gapChars: IdleFramer(gapChars, charTime),
+                dict(gapChars = 3.5))
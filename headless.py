@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+"""capture a serial port without the GUI
+
+    python headless.py -p /dev/ttyUSB0 -b 115200 -o rx.log
+    python myterm.py --headless -p COM3 --framing modbus -t 60
+
+Port, view and framing settings default to the ones the GUI saved, so a
+capture set up interactively can be repeated unattended.  Nothing here
+imports Qt.
+"""
+
+import sys
+import argparse
+import threading
+import appInfo
+from configpath import get_config_path
+from portconfig import PortConfig, DATABITS, PARITIES, STOPBITS, load_settings
+from serialengine import SerialReader, READMODE_POLLING, READMODE_EVENT
+from ringbuffer import RingBuffer, OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_SPILL
+from framing import FRAMINGS, FRAMING_NONE, char_time_ns, create_framer, framer_options, parse_options
+import packetframing  # registers the binary packet framers
+from modbus import FRAMING_MODBUS
+from capturestore import DIR_RX, DIR_TX
+from dataformat import VIEWMODE_ASCII, VIEWMODE_HEX_LOWERCASE, VIEWMODE_HEX_UPPERCASE, \
+    make_flags, render_record, pending_tail
+from logexport import timestamped_pieces
+from timebase import now_ns
+
+VIEWS = {
+    'ascii': VIEWMODE_ASCII,
+    'hex': VIEWMODE_HEX_LOWERCASE,
+    'HEX': VIEWMODE_HEX_UPPERCASE,
+}
+
+OVERFLOWS = {
+    'block': OVERFLOW_BLOCK,
+    'drop': OVERFLOW_DROP_OLDEST,
+    'spill': OVERFLOW_SPILL,
+}
+
+FORMAT_TEXT              = 'text'
+FORMAT_TSV               = 'tsv'
+FORMAT_RAW               = 'raw'
+
+
+def saved_view(text):
+    """view name for the GUI's saved receive view"""
+    if 'Ascii' in text:
+        return 'ascii'
+    if 'lowercase' in text:
+        return 'hex'
+    return 'HEX'
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog = 'myterm --headless',
+        description = 'Capture a serial port without the GUI. '
+                      'Unset options take the settings saved by %s.' % appInfo.title)
+    port = parser.add_argument_group('port')
+    port.add_argument('-p', '--port', help = 'device or URL, e.g. socket://host:port')
+    port.add_argument('-b', '--baudrate')
+    port.add_argument('--databits', choices = sorted(DATABITS))
+    port.add_argument('--parity', choices = sorted(PARITIES))
+    port.add_argument('--stopbits', choices = sorted(STOPBITS))
+    port.add_argument('--rtscts', action = 'store_const', const = True)
+    port.add_argument('--xonxoff', action = 'store_const', const = True)
+    port.add_argument('--gap', type = int, metavar = 'MS',
+                      help = 'inter-byte gap that ends a read')
+    port.add_argument('--polling', action = 'store_true',
+                      help = 'poll the port instead of waiting on it')
+    view = parser.add_argument_group('output')
+    view.add_argument('-o', '--output', metavar = 'FILE', help = 'write here instead of stdout')
+    view.add_argument('-a', '--append', action = 'store_true')
+    view.add_argument('-f', '--format', choices = [FORMAT_TEXT, FORMAT_TSV, FORMAT_RAW],
+                      default = FORMAT_TEXT,
+                      help = 'text as in the output pane, tab separated, or received bytes only')
+    view.add_argument('--view', choices = sorted(VIEWS))
+    view.add_argument('--encoding')
+    view.add_argument('--hex-group', type = int, metavar = 'N')
+    view.add_argument('--us', action = 'store_const', const = True,
+                      help = 'timestamps in microseconds')
+    view.add_argument('--framing')
+    view.add_argument('--frame-options', metavar = 'OPTIONS', help = 'e.g. "width=2 order=big"')
+    view.add_argument('--overflow', choices = sorted(OVERFLOWS), default = 'spill')
+    view.add_argument('--log-dir', metavar = 'DIR', help = 'also keep a rotating auto log here')
+    run = parser.add_argument_group('run')
+    run.add_argument('-t', '--duration', type = float, metavar = 'SECONDS')
+    run.add_argument('--send', metavar = 'HEX', help = 'transmit these bytes once opened')
+    run.add_argument('--stdin', action = 'store_true', help = 'transmit whatever arrives on stdin')
+    run.add_argument('--settings', metavar = 'FILE', help = 'settings file to take defaults from')
+    return parser
+
+
+class HeadlessCapture(object):
+    """read a port on a thread of its own and stream what arrives"""
+
+    def __init__(self, serialport, framer, out, fmt, flags, hexGroup = 1, digits = 3,
+                 overflow = OVERFLOW_SPILL, autoLog = None):
+        self.serialport = serialport
+        self._out = out
+        self._format = fmt
+        self._flags = flags
+        self._hexGroup = hexGroup
+        self._digits = digits
+        self._autoLog = autoLog
+        self._carry = b''
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self.error = None
+        self.buffer = RingBuffer(policy = overflow)
+        self.buffer.setReadableCallback(self._ready.set)
+        self.reader = SerialReader(serialport, self.buffer)
+        self.reader.setFramer(framer)
+        self._thread = threading.Thread(target = self._read, name = 'reader', daemon = True)
+
+    def _read(self):
+        try:
+            self.reader.run()
+        except Exception as e:
+            if self.reader.isAlive():
+                self.error = e
+        finally:
+            self._ready.set()
+
+    def start(self):
+        self.reader.start()
+        self._thread.start()
+
+    def stop(self):
+        self.reader.stop()
+        self._thread.join()
+        self.drain()
+
+    def isAlive(self):
+        return self._thread.is_alive()
+
+    def wait(self, timeout):
+        """wait for data; False once the reader has stopped"""
+        self._ready.wait(timeout)
+        self._ready.clear()
+        return self._thread.is_alive()
+
+    def drain(self):
+        """record everything queued; get() hands out about 1 MB at a time"""
+        while True:
+            chunks = self.buffer.get()
+            if not chunks:
+                break
+            for data, t in chunks:
+                self.record(t, DIR_RX, self._flags, data)
+        self._out.flush()
+
+    def transmit(self, data, flags):
+        """write data to the port and record it as sent"""
+        self.serialport.write(data)
+        self.record(now_ns(), DIR_TX, flags, data)
+        self._out.flush()
+
+    def record(self, t, direction, flags, data):
+        with self._lock:
+            if self._autoLog is not None:
+                self._autoLog.log(t, direction, flags, data)
+            if self._format == FORMAT_RAW:
+                if direction == DIR_RX:
+                    self._out.write(data)
+            elif self._format == FORMAT_TSV:
+                for piece in timestamped_pieces([(t, direction, flags, data)], self._hexGroup):
+                    self._out.write(piece)
+            else:
+                carry = self._carry if direction == DIR_RX else b''
+                text = render_record(t, direction, flags, data, self._hexGroup, carry, self._digits)
+                if direction == DIR_RX:
+                    self._carry = pending_tail(flags, data)
+                if text:
+                    self._out.write(text.replace('\r', '') + '\n')
+
+
+def forward_stdin(capture):
+    """transmit stdin a line at a time until it ends"""
+    flags = make_flags(VIEWMODE_ASCII, 'latin-1')
+    stdin = sys.stdin.buffer
+    while capture.isAlive():
+        line = stdin.readline()
+        if not line:
+            break
+        try:
+            capture.transmit(line, flags)
+        except Exception as e:
+            print("Exception on forward_stdin, {}".format(e), file = sys.stderr)
+            break
+
+
+def main(argv = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    tree = load_settings(args.settings or get_config_path(appInfo.title + '.xml'))
+    config = PortConfig.fromSettings(tree)
+    for name in ('port', 'baudrate', 'databits', 'parity', 'stopbits', 'rtscts', 'xonxoff'):
+        if getattr(args, name) is not None:
+            setattr(config, name, getattr(args, name))
+    if args.gap is not None:
+        config.interbytegap = args.gap
+    if not config.port:
+        parser.error('no port given and none saved')
+
+    if tree is not None:
+        saved = lambda key, default: tree.findtext('GUISettings/' + key, default = default)
+    else:
+        saved = lambda key, default: default
+    viewMode = VIEWS[args.view or saved_view(saved('View/ReceiveView', 'HEX(UPPERCASE)'))]
+    encoding = args.encoding or saved('View/Encoding', 'utf-8')
+    hexGroup = args.hex_group
+    if hexGroup is None:
+        text = saved('View/HexGroup', '1')
+        hexGroup = int(text) if text.isdigit() else 1
+    digits = 6 if (args.us or 'on' == saved('View/Microseconds', 'off')) else 3
+    framing = args.framing or saved('Receive/Framing', FRAMING_NONE)
+    if framing not in [name for text, name in FRAMINGS]:
+        parser.error('unknown framing %s, choose from %s' % (
+            framing, ', '.join(name for text, name in FRAMINGS)))
+
+    try:
+        defaults = framer_options(framing)
+        if args.frame_options is not None:
+            options = parse_options(args.frame_options, defaults)
+        else:
+            options = parse_options(saved('Receive/FrameOptions/' + framing, ''), defaults)
+        charTime = char_time_ns(int(config.baudrate), DATABITS[config.databits],
+                                PARITIES[config.parity], STOPBITS[config.stopbits])
+        framer = create_framer(framing, charTime, int(config.baudrate), **options)
+    except (KeyError, ValueError, ZeroDivisionError) as e:
+        parser.error('framing %s: %s' % (framing, e))
+
+    send = None
+    if args.send:
+        try:
+            send = bytes.fromhex(args.send)
+        except ValueError as e:
+            parser.error('--send: %s' % e)
+
+    try:
+        serialport = config.create()
+        serialport.open()
+    except Exception as e:
+        print("Could not open serial port, {}".format(e), file = sys.stderr)
+        return 1
+
+    if args.output:
+        binary = args.format == FORMAT_RAW
+        out = open(args.output, ('a' if args.append else 'w') + ('b' if binary else ''),
+                   **({} if binary else {'encoding': 'utf-8', 'newline': '\n'}))
+    else:
+        out = sys.stdout.buffer if args.format == FORMAT_RAW else sys.stdout
+
+    autoLog = None
+    if args.log_dir:
+        from autolog import AutoLogger
+        autoLog = AutoLogger(args.log_dir, prefix = appInfo.title.lower(), hexGroup = hexGroup)
+
+    flags = make_flags(viewMode, encoding, framed = framing != FRAMING_NONE,
+                       modbus = framing == FRAMING_MODBUS)
+    capture = HeadlessCapture(serialport, framer, out, args.format, flags, hexGroup, digits,
+                              OVERFLOWS[args.overflow], autoLog)
+    capture.reader.setReadMode(READMODE_POLLING if args.polling else READMODE_EVENT)
+    capture.reader.setInterByteGap(config.interbytegap / 1000.0)
+    print("Capturing %s" % config, file = sys.stderr)
+
+    status = 0
+    capture.start()
+    try:
+        if send:
+            capture.transmit(send, make_flags(VIEWMODE_HEX_UPPERCASE,
+                                              modbus = framing == FRAMING_MODBUS))
+        if args.stdin:
+            threading.Thread(target = forward_stdin, args = (capture,), daemon = True).start()
+        end = None if args.duration is None else now_ns() + int(args.duration * 1e9)
+        while True:
+            timeout = 0.5 if end is None else min(0.5, max(end - now_ns(), 0) / 1e9)
+            alive = capture.wait(timeout)
+            capture.drain()
+            if not alive or (end is not None and now_ns() >= end):
+                break
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print("Exception on main, {}".format(e), file = sys.stderr)
+        status = 1
+    finally:
+        capture.stop()
+        serialport.close()
+        if autoLog is not None:
+            autoLog.close()
+            autoLog.join()
+        if args.output:
+            out.close()
+    if capture.error is not None:
+        print("Exception on reader, {}".format(capture.error), file = sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import re
+
+# characters that may separate bytes, besides whitespace
+SEPARATORS = ',:;-'
+
+_TO_SPACE = str.maketrans(SEPARATORS + '\t\n\r\v\f', ' ' * (len(SEPARATORS) + 5))
+_TOKEN = re.compile(r'[^\s%s]+' % re.escape(SEPARATORS))
+_NOT_HEX = re.compile(r'[^0-9A-Fa-f]')
+_BREAKS = SEPARATORS + ' \t\n\r\v\f'
+
+
+class HexParseError(ValueError):
+    """hex text that doesn't parse; line and column (from 1) locate the
+    first bad token"""
+
+    def __init__(self, message, token, line, column):
+        super(HexParseError, self).__init__('%s (line %d, column %d)' % (message, line, column))
+        self.reason = message
+        self.token = token
+        self.line = line
+        self.column = column
+
+
+def _location(text, pos):
+    line = text.count('\n', 0, pos) + 1
+    return line, pos - (text.rfind('\n', 0, pos) + 1) + 1
+
+
+def parse_hex(text):
+    """bytes of hex text such as "31 32 FF", "0x31,0x32", "31:32:ff" or
+    "3132FF"
+
+    Bytes are separated by any whitespace or one of SEPARATORS, each
+    optionally prefixed by 0x; a token may hold several bytes, and a lone
+    digit is a byte of its own. Raises HexParseError naming the first bad
+    token.
+    """
+    # fast path: bytes.fromhex() already takes whitespace between pairs
+    try:
+        return bytes.fromhex(text)
+    except ValueError:
+        pass
+    # separators become spaces and 0x prefixes are blanked out, provided
+    # each one starts a token and has digits after it; plain str methods
+    # here run several times faster than a regular expression
+    cleaned = ' ' + text.translate(_TO_SPACE) + ' '
+    prefixes = cleaned.count('0x') + cleaned.count('0X')
+    if prefixes:
+        if prefixes != cleaned.count(' 0x') + cleaned.count(' 0X') or \
+                ' 0x ' in cleaned or ' 0X ' in cleaned:
+            return _parse_tokens(text)
+        cleaned = cleaned.replace('0x', '  ').replace('0X', '  ')
+    try:
+        return bytes.fromhex(cleaned)
+    except ValueError:
+        return _parse_tokens(text)
+
+
+def _parse_tokens(text):
+    """parse_hex() a token at a time, for lone digits and error locations"""
+    out = bytearray()
+    for match in _TOKEN.finditer(text):
+        token, start = match.group(), match.start()
+        digits = token
+        if digits[:2] in ('0x', '0X'):
+            digits = digits[2:]
+            start += 2
+            if not digits:
+                raise HexParseError("'%s' has no digits" % token, token, *_location(text, match.start()))
+        bad = _NOT_HEX.search(digits)
+        if bad is not None:
+            raise HexParseError("'%s' is not hexadecimal" % token, token,
+                                *_location(text, start + bad.start()))
+        if len(digits) == 1:
+            out.append(int(digits, 16))
+        elif len(digits) % 2:
+            raise HexParseError("'%s' has an odd number of digits" % token, token,
+                                *_location(text, match.start()))
+        else:
+            out += bytes.fromhex(digits)
+    return bytes(out)
+
+
+def iter_hex(f, size = 1 << 16):
+    """parse_hex() a text file a block of about size characters at a time,
+    yielding the bytes of each; errors give the line and column in the
+    whole file
+
+    Blocks end between tokens, so memory is bounded by size and the
+    longest token rather than the file.
+    """
+    line, column = 1, 1     # where pending starts
+    pending = ''
+    while True:
+        text = f.read(size)
+        pending += text
+        if text:
+            # hold back the last, maybe partial, token; what was pending
+            # before has no breaks, so only the new text is searched
+            brk = max(text.rfind(c) for c in _BREAKS)
+            if brk < 0:
+                continue
+            brk += len(pending) - len(text) + 1
+            block, pending = pending[:brk], pending[brk:]
+        else:
+            block, pending = pending, ''
+        try:
+            data = parse_hex(block)
+        except HexParseError as e:
+            raise HexParseError(e.reason, e.token, line + e.line - 1,
+                                e.column + (column - 1 if e.line == 1 else 0))
+        newlines = block.count('\n')
+        if newlines:
+            line += newlines
+            column = len(block) - block.rfind('\n')
+        else:
+            column += len(block)
+        if data:
+            yield data
+        if not text:
+            break
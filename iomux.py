@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+import serial
+from timebase import now_ns, reanchor
+from framing import PassthroughFramer
+from serialengine import READMODE_POLLING, READMODE_EVENT, READER_MAX_CHUNK
+
+POLL_INTERVAL            = 0.05      # polling read mode, like SerialReader
+NOFD_POLL_INTERVAL       = 0.002     # ports without a selectable handle
+NOFD_IDLE_INTERVAL       = 0.03      # ... once they have been quiet a while
+NOFD_IDLE_POLLS          = 50        # empty polls before slowing down
+BACKLOG_RETRY            = 0.01      # a blocking buffer that was full
+
+
+class PortChannel(object):
+    """one port served by a PortMultiplexer
+
+    Set up like a SerialReader: chunks read from the port are stamped with
+    the time of their first byte, ended by an idle gap, cut into frames by
+    the framer and queued in the buffer. onError(e) is called from the I/O
+    thread when the port fails; the channel has been removed by then.
+    """
+
+    def __init__(self, port = None, buffer = None, onError = None):
+        self._serialport = port
+        self._buffer = buffer
+        self._onError = onError
+        self._readMode = READMODE_EVENT
+        self._interByteGap = 0.002
+        self._framer = PassthroughFramer()
+        # state below belongs to the I/O thread
+        self._active = None
+        self._fd = None
+        self._pending = bytearray()
+        self._first = None
+        self._last = None
+        self._backlog = deque()
+        self._watched = False
+        self._timer = None
+        self._idlePolls = 0
+
+    def setPort(self, port):
+        self._serialport = port
+
+    def port(self):
+        return self._serialport
+
+    def setBuffer(self, buffer):
+        self._buffer = buffer
+
+    def setErrorCallback(self, onError):
+        self._onError = onError
+
+    def setReadMode(self, mode):
+        self._readMode = mode
+
+    def readMode(self):
+        return self._readMode
+
+    def setInterByteGap(self, seconds):
+        self._interByteGap = seconds
+
+    def setFramer(self, framer):
+        """swapped in by the I/O thread, which queues whatever the old
+        framer still holds first"""
+        self._framer = framer
+
+    def framer(self):
+        return self._framer
+
+    def _handle(self):
+        """fd to select on, None where the port must be polled"""
+        if os.name != 'posix' or not hasattr(self._serialport, 'fileno'):
+            return None
+        try:
+            return self._serialport.fileno()
+        except Exception:
+            return None
+
+    def _gap(self):
+        """ns of silence that ends a chunk"""
+        gap = int(self._interByteGap * 1e9)
+        if self._active.idleGap() is not None:
+            gap = min(gap, self._active.idleGap())
+        return gap
+
+    def _read(self, now):
+        """take what the port has, False if it had nothing"""
+        waiting = self._serialport.in_waiting
+        if not waiting and self._fd is None:
+            return False
+        if waiting:
+            data = self._serialport.read(min(waiting, READER_MAX_CHUNK))
+        elif isinstance(self._serialport, serial.Serial):
+            # a serial device readable with nothing waiting went away;
+            # pyserial raises for it
+            data = self._serialport.read(1)
+        else:
+            data = self._probe()
+        if not data:
+            return False
+        if self._first is None:
+            self._first = now
+        self._pending += data
+        self._last = now
+        return True
+
+    def _probe(self):
+        """read a URL port woken with nothing waiting, without blocking
+
+        A socket also wakes for a closed connection, which the read
+        raises for, or an ICMP error, which leaves nothing to read.
+        """
+        timeout = self._serialport.timeout
+        self._serialport.timeout = 0
+        try:
+            return self._serialport.read(1)
+        finally:
+            self._serialport.timeout = timeout
+
+    def _service(self, now, final = False):
+        """end the pending chunk if due, run the framer, queue frames
+
+        Returns the next time (ns) this channel needs looking at, or None.
+        """
+        if self._active is not self._framer:
+            self._queue(self._active.flush())
+            self._active = self._framer
+        if self._pending:
+            polled = self._readMode == READMODE_POLLING
+            if final or polled or len(self._pending) >= READER_MAX_CHUNK \
+                    or now - self._last >= self._gap():
+                data, t = bytes(self._pending), self._first
+                self._pending = bytearray()
+                self._first = None
+                self._queue(self._active.feed(data, t))
+        self._queue(self._active.flush() if final else self._active.poll(now))
+        self._drain()
+        due = self._active.deadline()
+        if self._pending:
+            end = self._last + self._gap()
+            due = end if due is None else min(due, end)
+        return due
+
+    def _queue(self, frames):
+        for frame in frames:
+            self._backlog.append(frame)
+
+    def _drain(self):
+        """queue the backlog, False while a blocking buffer is full"""
+        while self._backlog:
+            data, t = self._backlog[0]
+            n = self._buffer.put(data, t, 0)
+            if n < len(data):
+                # only a blocking buffer accepts less than all of it
+                self._backlog[0] = (data[n:], t)
+                return False
+            self._backlog.popleft()
+        return True
+
+
+class PortMultiplexer(object):
+    """serve any number of ports from one asyncio event loop thread
+
+    Ports with a selectable handle are watched with loop.add_reader(), the
+    others (and channels in polling mode) are polled from loop timers; a
+    port without a handle every 2 ms while data flows, every 30 ms once it
+    has been quiet for a while. A channel whose blocking buffer is full
+    is not read until the buffer drains, leaving flow control to the port.
+    The thread starts with the first channel added or coroutine submitted;
+    submit() runs scripts on the same loop, see asyncserial.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = []
+        self._loop = None
+        self._thread = None
+
+    def channels(self):
+        with self._lock:
+            return list(self._channels)
+
+    def loop(self):
+        """the event loop, started on its thread if need be"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.SelectorEventLoop()
+                self._thread = threading.Thread(target = self._loop.run_forever,
+                                                name = 'iomux', daemon = True)
+                self._thread.start()
+            return self._loop
+
+    def inLoop(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """run a coroutine on the I/O thread, returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop())
+
+    def call(self, func, *args):
+        """run func on the I/O thread and return its result"""
+        if self.inLoop():
+            return func(*args)
+        future = concurrent.futures.Future()
+        def run():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+        self.loop().call_soon_threadsafe(run)
+        return future.result()
+
+    def add(self, channel):
+        """start serving an open port"""
+        with self._lock:
+            if channel in self._channels:
+                return
+            if not self._channels:
+                # a fresh clock anchor, as long as nothing is being timed
+                reanchor()
+            self._channels.append(channel)
+        self.call(self._attach, channel)
+
+    def remove(self, channel):
+        """stop serving a port, after queueing what was read from it
+
+        Returns once the I/O thread no longer touches the port, so it can
+        be closed.
+        """
+        with self._lock:
+            if channel not in self._channels:
+                return
+            self._channels.remove(channel)
+        self.call(self._detach, channel, True)
+
+    def close(self):
+        """remove every channel and end the thread"""
+        for channel in self.channels():
+            self.remove(channel)
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    # everything below runs on the I/O thread
+
+    def _attach(self, channel):
+        channel._active = channel._framer
+        channel._pending = bytearray()
+        channel._first = None
+        channel._backlog.clear()
+        channel._fd = channel._handle()
+        channel._watched = False
+        channel._timer = None
+        channel._idlePolls = 0
+        self._serve(channel)
+
+    def _detach(self, channel, flush = False):
+        self._unwatch(channel)
+        if channel._timer is not None:
+            channel._timer.cancel()
+            channel._timer = None
+        if flush:
+            try:
+                channel._service(now_ns(), final = True)
+            except Exception as e:
+                print("Exception on PortMultiplexer.remove, {}".format(e))
+        channel._fd = None
+
+    def _watch(self, channel):
+        if channel._fd is not None and not channel._watched:
+            self._loop.add_reader(channel._fd, self._onReadable, channel)
+            channel._watched = True
+
+    def _unwatch(self, channel):
+        if channel._watched:
+            self._loop.remove_reader(channel._fd)
+            channel._watched = False
+
+    def _fail(self, channel, e):
+        with self._lock:
+            if channel in self._channels:
+                self._channels.remove(channel)
+        self._detach(channel)
+        if channel._onError is not None:
+            channel._onError(e)
+
+    def _onReadable(self, channel):
+        try:
+            channel._read(now_ns())
+        except Exception as e:
+            self._fail(channel, e)
+        else:
+            self._serve(channel)
+
+    def _serve(self, channel):
+        """serve a channel, then arrange to be called when it next needs it"""
+        with self._lock:
+            if channel not in self._channels:
+                return
+        now = now_ns()
+        polled = channel._readMode == READMODE_POLLING or channel._fd is None
+        try:
+            if polled and not channel._backlog:
+                if channel._read(now):
+                    channel._idlePolls = 0
+                else:
+                    channel._idlePolls += 1
+            due = channel._service(now)
+        except Exception as e:
+            self._fail(channel, e)
+            return
+        if channel._backlog:
+            self._unwatch(channel)
+            wait = BACKLOG_RETRY
+        elif polled:
+            self._unwatch(channel)
+            if channel._readMode == READMODE_POLLING:
+                wait = POLL_INTERVAL
+            elif channel._idlePolls < NOFD_IDLE_POLLS:
+                wait = NOFD_POLL_INTERVAL
+            else:
+                # an idle port is not worth 500 reads a second
+                wait = NOFD_IDLE_INTERVAL
+        else:
+            self._watch(channel)
+            wait = None
+        if due is not None:
+            untilDue = max(due - now_ns(), 0) / 1e9
+            wait = untilDue if wait is None else min(wait, untilDue)
+        if channel._timer is not None:
+            channel._timer.cancel()
+            channel._timer = None
+        if wait is not None:
+            channel._timer = self._loop.call_later(wait, self._serve, channel)
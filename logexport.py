@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+import os
+from timebase import to_datetime
+from capturestore import DIR_RX, DIR_TX, DIR_NOTE
+from dataformat import render_record, render_data, pending_tail, FLAG_HIDDEN
+
+EXPORT_TEXT              = 0
+EXPORT_RAW               = 1
+EXPORT_TIMESTAMPED       = 2
+
+# (file dialog filter, format)
+EXPORT_FILTERS = [
+    ('Log files (*.log)', EXPORT_TEXT),
+    ('Text files (*.txt)', EXPORT_TEXT),
+    ('Raw received bytes (*.bin)', EXPORT_RAW),
+    ('Timestamped lines (*.tsv)', EXPORT_TIMESTAMPED),
+    ('All files (*.*)', EXPORT_TEXT),
+]
+
+DIRECTION_TAG = {
+    DIR_RX: 'RX',
+    DIR_TX: 'TX',
+    DIR_NOTE: '--',
+}
+
+_ESCAPE_LINE = str.maketrans({'\r': '\\r', '\n': '\\n', '\t': '\\t'})
+
+
+def text_pieces(records, hexGroup = 1, digits = 3):
+    """the output pane's text, one piece per shown chunk, with timestamps
+    to digits decimals as View shows them"""
+    first = True
+    carry = b''
+    carryFlags = None
+    for t, direction, flags, data in records:
+        if direction != DIR_NOTE and flags & FLAG_HIDDEN:
+            continue
+        text = render_record(t, direction, flags, data, hexGroup,
+                             carry if direction == DIR_RX and flags == carryFlags else b'', digits)
+        if direction == DIR_RX:
+            carry, carryFlags = pending_tail(flags, data), flags
+        yield (text if first else '\n' + text).replace('\r', '')
+        first = False
+
+
+def raw_pieces(records):
+    """received bytes only, exactly as read"""
+    for t, direction, flags, data in records:
+        if direction == DIR_RX:
+            yield data
+
+
+def timestamped_pieces(records, hexGroup = 1):
+    """one tab separated line per chunk: date time, direction, data
+
+    Control characters in the data are escaped so a chunk never spans
+    lines; chunks sent without echo are shown in hex.
+    """
+    for t, direction, flags, data in records:
+        if direction == DIR_NOTE:
+            text = data.decode('utf-8', 'replace')
+        else:
+            text = render_data(flags & ~FLAG_HIDDEN, data, hexGroup)
+        yield '%s\t%s\t%s\n' % (
+            to_datetime(t).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            DIRECTION_TAG.get(direction, '??'),
+            text.translate(_ESCAPE_LINE))
+
+
+def export_records(records, count, fmt, path, hexGroup = 1, progress = None, cancelled = None,
+                   digits = 3):
+    """stream count records to path in fmt
+
+    progress(done, count) is called every 1024 records; returns False if
+    cancelled() became true before the end. The file is written as
+    path.part and only renamed to path once complete.
+    """
+    state = {'cancelled': False}
+
+    def watched():
+        for n, record in enumerate(records):
+            if n & 0x3ff == 0:
+                if cancelled is not None and cancelled():
+                    state['cancelled'] = True
+                    return
+                if progress is not None:
+                    progress(n, count)
+            yield record
+
+    partial = path + '.part'
+    if fmt == EXPORT_RAW:
+        f = open(partial, 'wb', buffering = 1 << 20)
+        pieces = raw_pieces(watched())
+    else:
+        f = open(partial, 'w', encoding = 'utf-8', newline = '\n', buffering = 1 << 20)
+        if fmt == EXPORT_TIMESTAMPED:
+            pieces = timestamped_pieces(watched(), hexGroup)
+        else:
+            pieces = text_pieces(watched(), hexGroup, digits)
+    try:
+        with f:
+            for piece in pieces:
+                f.write(piece)
+    except BaseException:
+        _discard(partial)
+        raise
+    if state['cancelled']:
+        _discard(partial)
+        return False
+    os.replace(partial, path)
+    if progress is not None:
+        progress(count, count)
+    return True
+
+
+def export_capture(reader, fmt, path, hexGroup = 1, progress = None, cancelled = None,
+                   digits = 3):
+    """export_records() over a CaptureReader, closing it afterwards"""
+    try:
+        return export_records(reader.records(), reader.count(), fmt, path,
+                              hexGroup, progress, cancelled, digits)
+    finally:
+        reader.close()
+
+
+def export_lines(lines, path, progress = None, cancelled = None):
+    """write display lines, each a sequence of (text, color) runs, through
+    path.part as export_records() does"""
+    count = len(lines)
+    partial = path + '.part'
+    complete = True
+    try:
+        with open(partial, 'w', encoding = 'utf-8', newline = '\n', buffering = 1 << 20) as f:
+            for n, runs in enumerate(lines):
+                if n & 0x3ff == 0:
+                    if cancelled is not None and cancelled():
+                        complete = False
+                        break
+                    if progress is not None:
+                        progress(n, count)
+                if n:
+                    f.write('\n')
+                for text, color in runs:
+                    f.write(text)
+    except BaseException:
+        _discard(partial)
+        raise
+    if not complete:
+        _discard(partial)
+        return False
+    os.replace(partial, path)
+    if progress is not None:
+        progress(count, count)
+    return True
+
+
+def _discard(partial):
+    # a cancelled or failed export leaves nothing behind
+    try:
+        os.remove(partial)
+    except OSError:
+        pass
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+_NS_PER_SEC = 1000000000
+
+
+class RateCounter(object):
+    """amount per second over a sliding window of one-second buckets
+
+    add() is a division, a compare and two additions unless a new second
+    has begun, so it can be called for every chunk.
+    """
+
+    __slots__ = ('_buckets', '_window', '_second', 'total')
+
+    def __init__(self, window = 60):
+        self._window = window
+        self._buckets = [0] * window
+        self._second = 0
+        self.total = 0
+
+    def _advance(self, second):
+        if second - self._second >= self._window:
+            self._buckets = [0] * self._window
+        else:
+            for s in range(self._second + 1, second + 1):
+                self._buckets[s % self._window] = 0
+        self._second = second
+
+    def add(self, n, now):
+        """count n at time now(ns)"""
+        second = now // _NS_PER_SEC
+        if second > self._second:
+            self._advance(second)
+        self._buckets[second % self._window] += n
+        self.total += n
+
+    def rate(self, now, seconds = 1):
+        """average per second over the last complete seconds before now"""
+        second = now // _NS_PER_SEC
+        if second > self._second:
+            self._advance(second)
+        seconds = min(seconds, self._window - 1)
+        return sum(self._buckets[(second - k) % self._window] for k in range(1, seconds + 1)) / seconds
+
+    def history(self, now):
+        """per second amounts of the complete seconds in the window, oldest first"""
+        second = now // _NS_PER_SEC
+        if second > self._second:
+            self._advance(second)
+        return [self._buckets[(second - k) % self._window] for k in range(self._window - 1, 0, -1)]
+
+    def reset(self):
+        self._buckets = [0] * self._window
+        self.total = 0
+
+
+class PeakSeries(RateCounter):
+    """the largest value seen in each second of a sliding window"""
+
+    __slots__ = ('last',)
+
+    def __init__(self, window = 60):
+        super(PeakSeries, self).__init__(window)
+        self.last = 0
+
+    def add(self, value, now):
+        second = now // _NS_PER_SEC
+        if second > self._second:
+            self._advance(second)
+        i = second % self._window
+        if value > self._buckets[i]:
+            self._buckets[i] = value
+        self.last = value
+
+    def peak(self, now, seconds = 1):
+        """the largest value over the last seconds, the current one included"""
+        second = now // _NS_PER_SEC
+        if second > self._second:
+            self._advance(second)
+        seconds = min(seconds, self._window)
+        return max(self._buckets[(second - k) % self._window] for k in range(seconds))
+
+
+class SessionMetrics(object):
+    """throughput and health counters of one port session
+
+    received() and transmitted() are called from the GUI thread for every
+    chunk and take the chunk's own timestamp, so they never read a clock.
+    Everything else is sampled when the numbers are shown.
+    """
+
+    def __init__(self, window = 60):
+        self.window = window
+        self.rxBytes = RateCounter(window)
+        self.txBytes = RateCounter(window)
+        self.rxChunks = RateCounter(window)
+        self.lag = PeakSeries(window)
+        self.depth = PeakSeries(window)
+        self.droppedBytes = 0
+        self.errors = 0
+
+    def received(self, n, t):
+        self.rxBytes.add(n, t)
+        self.rxChunks.add(1, t)
+
+    def transmitted(self, n, t):
+        self.txBytes.add(n, t)
+
+    def rendered(self, lag, now):
+        """lag(ns) between reading the oldest chunk of a frame and drawing it"""
+        self.lag.add(lag, now)
+
+    def sample(self, now, depth, droppedBytes, errors):
+        self.depth.add(depth, now)
+        self.droppedBytes = droppedBytes
+        self.errors = errors
+
+    def reset(self):
+        for counter in (self.rxBytes, self.txBytes, self.rxChunks, self.lag, self.depth):
+            counter.reset()
+        self.droppedBytes = 0
+        self.errors = 0
+
+    def summary(self, now):
+        return dict(rx = self.rxBytes.rate(now),
+                    tx = self.txBytes.rate(now),
+                    chunks = self.rxChunks.rate(now),
+                    depth = self.depth.peak(now),
+                    lag = self.lag.peak(now, 2) / 1e6,
+                    rxTotal = self.rxBytes.total,
+                    txTotal = self.txBytes.total,
+                    dropped = self.droppedBytes,
+                    errors = self.errors)
+
+
+def format_size(n, suffix = 'B'):
+    """1023 B, 1.5 kB, 12.0 MB"""
+    for unit in ('', 'k', 'M', 'G'):
+        if abs(n) < 1000 or unit == 'G':
+            return ('%d %s%s' if unit == '' else '%.1f %s%s') % (n, unit, suffix)
+        n /= 1000.0
+
+
+def status_text(summary):
+    """the one line status bar text of a summary()"""
+    return 'RX %s  TX %s  %d chunk/s  buf %s  lag %.0f ms  dropped %s  errors %d' % (
+        format_size(summary['rx'], 'B/s'), format_size(summary['tx'], 'B/s'),
+        summary['chunks'], format_size(summary['depth']), summary['lag'],
+        format_size(summary['dropped']), summary['errors'])
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE_PROMETHEUS  = 'text/plain; version=0.0.4; charset=utf-8'
+CONTENT_TYPE_OPENMETRICS = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# (name, type, help, PortCounters attribute)
+METRICS = [
+    ('myterm_rx_bytes', 'counter', 'Bytes received', 'rxBytes'),
+    ('myterm_tx_bytes', 'counter', 'Bytes sent', 'txBytes'),
+    ('myterm_rx_frames', 'counter', 'Chunks or frames received', 'frames'),
+    ('myterm_errors', 'counter', 'Reader and framing errors', 'errors'),
+    ('myterm_dropped_bytes', 'counter', 'Received bytes dropped by a full buffer', 'droppedBytes'),
+    ('myterm_reconnects', 'counter', 'Times the port was opened again', 'reconnects'),
+    ('myterm_port_open', 'gauge', '1 while the port is open', 'isOpen'),
+    ('myterm_buffer_depth_bytes', 'gauge', 'Received bytes waiting for the GUI', 'depth'),
+    ('myterm_buffer_utilization', 'gauge', 'Receive buffer fill ratio', 'utilization'),
+]
+
+_TOTALS = ('rxBytes', 'txBytes', 'frames', 'errors', 'droppedBytes')
+
+
+class PortCounters(object):
+    """monotonic totals of one port for the whole run
+
+    update() takes the session's own totals, which start over from zero at
+    opened(); a total that goes down otherwise is taken as a restart too.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self.opens = 0
+        self.isOpen = 0
+        self.depth = 0
+        self.capacity = 0
+        self._last = dict((name, 0) for name in _TOTALS)
+        for name in _TOTALS:
+            setattr(self, name, 0)
+
+    @property
+    def reconnects(self):
+        return max(self.opens - 1, 0)
+
+    @property
+    def utilization(self):
+        return self.depth / self.capacity if self.capacity else 0.0
+
+    def opened(self):
+        """the port was opened and its session totals start from zero"""
+        self.opens += 1
+        self._last = dict((name, 0) for name in _TOTALS)
+
+    def update(self, isOpen, depth, capacity, **totals):
+        self.isOpen = int(isOpen)
+        self.depth = depth
+        self.capacity = capacity
+        for name, value in totals.items():
+            last = self._last[name]
+            setattr(self, name, getattr(self, name) + (value - last if value >= last else value))
+            self._last[name] = value
+
+
+def _label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def render_metrics(ports, openmetrics = False):
+    """exposition text of a list of PortCounters, in the Prometheus text
+    format or in OpenMetrics"""
+    lines = []
+    for name, kind, text, attr in METRICS:
+        sample = name + '_total' if kind == 'counter' else name
+        family = name if openmetrics else sample
+        lines.append('# HELP %s %s' % (family, text))
+        lines.append('# TYPE %s %s' % (family, kind))
+        for port in ports:
+            value = getattr(port, attr)
+            lines.append('%s{port="%s"} %s' % (sample, _label(port.port),
+                         ('%.6g' % value) if isinstance(value, float) else value))
+    if openmetrics:
+        lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+        body = self.server.exporter.text(openmetrics).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE_OPENMETRICS if openmetrics else CONTENT_TYPE_PROMETHEUS)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter(object):
+    """publish port counters over HTTP, to a textfile collector file, or both
+
+    publish() copies the counters under a lock and returns at once; the
+    HTTP server and the file writer run on their own daemon threads and
+    only ever read that copy.
+    """
+
+    def __init__(self, httpPort = 0, host = '127.0.0.1', textfile = '', interval = 15):
+        self._lock = threading.Lock()
+        self._ports = []
+        self._server = None
+        self._textfile = textfile
+        self._interval = interval
+        self._stop = threading.Event()
+        self._threads = []
+        if httpPort:
+            self._server = ThreadingHTTPServer((host, httpPort), _Handler)
+            self._server.daemon_threads = True
+            self._server.exporter = self
+            self._spawn(self._server.serve_forever, 'MetricsHTTP')
+        if textfile:
+            self._spawn(self._writeLoop, 'MetricsTextfile')
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target = target, name = name)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def address(self):
+        """(host, port) the HTTP server listens on, None without one"""
+        return self._server.server_address if self._server is not None else None
+
+    def publish(self, ports):
+        snapshot = []
+        for port in ports:
+            copy = PortCounters.__new__(PortCounters)
+            copy.__dict__.update(port.__dict__)
+            snapshot.append(copy)
+        with self._lock:
+            self._ports = snapshot
+
+    def text(self, openmetrics = False):
+        with self._lock:
+            ports = self._ports
+        return render_metrics(ports, openmetrics)
+
+    def writeTextfile(self):
+        """write the file under a temporary name and rename it over the old
+        one, so the collector never reads half of it"""
+        partial = '%s.%d.tmp' % (self._textfile, os.getpid())
+        with open(partial, 'w', encoding = 'utf-8') as f:
+            f.write(self.text())
+        os.replace(partial, self._textfile)
+
+    def _writeLoop(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.writeTextfile()
+            except (IOError, OSError) as e:
+                print("Exception on MetricsExporter, {}".format(e))
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        if self._textfile:
+            try:
+                self.writeTextfile()
+            except (IOError, OSError) as e:
+                print("Exception on MetricsExporter, {}".format(e))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt, QPointF, QSize
+from PyQt5.QtGui import QPainter, QPolygonF, QColor
+from metrics import format_size
+
+# (label, summary key, series attribute of SessionMetrics, format)
+PANEL_ROWS = [
+    ('RX', 'rx', 'rxBytes', lambda v: format_size(v, 'B/s')),
+    ('TX', 'tx', 'txBytes', lambda v: format_size(v, 'B/s')),
+    ('Chunks', 'chunks', 'rxChunks', lambda v: '%d /s' % v),
+    ('Buffer', 'depth', 'depth', format_size),
+    ('Lag', 'lag', 'lag', lambda v: '%.1f ms' % v),
+]
+
+
+class Sparkline(QtWidgets.QWidget):
+    """a small line chart of the last values, scaled to their maximum"""
+
+    def __init__(self, parent = None, color = Qt.darkBlue):
+        super(Sparkline, self).__init__(parent)
+        self._values = []
+        self._color = QColor(color)
+        self.setMinimumSize(120, 24)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+
+    def sizeHint(self):
+        return QSize(180, 24)
+
+    def setValues(self, values):
+        self._values = values
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self._values) < 2:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        w = self.width() - 2
+        h = self.height() - 3
+        top = max(self._values) or 1
+        step = w / (len(self._values) - 1)
+        line = QPolygonF([QPointF(1 + i * step, 1 + h - h * v / top)
+                          for i, v in enumerate(self._values)])
+        painter.setPen(self._color)
+        painter.drawPolyline(line)
+
+
+class MetricsPanel(QtWidgets.QDockWidget):
+    """current rates with a sparkline of the last minute each, plus totals"""
+
+    def __init__(self, parent = None):
+        super(MetricsPanel, self).__init__(parent)
+        self.setWindowTitle("Statistics")
+        self.setObjectName("dockWidget_Statistics")
+        widget = QtWidgets.QWidget(self)
+        grid = QtWidgets.QGridLayout(widget)
+        grid.setContentsMargins(6, 6, 6, 6)
+        self._values = {}
+        self._lines = {}
+        for row, (label, key, series, fmt) in enumerate(PANEL_ROWS):
+            grid.addWidget(QtWidgets.QLabel(label, widget), row, 0)
+            self._values[key] = QtWidgets.QLabel(widget)
+            self._values[key].setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self._values[key].setMinimumWidth(80)
+            grid.addWidget(self._values[key], row, 1)
+            self._lines[key] = Sparkline(widget)
+            grid.addWidget(self._lines[key], row, 2)
+        self._totals = QtWidgets.QLabel(widget)
+        grid.addWidget(self._totals, len(PANEL_ROWS), 0, 1, 3)
+        grid.setRowStretch(len(PANEL_ROWS) + 1, 1)
+        self.setWidget(widget)
+
+    def showMetrics(self, metrics, summary, now):
+        for label, key, series, fmt in PANEL_ROWS:
+            self._values[key].setText(fmt(summary[key]))
+            self._lines[key].setValues(getattr(metrics, series).history(now))
+        self._totals.setText("Total RX %s, TX %s, dropped %s, errors %d" % (
+            format_size(summary['rxTotal']), format_size(summary['txTotal']),
+            format_size(summary['dropped']), summary['errors']))
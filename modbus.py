@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import struct
+from crc import crc16_modbus
+from framing import IdleFramer, register_framer, MAX_FRAME
+
+FRAMING_MODBUS           = 'modbus'
+
+# at more than 19200 baud the spec fixes the silent interval instead
+MODBUS_FIXED_GAP         = 1750000
+MODBUS_FIXED_GAP_BAUD    = 19200
+
+FUNCTION_NAMES = {
+    0x01: 'Read Coils',
+    0x02: 'Read Discrete Inputs',
+    0x03: 'Read Holding Registers',
+    0x04: 'Read Input Registers',
+    0x05: 'Write Single Coil',
+    0x06: 'Write Single Register',
+    0x07: 'Read Exception Status',
+    0x08: 'Diagnostics',
+    0x0f: 'Write Multiple Coils',
+    0x10: 'Write Multiple Registers',
+    0x11: 'Report Server ID',
+    0x16: 'Mask Write Register',
+    0x17: 'Read/Write Multiple Registers',
+    0x2b: 'Encapsulated Interface',
+}
+
+EXCEPTION_NAMES = {
+    0x01: 'Illegal Function',
+    0x02: 'Illegal Data Address',
+    0x03: 'Illegal Data Value',
+    0x04: 'Server Device Failure',
+    0x05: 'Acknowledge',
+    0x06: 'Server Device Busy',
+    0x08: 'Memory Parity Error',
+    0x0a: 'Gateway Path Unavailable',
+    0x0b: 'Gateway Target Failed to Respond',
+}
+
+_WORD = struct.Struct('>H')
+_TWO_WORDS = struct.Struct('>HH')
+
+# function code -> length of a request and of a response when it does not
+# depend on a byte count field
+_FIXED_REQUEST = {0x01: 8, 0x02: 8, 0x03: 8, 0x04: 8, 0x05: 8, 0x06: 8, 0x07: 4,
+                  0x08: 8, 0x0f: None, 0x10: None, 0x11: 4, 0x16: 10, 0x17: None}
+_FIXED_RESPONSE = {0x05: 8, 0x06: 8, 0x07: 5, 0x08: 8, 0x0f: 8, 0x10: 8, 0x16: 10}
+
+
+def crc_ok(frame):
+    return len(frame) >= 4 and crc16_modbus(frame[:-2]) == frame[-2] | frame[-1] << 8
+
+
+def frame_lengths(frame):
+    """the lengths a frame starting at frame[0] could have, from its
+    function code and byte count fields"""
+    if len(frame) < 3:
+        return ()
+    fn = frame[1]
+    if fn & 0x80:
+        return (5,)
+    lengths = []
+    if _FIXED_REQUEST.get(fn):
+        lengths.append(_FIXED_REQUEST[fn])
+    if fn in (0x0f, 0x10) and len(frame) > 6:
+        lengths.append(9 + frame[6])
+    if fn == 0x17 and len(frame) > 10:
+        lengths.append(13 + frame[10])
+    if fn in _FIXED_RESPONSE:
+        lengths.append(_FIXED_RESPONSE[fn])
+    else:
+        lengths.append(5 + frame[2])
+    return lengths
+
+
+def split_frames(frame):
+    """split a chunk in which back to back frames ran together
+
+    The line is not always seen idle between frames, e.g. behind a USB
+    adapter; the chunk is cut where a frame with a good CRC ends, as told
+    by its function code and byte count. What cannot be split is returned
+    as it is.
+    """
+    out = []
+    while frame:
+        for n in frame_lengths(frame):
+            if 4 <= n < len(frame) and crc_ok(frame[:n]):
+                out.append(frame[:n])
+                frame = frame[n:]
+                break
+        else:
+            out.append(frame)
+            break
+    return out
+
+
+def _registers(data):
+    return ' '.join('%04X' % _WORD.unpack_from(data, i)[0] for i in range(0, len(data) - 1, 2))
+
+
+def _pdu(fn, pdu, length):
+    """describe the PDU (function code and CRC stripped); length of the whole
+    frame tells a request from a response"""
+    if fn in (0x01, 0x02, 0x03, 0x04):
+        if length == 8:
+            addr, qty = _TWO_WORDS.unpack_from(pdu)
+            return '@%04X x%d' % (addr, qty)
+        if pdu and pdu[0] == len(pdu) - 1:
+            if fn in (0x03, 0x04):
+                return '= ' + _registers(pdu[1:])
+            return '= ' + ' '.join('%02X' % b for b in pdu[1:])
+    elif fn in (0x05, 0x06) and len(pdu) == 4:
+        addr, value = _TWO_WORDS.unpack_from(pdu)
+        return '@%04X := %04X' % (addr, value)
+    elif fn in (0x0f, 0x10) and len(pdu) >= 4:
+        addr, qty = _TWO_WORDS.unpack_from(pdu)
+        if len(pdu) == 4:
+            return '@%04X x%d done' % (addr, qty)
+        if fn == 0x10:
+            return '@%04X x%d := %s' % (addr, qty, _registers(pdu[5:]))
+        return '@%04X x%d := %s' % (addr, qty, ' '.join('%02X' % b for b in pdu[5:]))
+    elif fn == 0x17 and len(pdu) >= 9:
+        raddr, rqty, waddr, wqty = struct.unpack_from('>HHHH', pdu)
+        return 'read @%04X x%d write @%04X := %s' % (raddr, rqty, waddr, _registers(pdu[9:]))
+    elif fn == 0x17 and pdu and pdu[0] == len(pdu) - 1:
+        return '= ' + _registers(pdu[1:])
+    return ' '.join('%02X' % b for b in pdu)
+
+
+def annotate(frame):
+    """one-line description of a Modbus RTU frame"""
+    if len(frame) < 4:
+        return '[short frame]'
+    slave, fn = frame[0], frame[1]
+    if not crc_ok(frame):
+        return '[#%d CRC error]' % slave
+    if fn & 0x80:
+        code = frame[2]
+        return '[#%d %s exception %02X %s]' % (slave, FUNCTION_NAMES.get(fn & 0x7f, 'fn %02X' % (fn & 0x7f)),
+                                               code, EXCEPTION_NAMES.get(code, ''))
+    detail = _pdu(fn, bytes(frame[2:-2]), len(frame))
+    return '[#%d %s %s]' % (slave, FUNCTION_NAMES.get(fn, 'fn %02X' % fn), detail)
+
+
+class ModbusRtuFramer(IdleFramer):
+    """Modbus RTU frames: a frame ends after 3.5 character times of
+    silence, or 1.75 ms above 19200 baud; frames that ran together are
+    split by their CRC"""
+
+    def __init__(self, charTime = 0, maxFrame = MAX_FRAME):
+        super(ModbusRtuFramer, self).__init__(3.5, charTime, 0, maxFrame)
+
+    def idleGap(self):
+        if not self._charTime:
+            return MODBUS_FIXED_GAP
+        if self._baudrate:
+            if self._baudrate > MODBUS_FIXED_GAP_BAUD:
+                return MODBUS_FIXED_GAP
+        elif self._charTime < 11 * 1000000000 // MODBUS_FIXED_GAP_BAUD:
+            # baud rate unknown: an 11 bit character at 19200 baud takes 573 us
+            return MODBUS_FIXED_GAP
+        return int(3.5 * self._charTime)
+
+    def flush(self):
+        return self._split(super(ModbusRtuFramer, self).flush())
+
+    def _overlong(self, out):
+        n = len(out)
+        super(ModbusRtuFramer, self)._overlong(out)
+        out[n:] = self._split(out[n:])
+
+    def _split(self, frames):
+        out = []
+        for frame, t in frames:
+            offset = 0
+            for part in split_frames(frame):
+                if not crc_ok(part):
+                    self.errors += 1
+                out.append((part, self._byteTime(t, offset)))
+                offset += len(part)
+        return out
+
+
+register_framer('Modbus RTU', FRAMING_MODBUS,
+                lambda charTime: ModbusRtuFramer(charTime))
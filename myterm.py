@@ -25,6 +25,13 @@
 
 
 import sys, os
+import re
+
+if __name__ == '__main__' and '--headless' in sys.argv[1:]:
+    # capture without loading Qt at all
+    from headless import main
+    sys.exit(main([arg for arg in sys.argv[1:] if arg != '--headless']))
+
 import datetime
 import pickle
 import csv
@@ -33,14 +40,43 @@ import defusedxml.cElementTree as safeET
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtWidgets import QMainWindow, QApplication, QMessageBox, QWidget, \
     QTableWidgetItem, QPushButton, QActionGroup, QDesktopWidget, QToolButton, \
-    QFileDialog
+    QFileDialog, QProgressDialog, QInputDialog, QTabWidget, QTabBar
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSignalMapper, QFile, QIODevice, \
-    QPoint, QPropertyAnimation
+    QPoint, QPropertyAnimation, QTimer
 from PyQt5.QtGui import QFontMetrics
 from combo import Combo
+from renderer import RenderScheduler
+from metrics import SessionMetrics, status_text
+from metricspanel import MetricsPanel
+from metricsexport import MetricsExporter, PortCounters
+from outputview import ScrollbackStore, CaptureScrollback
+from capturestore import CaptureStore, DIR_RX, DIR_TX, DIR_NOTE
+from logexport import export_capture, export_lines, EXPORT_FILTERS, EXPORT_TEXT
+from autolog import AutoLogger, COMPRESSIONS, COMPRESS_GZIP
+from timebase import now_ns
+from serialengine import READMODE_POLLING, READMODE_EVENT
+from iomux import PortMultiplexer
+from portsession import PortReader, PortSession
+from quicksend import QuickSendCache, FORM_HEX, FORM_ASCII, FORM_ASCII_ESCAPED, \
+    FORM_HEX_FILE, FORM_ASCII_FILE, FORM_BINARY_FILE, hex_payload, ascii_payload, \
+    escaped_payload, payload_flags
+from filesend import TransmitThread, TransferThread, TransmitBar, file_chunks, \
+    TRANSMIT_CHUNK, TRANSMIT_DELAY_MS
+from filetransfer import PROTOCOLS, BATCH_PROTOCOLS, send_files, receive_files
+from firmware import FIRMWARE_MODES, FIRMWARE_FLAT
+from portconfig import PortConfig, DATABITS, PARITIES, STOPBITS, is_url
+from framing import FRAMINGS, FRAMING_NONE, FRAMING_DELIMITER, FRAMING_FIXED, \
+    FRAMING_IDLE, MAX_FRAME, PassthroughFramer, create_framer, char_time_ns, \
+    parse_delimiter, delimiter_text, framer_options, parse_options, format_options
+import packetframing  # registers the binary packet framers
+from modbus import FRAMING_MODBUS
+from ringbuffer import RingBuffer, OVERFLOW_POLICIES, OVERFLOW_DROP_OLDEST
+from dataformat import Formatter, ENCODINGS, FLAG_HIDDEN, \
+    VIEWMODE_ASCII, VIEWMODE_HEX_LOWERCASE, VIEWMODE_HEX_UPPERCASE, \
+    format_timestamp, make_flags, record_lines, render_data
 import sip
 import appInfo
-from configpath import get_config_path
+from configpath import get_config_path, get_capture_path, get_log_dir
 from ui.ui_mainwindow import Ui_MainWindow
 from res import resources_pyqt5
 import serial
@@ -59,9 +95,15 @@ elif os.name == 'posix':
     EDITOR_FONT = "Monospace"
     UI_FONT = None
 
-VIEWMODE_ASCII           = 0
-VIEWMODE_HEX_LOWERCASE   = 1
-VIEWMODE_HEX_UPPERCASE   = 2
+RX_BUFFER_SIZE           = 4 << 20
+RENDER_RATE              = 30
+SCROLLBACK_LINES         = 100000
+SCROLLBACK_CHARS         = 32 << 20
+METRICS_INTERVAL         = 500
+METRICS_HTTP_PORT        = 9464
+AUTOLOG_ROTATE_MB        = 16
+AUTOLOG_ROTATE_MINUTES   = 60
+MAIN_TAB_TEXT            = 'Main'
 
 class MainWindow(QMainWindow, Ui_MainWindow):
     """docstring for MainWindow."""
@@ -69,17 +111,71 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         super(MainWindow, self).__init__()
         self._csvFilePath = ""
         self.serialport = serial.Serial()
-        self.readerThread = ReaderThread(self)
-        self.readerThread.setPort(self.serialport)
+        self.rxBuffer = RingBuffer(RX_BUFFER_SIZE, OVERFLOW_DROP_OLDEST)
+        self._rxDropped = 0
+        # one I/O thread reads every open port
+        self.ioMux = PortMultiplexer()
+        self.portReader = PortReader(self.ioMux, self)
+        self.portReader.setPort(self.serialport)
+        self.portReader.setBuffer(self.rxBuffer)
+        self.sessions = []
         self.portMonitorThread = PortMonitorThread(self)
         self.portMonitorThread.setPort(self.serialport)
         self.periodThread = PeriodThread(self)
+        self.saveLogThread = SaveLogThread(self)
+        self.saveLogProgress = None
+        self.transmitThread = TransmitThread(self)
+        # the window or session a file is being sent from, None once gone
+        self._fileSendTarget = None
+        self._fileSendFlags = FLAG_HIDDEN
+        self._fileSendBytes = 0
+        self.transferThread = TransferThread(self)
+        # the window or session a protocol transfer runs on, None once gone
+        self._transferTarget = None
+        self._transferName = ''
+        self._fileSend = dict(ChunkSize=TRANSMIT_CHUNK, DelayMs=TRANSMIT_DELAY_MS,
+                              Firmware=FIRMWARE_FLAT, FillByte=0xff)
+        self.formatter = Formatter()
+        self.capture = None
+        self.autoLog = None
+        self._autoLogDir = ''
+        self._framing = FRAMING_NONE
+        self._frameOptions = {}
+        self.metrics = SessionMetrics()
+        self._renderLagStart = None
+        self._readerErrors = 0
+        self._autoLogRotate = (AUTOLOG_ROTATE_MB, AUTOLOG_ROTATE_MINUTES)
+        self.portCounters = {}
+        self.metricsExporter = None
+        self._metricsExport = dict(HttpPort=METRICS_HTTP_PORT, Bind='127.0.0.1', TextFile='', Interval=15)
         self._localEcho = None
         self._viewMode = None
         self._quickSendOptRow = 1
+        self.quickSendCache = QuickSendCache()
         self._is_periodic_send = False
 
         self.setupUi(self)
+        self.portTabs = QTabWidget(self.centerFrame)
+        self.portTabs.setDocumentMode(True)
+        self.portTabs.setTabsClosable(True)
+        self.portTabs.setTabBarAutoHide(True)
+        self.verticalLayout_2.replaceWidget(self.txtEdtOutput, self.portTabs)
+        self.portTabs.setSizePolicy(self.txtEdtOutput.sizePolicy())
+        self.portTabs.addTab(self.txtEdtOutput, MAIN_TAB_TEXT)
+        # the main port's tab stays
+        for side in (QTabBar.LeftSide, QTabBar.RightSide):
+            self.portTabs.tabBar().setTabButton(0, side, None)
+        self.renderer = RenderScheduler(self.txtEdtOutput, RENDER_RATE, self)
+        self.txtEdtOutput.setLimits(SCROLLBACK_LINES, SCROLLBACK_CHARS)
+        self.metricsPanel = MetricsPanel(self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.metricsPanel)
+        self.metricsPanel.hide()
+        self.transmitBar = TransmitBar(self)
+        self.statusbar.addPermanentWidget(self.transmitBar)
+        self.lblMetrics = QtWidgets.QLabel(self)
+        self.statusbar.addPermanentWidget(self.lblMetrics)
+        self.metricsTimer = QTimer(self)
+        self.metricsTimer.setInterval(METRICS_INTERVAL)
         self.setCorner(Qt.TopLeftCorner, Qt.LeftDockWidgetArea)
         self.setCorner(Qt.BottomLeftCorner, Qt.LeftDockWidgetArea)
         font = QtGui.QFont()
@@ -114,6 +210,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.actionOpen.triggered.connect(self.openPort)
         self.actionClose.triggered.connect(self.closePort)
+        self.actionOpen_Tab.triggered.connect(self.onOpenTab)
+        self.actionFile_Send_Options.triggered.connect(self.onFileSendOptions)
+        self.portTabs.tabCloseRequested.connect(self.onCloseTab)
+        self.portTabs.currentChanged.connect(self.onMetricsTimer)
 
         #self.actionPort_Config_Panel.triggered.connect(self.onTogglePrtCfgPnl)
         self.actionQuick_Send_Panel.triggered.connect(self.onToggleQckSndPnl)
@@ -121,12 +221,21 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         #self.dockWidget_PortConfig.visibilityChanged.connect(self.onVisiblePrtCfgPnl)
         self.dockWidget_QuickSend.visibilityChanged.connect(self.onVisibleQckSndPnl)
         self.dockWidget_SendHex.visibilityChanged.connect(self.onVisibleHexPnl)
+        self.actionStatistics_Panel.triggered.connect(self.onToggleStatsPnl)
+        self.metricsPanel.visibilityChanged.connect(self.onVisibleStatsPnl)
+        self.metricsTimer.timeout.connect(self.onMetricsTimer)
+        self.actionExport_Metrics.triggered.connect(self.onExportMetrics)
+        self.renderer.rendered.connect(self.onRendered)
         self.actionLocal_Echo.triggered.connect(self.onLocalEcho)
+        self.actionLow_Latency.triggered.connect(self.onLowLatency)
+        self.actionCapture.triggered.connect(self.onCapture)
+        self.actionAuto_Log.triggered.connect(self.onAutoLog)
         self.actionAlways_On_Top.triggered.connect(self.onAlwaysOnTop)
 
         self.actionAscii.triggered.connect(self.onViewChanged)
         self.actionHex_lowercase.triggered.connect(self.onViewChanged)
         self.actionHEX_UPPERCASE.triggered.connect(self.onViewChanged)
+        self.actionMicroseconds.triggered.connect(self.onMicrosecondsChanged)
 
         self.actionAbout.triggered.connect(self.onAbout)
         self.actionAbout_Qt.triggered.connect(self.onAboutQt)
@@ -137,6 +246,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.cmbParity.currentTextChanged.connect(self.onParityChanged)
         self.chkRTSCTS.stateChanged.connect(self.onRTSCTSChanged)
         self.chkXonXoff.stateChanged.connect(self.onXonXoffChanged)
+        self.spnGap.valueChanged.connect(self.onGapChanged)
         
         self.btnOpen.clicked.connect(self.onOpen)
         self.btnClear.clicked.connect(self.onClear)
@@ -146,20 +256,38 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         
         self.btnPeriodicSend.clicked.connect(self.onPeriodicSend)
         self.periodThread.trigger.connect(self.onPeriodTrigger)
-
-        self.readerThread.read.connect(self.onReceive)
-        self.readerThread.exception.connect(self.onReaderExcept)
+        self.saveLogThread.progress.connect(self.onSaveLogProgress)
+        self.saveLogThread.done.connect(self.onSaveLogDone)
+        self.transmitThread.sent.connect(self.onFileSent)
+        self.transmitThread.progress.connect(self.transmitBar.setProgress)
+        self.transmitThread.done.connect(self.onFileSendDone)
+        self.transmitBar.pauseToggled.connect(self.transmitThread.setPaused)
+        self.transmitBar.cancelled.connect(self.transmitThread.cancel)
+        self.transmitBar.cancelled.connect(self.transferThread.cancel)
+        self.transferThread.fileStarted.connect(self.onTransferFileStarted)
+        self.transferThread.progress.connect(self.transmitBar.setProgress)
+        self.transferThread.done.connect(self.onTransferDone)
+        self._signalMapTransfer.mapped[int].connect(self.onTransfer)
+
+        self.portReader.readyRead.connect(self.onReadyRead)
+        self.portReader.exception.connect(self.onReaderExcept)
         self._signalMapQuickSendOpt = QSignalMapper(self)
         self._signalMapQuickSendOpt.mapped[int].connect(self.onQuickSendOptions)
         self._signalMapQuickSend = QSignalMapper(self)
         self._signalMapQuickSend.mapped[int].connect(self.onQuickSend)
+        self.quickSendTable.itemChanged.connect(self.onQuickSendEdited)
 
         # initial action
         self.setTabWidth(4)
         self.actionHEX_UPPERCASE.setChecked(True)
-        self.readerThread.setViewMode(VIEWMODE_HEX_UPPERCASE)
+        self.formatter.setViewMode(VIEWMODE_HEX_UPPERCASE)
+        self.actionLow_Latency.setChecked(True)
+        self.portReader.setReadMode(READMODE_EVENT)
+        self.actionCapture.setChecked(True)
+        self.portReader.setInterByteGap(self.spnGap.value() / 1000.0)
         self.initQuickSend()
         self.restoreLayout()
+        self.metricsTimer.start()
         self.moveScreenCenter()
         self.syncMenu()
         self.setPortCfgBarVisible(False)
@@ -170,16 +298,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.setMaximizeButton("maximize")
 
         self.loadSettings()
+        self.updateFramer()
+        self.onCapture()
+        self.onAutoLog()
+        self.onExportMetrics()
         self.onEnumPorts()
 
     def setTabWidth(self, n):
-        fm = QFontMetrics(self.txtEdtOutput.fontMetrics())
-        if hasattr(fm, 'horizontalAdvance'):
-            w = fm.horizontalAdvance(' ')
-        else:
-            w = fm.width(' ')
-        self.txtEdtOutput.setTabStopWidth(n * w)
-        
+        self.txtEdtOutput.setTabWidth(n)
+
         fm = QFontMetrics(self.txtEdtInput.fontMetrics())
         if hasattr(fm, 'horizontalAdvance'):
             w = fm.horizontalAdvance(' ')
@@ -189,9 +316,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     def onBaudRateChanged(self, text):
         self.serialport.baudrate = self.cmbBaudRate.currentText()
+        self.updateFramer()
         
     def onDataBitsChanged(self, text):
         self.serialport.bytesize = self.getDataBits()
+        self.updateFramer()
         
     def onStopBitsChanged(self, text):
         old = self.serialport.stopbits
@@ -203,9 +332,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except Exception as e:
             QMessageBox.critical(self.defaultStyleWidget, "Exception", str(e), QMessageBox.Close)
             self.cmbStopBits.setCurrentText('1')
+        self.updateFramer()
     
     def onParityChanged(self, text):
         self.serialport.parity = self.getParity()
+        self.updateFramer()
         
     def onRTSCTSChanged(self, state):
         self.serialport.rtscts = self.chkRTSCTS.isChecked()
@@ -213,7 +344,50 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def onXonXoffChanged(self, state):
         self.serialport.xonxoff = self.chkXonXoff.isChecked()
 
+    def onGapChanged(self, value):
+        self.portReader.setInterByteGap(value / 1000.0)
+        for session in self.sessions:
+            session.reader.setInterByteGap(value / 1000.0)
+
     def setupMenu(self):
+        self.actionLow_Latency = QtWidgets.QAction(self)
+        self.actionLow_Latency.setCheckable(True)
+        self.actionLow_Latency.setText("Low Latency Receive")
+        self.actionLow_Latency.setStatusTip("Wait on the port and hand off data as soon as the line goes idle")
+
+        self.actionMicroseconds = QtWidgets.QAction(self)
+        self.actionMicroseconds.setCheckable(True)
+        self.actionMicroseconds.setText("Microsecond Timestamps")
+        self.actionMicroseconds.setStatusTip("Show receive and send times to the microsecond")
+
+        self.actionStatistics_Panel = QtWidgets.QAction(self)
+        self.actionStatistics_Panel.setCheckable(True)
+        self.actionStatistics_Panel.setText("Statistics Panel")
+        self.actionStatistics_Panel.setStatusTip("Show or hide throughput and latency statistics")
+
+        self.actionExport_Metrics = QtWidgets.QAction(self)
+        self.actionExport_Metrics.setCheckable(True)
+        self.actionExport_Metrics.setText("Export Metrics")
+        self.actionExport_Metrics.setStatusTip("Publish port counters for Prometheus over local HTTP or a textfile collector file")
+
+        self.actionCapture = QtWidgets.QAction(self)
+        self.actionCapture.setCheckable(True)
+        self.actionCapture.setText("Capture Session to Disk")
+        self.actionCapture.setStatusTip("Keep all sent and received data in a file instead of a capped in-memory view")
+
+        self.actionOpen_Tab = QtWidgets.QAction(self)
+        self.actionOpen_Tab.setText("Open Port in New Tab...")
+        self.actionOpen_Tab.setStatusTip("Watch another port alongside, with the port settings shown in the bar")
+
+        self.actionFile_Send_Options = QtWidgets.QAction(self)
+        self.actionFile_Send_Options.setText("File Send Options...")
+        self.actionFile_Send_Options.setStatusTip("Set the chunk size and the pause between chunks when sending a file")
+
+        self.actionAuto_Log = QtWidgets.QAction(self)
+        self.actionAuto_Log.setCheckable(True)
+        self.actionAuto_Log.setText("Auto Log to File")
+        self.actionAuto_Log.setStatusTip("Write every sent and received chunk to rotating log files as it happens")
+
         self.menuMenu = QtWidgets.QMenu()
         self.menuMenu.setTitle("&File")
         self.menuMenu.setObjectName("menuMenu")
@@ -224,14 +398,110 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.menuView.addAction(self.actionAscii)
         self.menuView.addAction(self.actionHex_lowercase)
         self.menuView.addAction(self.actionHEX_UPPERCASE)
+        self.menuEncoding = QtWidgets.QMenu(self.menuView)
+        self.menuEncoding.setTitle("&Encoding")
+        self.menuEncoding.setObjectName("menuEncoding")
+        self._encodingGroup = QActionGroup(self)
+        self._encodingGroup.setExclusive(True)
+        for text, encoding in ENCODINGS:
+            action = QtWidgets.QAction(self)
+            action.setText(text)
+            action.setCheckable(True)
+            action.setData(encoding)
+            action.setStatusTip("Decode the Ascii view as %s" % text)
+            action.triggered.connect(self.onEncodingChanged)
+            self._encodingGroup.addAction(action)
+            self.menuEncoding.addAction(action)
+        self._encodingGroup.actions()[0].setChecked(True)
+        self.menuView.addSeparator()
+        self.menuView.addAction(self.menuEncoding.menuAction())
+        self.menuView.addAction(self.actionMicroseconds)
+
+        self.menuOverflow = QtWidgets.QMenu(self.menuMenu)
+        self.menuOverflow.setTitle("Receive &Overflow")
+        self.menuOverflow.setObjectName("menuOverflow")
+        self._overflowGroup = QActionGroup(self)
+        self._overflowGroup.setExclusive(True)
+        for text, policy in OVERFLOW_POLICIES:
+            action = QtWidgets.QAction(self)
+            action.setText(text)
+            action.setCheckable(True)
+            action.setData(policy)
+            action.setChecked(policy == OVERFLOW_DROP_OLDEST)
+            action.setStatusTip("When the receive buffer is full: %s" % text)
+            action.triggered.connect(self.onOverflowChanged)
+            self._overflowGroup.addAction(action)
+            self.menuOverflow.addAction(action)
+        self.menuAutoLog = QtWidgets.QMenu(self.menuMenu)
+        self.menuAutoLog.setTitle("Auto &Log")
+        self.menuAutoLog.setObjectName("menuAutoLog")
+        self.menuAutoLog.addAction(self.actionAuto_Log)
+        self.menuAutoLog.addSeparator()
+        self._compressionGroup = QActionGroup(self)
+        self._compressionGroup.setExclusive(True)
+        for text, compression in COMPRESSIONS:
+            action = QtWidgets.QAction(self)
+            action.setText(text)
+            action.setCheckable(True)
+            action.setData(compression)
+            action.setChecked(compression == COMPRESS_GZIP)
+            action.setStatusTip("Compress closed log files: %s" % text)
+            action.triggered.connect(self.onCompressionChanged)
+            self._compressionGroup.addAction(action)
+            self.menuAutoLog.addAction(action)
+        self.menuTransfer = QtWidgets.QMenu(self.menuMenu)
+        self.menuTransfer.setTitle("File &Transfer")
+        self.menuTransfer.setObjectName("menuTransfer")
+        self._signalMapTransfer = QSignalMapper(self)
+        self._transfers = []
+        for sending in (True, False):
+            for text, protocol in PROTOCOLS:
+                action = QtWidgets.QAction(self)
+                if sending:
+                    action.setText("Send with %s..." % text)
+                    action.setStatusTip("Send files to the current tab's port with %s" % text)
+                else:
+                    action.setText("Receive with %s..." % text)
+                    action.setStatusTip("Receive files from the current tab's port with %s" % text)
+                action.triggered.connect(self._signalMapTransfer.map)
+                self._signalMapTransfer.setMapping(action, len(self._transfers))
+                self._transfers.append((sending, text, protocol))
+                self.menuTransfer.addAction(action)
+            if sending:
+                self.menuTransfer.addSeparator()
+        self.menuFraming = QtWidgets.QMenu(self.menuMenu)
+        self.menuFraming.setTitle("Receive &Framing")
+        self.menuFraming.setObjectName("menuFraming")
+        self._framingGroup = QActionGroup(self)
+        self._framingGroup.setExclusive(True)
+        for text, framing in FRAMINGS:
+            action = QtWidgets.QAction(self)
+            action.setText(text)
+            action.setCheckable(True)
+            action.setData(framing)
+            action.setChecked(framing == FRAMING_NONE)
+            action.setStatusTip("Split received data into frames: %s" % text.rstrip('.'))
+            action.triggered.connect(self.onFramingChanged)
+            self._framingGroup.addAction(action)
+            self.menuFraming.addAction(action)
+        self.menuMenu.addAction(self.actionOpen_Tab)
         self.menuMenu.addAction(self.actionOpen_Cmd_File)
+        self.menuMenu.addAction(self.actionFile_Send_Options)
+        self.menuMenu.addAction(self.menuTransfer.menuAction())
         self.menuMenu.addAction(self.actionSave_Log)
+        self.menuMenu.addAction(self.menuAutoLog.menuAction())
         self.menuMenu.addSeparator()
         #self.menuMenu.addAction(self.actionPort_Config_Panel)
         self.menuMenu.addAction(self.actionQuick_Send_Panel)
         self.menuMenu.addAction(self.actionSend_Hex_Panel)
+        self.menuMenu.addAction(self.actionStatistics_Panel)
+        self.menuMenu.addAction(self.actionExport_Metrics)
         self.menuMenu.addAction(self.menuView.menuAction())
         self.menuMenu.addAction(self.actionLocal_Echo)
+        self.menuMenu.addAction(self.actionLow_Latency)
+        self.menuMenu.addAction(self.menuOverflow.menuAction())
+        self.menuMenu.addAction(self.menuFraming.menuAction())
+        self.menuMenu.addAction(self.actionCapture)
         self.menuMenu.addAction(self.actionAlways_On_Top)
         self.menuMenu.addSeparator()
         self.menuMenu.addAction(self.actionAbout)
@@ -262,7 +532,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.actionSend_BF = QtWidgets.QAction(self)
         self.actionSend_BF.setText("Bin/HEX file")
-        self.actionSend_BF.setStatusTip("Send a Bin/HEX file")
+        self.actionSend_BF.setStatusTip("Send a binary file, or the image in an Intel HEX or S-record file")
 
         self.sendOptMenu.addAction(self.actionSend_Hex)
         self.sendOptMenu.addAction(self.actionSend_Asc)
@@ -453,7 +723,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 color: #444444;
                 background-color: %(TableView_Header)s;
             }
-            QTextEdit {
+            QTextEdit, OutputView {
                 background-color:white;
                 color:%(TextColor)s;
                 border-top: none;
@@ -838,10 +1108,43 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         ET.SubElement(PortCfg, "stopbits").text = self.cmbStopBits.currentText()
         ET.SubElement(PortCfg, "rtscts").text = self.chkRTSCTS.isChecked() and "on" or "off"
         ET.SubElement(PortCfg, "xonxoff").text = self.chkXonXoff.isChecked() and "on" or "off"
+        ET.SubElement(PortCfg, "interbytegap").text = str(self.spnGap.value())
 
         View = ET.SubElement(GUISettings, "View")
         ET.SubElement(View, "LocalEcho").text = self.actionLocal_Echo.isChecked() and "on" or "off"
+        ET.SubElement(View, "LowLatency").text = self.actionLow_Latency.isChecked() and "on" or "off"
+        ET.SubElement(View, "Capture").text = self.actionCapture.isChecked() and "on" or "off"
         ET.SubElement(View, "ReceiveView").text = self._viewGroup.checkedAction().text()
+        ET.SubElement(View, "HexGroup").text = str(self.formatter.hexGroup())
+        ET.SubElement(View, "Microseconds").text = self.actionMicroseconds.isChecked() and "on" or "off"
+        ET.SubElement(View, "Encoding").text = self.formatter.encoding()
+        ET.SubElement(View, "RenderRate").text = str(self.renderer.rate())
+        maxLines, maxChars = self.txtEdtOutput.limits()
+        ET.SubElement(View, "ScrollbackLines").text = str(maxLines)
+        ET.SubElement(View, "ScrollbackChars").text = str(maxChars)
+
+        Receive = ET.SubElement(GUISettings, "Receive")
+        ET.SubElement(Receive, "Overflow").text = self._overflowGroup.checkedAction().text()
+        ET.SubElement(Receive, "Framing").text = self._framing
+        FrameOptions = ET.SubElement(Receive, "FrameOptions")
+        for framing, options in self._frameOptions.items():
+            ET.SubElement(FrameOptions, framing).text = format_options(options)
+
+        Metrics = ET.SubElement(GUISettings, "Metrics")
+        ET.SubElement(Metrics, "Enabled").text = self.actionExport_Metrics.isChecked() and "on" or "off"
+        for key, value in self._metricsExport.items():
+            ET.SubElement(Metrics, key).text = str(value)
+
+        AutoLog = ET.SubElement(GUISettings, "AutoLog")
+        ET.SubElement(AutoLog, "Enabled").text = self.actionAuto_Log.isChecked() and "on" or "off"
+        ET.SubElement(AutoLog, "Compression").text = self._compressionGroup.checkedAction().text()
+        ET.SubElement(AutoLog, "Directory").text = self._autoLogDir
+        ET.SubElement(AutoLog, "RotateMB").text = str(self._autoLogRotate[0])
+        ET.SubElement(AutoLog, "RotateMinutes").text = str(self._autoLogRotate[1])
+
+        FileSend = ET.SubElement(GUISettings, "FileSend")
+        for key, value in self._fileSend.items():
+            ET.SubElement(FileSend, key).text = str(value)
 
         with open(get_config_path(appInfo.title+'.xml'), 'w') as f:
             f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
@@ -887,6 +1190,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             else:
                 self.chkXonXoff.setChecked(False)
 
+            interbytegap = tree.findtext('GUISettings/PortConfig/interbytegap', default='2')
+            if interbytegap.isdigit():
+                self.spnGap.setValue(int(interbytegap))
+
             LocalEcho = tree.findtext('GUISettings/View/LocalEcho', default='off')
             if 'on' == LocalEcho:
                 self.actionLocal_Echo.setChecked(True)
@@ -895,6 +1202,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 self.actionLocal_Echo.setChecked(False)
                 self._localEcho = False
 
+            LowLatency = tree.findtext('GUISettings/View/LowLatency', default='on')
+            self.actionLow_Latency.setChecked('on' == LowLatency)
+            self.onLowLatency()
+
+            Capture = tree.findtext('GUISettings/View/Capture', default='on')
+            self.actionCapture.setChecked('on' == Capture)
+
             ReceiveView = tree.findtext('GUISettings/View/ReceiveView', default='HEX(UPPERCASE)')
             if 'Ascii' in ReceiveView:
                 self.actionAscii.setChecked(True)
@@ -905,14 +1219,99 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             elif 'UPPERCASE' in ReceiveView:
                 self.actionHEX_UPPERCASE.setChecked(True)
                 self._viewMode = VIEWMODE_HEX_UPPERCASE
-            self.readerThread.setViewMode(self._viewMode)
+            self.formatter.setViewMode(self._viewMode)
+
+            HexGroup = tree.findtext('GUISettings/View/HexGroup', default='1')
+            if HexGroup.isdigit():
+                self.formatter.setHexGroup(int(HexGroup))
+
+            Microseconds = tree.findtext('GUISettings/View/Microseconds', default='off')
+            self.actionMicroseconds.setChecked('on' == Microseconds)
+            self.formatter.setTimestampDigits(6 if 'on' == Microseconds else 3)
+
+            Encoding = tree.findtext('GUISettings/View/Encoding', default='utf-8')
+            for action in self._encodingGroup.actions():
+                if action.data() == Encoding:
+                    action.setChecked(True)
+                    self.formatter.setEncoding(Encoding)
+
+            RenderRate = tree.findtext('GUISettings/View/RenderRate', default=str(RENDER_RATE))
+            if RenderRate.isdigit():
+                self.renderer.setRate(int(RenderRate))
+
+            maxLines = tree.findtext('GUISettings/View/ScrollbackLines', default=str(SCROLLBACK_LINES))
+            maxChars = tree.findtext('GUISettings/View/ScrollbackChars', default=str(SCROLLBACK_CHARS))
+            if maxLines.isdigit() and maxChars.isdigit():
+                self.txtEdtOutput.setLimits(int(maxLines), int(maxChars))
+
+            Overflow = tree.findtext('GUISettings/Receive/Overflow', default='Drop Oldest')
+            for action in self._overflowGroup.actions():
+                if action.text() == Overflow:
+                    action.setChecked(True)
+                    self.rxBuffer.setPolicy(action.data())
+
+            for FrameOptions in tree.findall('GUISettings/Receive/FrameOptions/*'):
+                try:
+                    self._frameOptions[FrameOptions.tag] = parse_options(FrameOptions.text or '',
+                        framer_options(FrameOptions.tag))
+                except ValueError as e:
+                    print("Exception on FrameOptions, {}".format(e))
+            Framing = tree.findtext('GUISettings/Receive/Framing', default=FRAMING_NONE)
+            for action in self._framingGroup.actions():
+                if action.data() == Framing:
+                    action.setChecked(True)
+                    self._framing = Framing
+
+            Metrics = tree.findtext('GUISettings/Metrics/Enabled', default='off')
+            self.actionExport_Metrics.setChecked('on' == Metrics)
+            for key, value in self._metricsExport.items():
+                text = tree.findtext('GUISettings/Metrics/' + key, default=str(value))
+                if isinstance(value, int):
+                    if text.isdigit():
+                        self._metricsExport[key] = int(text)
+                else:
+                    self._metricsExport[key] = text
+
+            AutoLog = tree.findtext('GUISettings/AutoLog/Enabled', default='off')
+            self.actionAuto_Log.setChecked('on' == AutoLog)
+
+            Compression = tree.findtext('GUISettings/AutoLog/Compression', default='gzip (.gz)')
+            for action in self._compressionGroup.actions():
+                if action.text() == Compression:
+                    action.setChecked(True)
+
+            self._autoLogDir = tree.findtext('GUISettings/AutoLog/Directory', default='')
+            rotateMB = tree.findtext('GUISettings/AutoLog/RotateMB', default=str(AUTOLOG_ROTATE_MB))
+            rotateMinutes = tree.findtext('GUISettings/AutoLog/RotateMinutes', default=str(AUTOLOG_ROTATE_MINUTES))
+            if rotateMB.isdigit() and rotateMinutes.isdigit():
+                self._autoLogRotate = (int(rotateMB), int(rotateMinutes))
+
+            for key, value in self._fileSend.items():
+                text = tree.findtext('GUISettings/FileSend/' + key, default=str(value))
+                if key == 'Firmware':
+                    if text in [mode for name, mode in FIRMWARE_MODES]:
+                        self._fileSend[key] = text
+                elif text.isdigit():
+                    self._fileSend[key] = max(1, int(text)) if key == 'ChunkSize' else int(text)
+            self._fileSend['FillByte'] &= 0xff
 
     def closeEvent(self, event):
+        self.stopFileSend()
+        self.stopTransfer()
         if self.serialport.isOpen():
             self.closePort()
+        while self.sessions:
+            self.onCloseTab(self.portTabs.indexOf(self.sessions[-1]))
+        self.ioMux.close()
         self.saveLayout()
         self.saveQuickSend()
         self.saveSettings()
+        if self.saveLogThread.isRunning():
+            self.saveLogThread.cancel()
+            self.saveLogThread.wait()
+        self.stopCapture()
+        self.stopAutoLog()
+        self.stopMetricsExport()
         event.accept()
 
     def initQuickSend(self):
@@ -956,24 +1355,42 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.quickSendTable.item(row, 2).setText(dat)
 
         self.quickSendTable.setRowHeight(row, 20)
+        self.compileQuickSend(row)
+
+    def compileQuickSend(self, row):
+        """turn a row into bytes now rather than on each send"""
+        item = self.quickSendTable.item(row, 2)
+        form = self.quickSendTable.cellWidget(row, 1)
+        if item is None or form is None:
+            self.quickSendCache.invalidate(row)
+        else:
+            self.quickSendCache.compile(row, form.text(), item.text())
+
+    def onQuickSendEdited(self, item):
+        if item.column() == 2:
+            self.compileQuickSend(item.row())
+
+    def setQuickSendForm(self, form):
+        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText(form)
+        self.compileQuickSend(self._quickSendOptRow)
 
     def onSetSendHex(self):
-        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText('H')
+        self.setQuickSendForm(FORM_HEX)
 
     def onSetSendAsc(self):
-        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText('A')
+        self.setQuickSendForm(FORM_ASCII)
         
     def onSetSendAscS(self):
-        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText('AS')
+        self.setQuickSendForm(FORM_ASCII_ESCAPED)
 
     def onSetSendHF(self):
-        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText('HF')
+        self.setQuickSendForm(FORM_HEX_FILE)
 
     def onSetSendAF(self):
-        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText('AF')
+        self.setQuickSendForm(FORM_ASCII_FILE)
 
     def onSetSendBF(self):
-        self.quickSendTable.cellWidget(self._quickSendOptRow, 1).setText('BF')
+        self.setQuickSendForm(FORM_BINARY_FILE)
 
     def onQuickSendOptions(self, row):
         self._quickSendOptRow = row
@@ -1029,38 +1446,172 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             #self.quickSendTable.resizeRowsToContents()
 
     def onQuickSend(self, row):
-        if self.serialport.isOpen():
-            if self.quickSendTable.item(row, 2) is not None:
-                tablestring = self.quickSendTable.item(row, 2).text()
-                form = self.quickSendTable.cellWidget(row, 1).text()
-                if 'H' == form:
-                    self.transmitHex(tablestring)
-                elif 'A' == form:
-                    self.transmitAsc(tablestring)
-                elif 'AS' == form:
-                    self.transmitAscS(tablestring)
-                else:
-                    self.transmitFile(tablestring, form)
+        if self.currentPort().isOpen():
+            entry = self.quickSendCache.get(row)
+            if entry is None:
+                self.compileQuickSend(row)
+                entry = self.quickSendCache.get(row)
+            if entry is None:
+                return
+            form, payload, text, error = entry
+            if error is not None:
+                QMessageBox.critical(self.defaultStyleWidget, "Error", error, QMessageBox.Close)
+            elif payload is None:
+                self.transmitFile(text, form)
+            elif payload:
+                self.transmitBytearray(payload, payload_flags(form, self.formatter.modbus()))
 
     def transmitFile(self, filepath, form):
+        """stream a file to the current tab's port on the transmit thread"""
+        if self.transmitThread.isRunning() or self.transferThread.isRunning():
+            QMessageBox.information(self.defaultStyleWidget, "Send File", "A file is already being sent.")
+            return
         try:
-            with open(filepath, 'rb' if 'BF' == form else 'rt') as f:
-                self.appendOutputText("\n%s sending %s [%s]" % (self.timestamp(), filepath, form), Qt.blue)
-                self.repaint()
-                
-                content = f.read()
-                sent_len = 0
-                if 'HF' == form:
-                    sent_len = self.transmitHex(content, echo = False)
-                elif 'AF' == form:
-                    sent_len = self.transmitAsc(content, echo = False)
-                elif 'BF' == form:
-                    sent_len = self.transmitBytearray(content)
-                
-                self.appendOutputText("\n%s %d bytes sent" % (self.timestamp(), sent_len), Qt.blue)
+            chunks = file_chunks(filepath, form, self._fileSend['ChunkSize'],
+                                 self._fileSend['Firmware'], self._fileSend['FillByte'])
         except IOError as e:
             print("({})".format(e))
             QMessageBox.critical(self.defaultStyleWidget, "Open failed", str(e), QMessageBox.Close)
+            return
+        session = self.currentSession()
+        self._fileSendTarget = self if session is None else session
+        if FORM_HEX_FILE == form:
+            self._fileSendFlags = make_flags(VIEWMODE_HEX_UPPERCASE, hidden = True, modbus = self.formatter.modbus())
+        elif FORM_ASCII_FILE == form:
+            self._fileSendFlags = make_flags(VIEWMODE_ASCII, 'latin-1', hidden = True)
+        else:
+            self._fileSendFlags = FLAG_HIDDEN
+        self._fileSendBytes = 0
+        self._fileSendTarget.appendOutputText("\n%s sending %s [%s]" % (self.timestamp(), filepath, form), Qt.blue)
+        self.transmitBar.start(os.path.basename(filepath))
+        self.transmitThread.start(self.currentPort(), chunks, self._fileSend['DelayMs'] / 1000.0)
+
+    def onFileSent(self, data, t):
+        if self._fileSendTarget is not None:
+            self._fileSendBytes += len(data)
+            self._fileSendTarget.onTransmit(data, t, self._fileSendFlags)
+
+    def onFileSendDone(self, completed, error):
+        self.transmitBar.hide()
+        target = self._fileSendTarget
+        self._fileSendTarget = None
+        if target is None:
+            return
+        if error:
+            target.appendOutputText("\n%s send failed after %d bytes, %s" % (
+                self.timestamp(), self._fileSendBytes, error), Qt.red)
+            QMessageBox.critical(self.defaultStyleWidget, "Send failed", error, QMessageBox.Close)
+        elif completed:
+            target.appendOutputText("\n%s %d bytes sent" % (self.timestamp(), self._fileSendBytes), Qt.blue)
+        else:
+            target.appendOutputText("\n%s send cancelled after %d bytes" % (
+                self.timestamp(), self._fileSendBytes), Qt.blue)
+
+    def stopFileSend(self, port = None):
+        """cancel a file send, to port only if given, and wait for it"""
+        if self.transmitThread.isRunning() and port in (None, self.transmitThread.port()):
+            self.transmitThread.stop()
+            self.transmitBar.hide()
+
+    def onTransfer(self, index):
+        """send or receive files on the current tab's port with a protocol
+        from the File Transfer menu"""
+        sending, text, protocol = self._transfers[index]
+        port = self.currentPort()
+        if not port.isOpen():
+            QMessageBox.information(self.defaultStyleWidget, "File Transfer", "Open the port first.")
+            return
+        if self.transmitThread.isRunning() or self.transferThread.isRunning():
+            QMessageBox.information(self.defaultStyleWidget, "File Transfer", "A file is already being sent.")
+            return
+        if sending and protocol in BATCH_PROTOCOLS:
+            paths, _ = QFileDialog.getOpenFileNames(self.defaultStyleWidget, "Send with %s" % text)
+        elif sending:
+            path, _ = QFileDialog.getOpenFileName(self.defaultStyleWidget, "Send with %s" % text)
+            paths = [path] if path else []
+        elif protocol in BATCH_PROTOCOLS:
+            path = QFileDialog.getExistingDirectory(self.defaultStyleWidget, "Receive with %s into" % text)
+            paths = [path] if path else []
+        else:
+            path, _ = QFileDialog.getSaveFileName(self.defaultStyleWidget, "Receive with %s to" % text)
+            paths = [path] if path else []
+        if not paths:
+            return
+        if sending:
+            job = lambda progress, cancelled: send_files(port, protocol, paths, progress, cancelled)
+        else:
+            job = lambda progress, cancelled: receive_files(port, protocol, paths[0], progress, cancelled)
+        session = self.currentSession()
+        self._transferTarget = self if session is None else session
+        self._transferName = text
+        # the protocol owns the port's input until it is done
+        self.transferReader().join()
+        self._transferTarget.appendOutputText("\n%s %s with %s: %s" % (self.timestamp(),
+            'sending' if sending else 'receiving', text, ', '.join(paths)), Qt.blue)
+        self.transmitBar.start("%s..." % text, pausable = False)
+        self.transferThread.start(port, job)
+
+    def transferReader(self):
+        """the reader of the port the transfer runs on"""
+        return self.portReader if self._transferTarget is self else self._transferTarget.reader
+
+    def onTransferFileStarted(self, name):
+        self.transmitBar.setTitle("%s %s" % (self._transferName, name))
+
+    def onTransferDone(self, completed, error, paths):
+        self.transmitBar.hide()
+        target = self._transferTarget
+        if target is None:
+            return
+        if target.serialport.isOpen():
+            self.transferReader().start()
+        self._transferTarget = None
+        if error:
+            target.appendOutputText("\n%s %s transfer failed, %s" % (
+                self.timestamp(), self._transferName, error), Qt.red)
+            QMessageBox.critical(self.defaultStyleWidget, "Transfer failed", error, QMessageBox.Close)
+        elif completed:
+            target.appendOutputText("\n%s %s transfer done: %s" % (
+                self.timestamp(), self._transferName, ', '.join(paths or [])), Qt.blue)
+        else:
+            target.appendOutputText("\n%s %s transfer cancelled" % (
+                self.timestamp(), self._transferName), Qt.blue)
+
+    def stopTransfer(self, port = None):
+        """cancel a protocol transfer, on port only if given, and wait for it"""
+        if self.transferThread.isRunning() and port in (None, self.transferThread.port()):
+            self.transferThread.stop()
+            self.transmitBar.hide()
+
+    def onFileSendOptions(self):
+        chunkSize, ok = QInputDialog.getInt(self.defaultStyleWidget, "File Send Options",
+            "Bytes written at a time:", self._fileSend['ChunkSize'], 1, 1 << 20)
+        if not ok:
+            return
+        delay, ok = QInputDialog.getInt(self.defaultStyleWidget, "File Send Options",
+            "Pause after each chunk (ms):", self._fileSend['DelayMs'], 0, 60000)
+        if not ok:
+            return
+        names = [name for name, mode in FIRMWARE_MODES]
+        current = [mode for name, mode in FIRMWARE_MODES].index(self._fileSend['Firmware'])
+        name, ok = QInputDialog.getItem(self.defaultStyleWidget, "File Send Options",
+            "Intel HEX and S-record files in Bin/HEX form:", names, current, False)
+        if not ok:
+            return
+        firmware = dict(FIRMWARE_MODES)[name]
+        fill = self._fileSend['FillByte']
+        if firmware == FIRMWARE_FLAT:
+            text, ok = QInputDialog.getText(self.defaultStyleWidget, "File Send Options",
+                "Fill gaps with (hex):", text = '%02X' % fill)
+            if not ok:
+                return
+            try:
+                fill = int(text, 16) & 0xff
+            except ValueError:
+                QMessageBox.critical(self.defaultStyleWidget, "Error",
+                    "'%s' is not hexadecimal." % text, QMessageBox.Close)
+                return
+        self._fileSend.update(ChunkSize=chunkSize, DelayMs=delay, Firmware=firmware, FillByte=fill)
 
     def onPeriodicSend(self):
         if self._is_periodic_send:
@@ -1083,50 +1634,43 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.onSend()
     
     def onSend(self):
-        if self.serialport.isOpen():
+        if self.currentPort().isOpen():
             sendstring = self.txtEdtInput.toPlainText()
             self.transmitHex(sendstring)
 
     def transmitHex(self, hexstring, echo = True):
         if len(hexstring) > 0:
-            hexarray = []
-            _hexstring = hexstring.replace(' ', '')
-            _hexstring = _hexstring.replace('\r', '')
-            _hexstring = _hexstring.replace('\n', '')
-            for i in range(0, len(_hexstring), 2):
-                word = _hexstring[i:i+2]
-                if is_hex(word):
-                    hexarray.append(int(word, 16))
-                else:
-                    QMessageBox.critical(self.defaultStyleWidget, "Error",
-                        "'%s' is not hexadecimal." % (word), QMessageBox.Close)
-                    return 0
-            if echo:
-                text = ''.join('%02X ' % t for t in hexarray)
-                self.appendOutputText("\n%s Tx:%s" % (self.timestamp(), text), Qt.blue)
-            return self.transmitBytearray(bytearray(hexarray))
+            try:
+                payload = hex_payload(hexstring)
+            except ValueError as e:
+                QMessageBox.critical(self.defaultStyleWidget, "Error", str(e), QMessageBox.Close)
+                return 0
+            flags = make_flags(VIEWMODE_HEX_UPPERCASE, hidden = not echo, modbus = self.formatter.modbus())
+            return self.transmitBytearray(payload, flags)
 
     def transmitAsc(self, text, echo = True):
         if len(text) > 0:
-            byteArray = [ord(char) for char in text]
-            if echo:
-                self.appendOutputText("\n%s Tx:%s" % (self.timestamp(), text), Qt.blue)
-            return self.transmitBytearray(bytearray(byteArray))
+            flags = make_flags(VIEWMODE_ASCII, 'latin-1', hidden = not echo)
+            return self.transmitBytearray(ascii_payload(text), flags)
 
     def transmitAscS(self, text, echo = True):
         if len(text) > 0:
-            t = text.replace(r'\r', '\r')
-            t = t.replace(r'\n', '\n')
-            t = t.replace(r'\t', '\t')
-            t = t.replace(r'\'', "'")
-            t = t.replace(r'\"', '"')
-            t = t.replace(r'\\', '\\')
-            self.transmitAsc(t, echo)
-
-    def transmitBytearray(self, byteArray):
-        if self.serialport.isOpen():
+            flags = make_flags(VIEWMODE_ASCII, 'latin-1', hidden = not echo)
+            return self.transmitBytearray(escaped_payload(text), flags)
+
+    def transmitBytearray(self, byteArray, flags = FLAG_HIDDEN):
+        """write byteArray to the current tab's port, echoing it as flags says"""
+        session = self.currentSession()
+        if self.currentPort() in (self.transmitThread.port(), self.transferThread.port()):
+            self.statusbar.showMessage("The port is busy with a file transfer", 3000)
+            return 0
+        if self.currentPort().isOpen():
             try:
-                self.serialport.write(byteArray)
+                if session is not None:
+                    session.transmit(byteArray, flags)
+                else:
+                    self.serialport.write(byteArray)
+                    self.onTransmit(bytes(byteArray), now_ns(), flags)
             except Exception as e:
                 QMessageBox.critical(self.defaultStyleWidget,
                     "Exception in transmit", str(e), QMessageBox.Close)
@@ -1136,50 +1680,223 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 return len(byteArray)
 
     def onReaderExcept(self, e):
+        self._readerErrors += 1
         self.closePort()
         QMessageBox.critical(self.defaultStyleWidget, "Read failed", str(e), QMessageBox.Close)
 
-    def timestamp(self):
-        ts = datetime.datetime.now().time()
-        if ts.microsecond:
-            return ts.isoformat()[:-3]
+    def timestamp(self, t = None):
+        return format_timestamp(t, self.formatter.timestampDigits())
+
+    def onReadyRead(self):
+        while True:
+            chunks = self.rxBuffer.get()
+            if not chunks:
+                break
+            for data, t in chunks:
+                self.onReceive(data, t)
+        dropped = self.rxBuffer.droppedBytes
+        if dropped != self._rxDropped:
+            self.appendOutputText("\n%s %d bytes dropped, receive buffer full" % (
+                self.timestamp(), dropped - self._rxDropped), Qt.red)
+            self._rxDropped = dropped
+
+    def onRendered(self):
+        if self._renderLagStart is not None:
+            now = now_ns()
+            self.metrics.rendered(now - self._renderLagStart, now)
+            self._renderLagStart = None
+
+    def onMetricsTimer(self):
+        now = now_ns()
+        stats = self.rxBuffer.stats()
+        self.metrics.sample(now, stats['depth'], stats['droppedBytes'],
+                            self._readerErrors + self.portReader.framer().errors)
+        summary = self.metrics.summary(now)
+        shown = self.metrics, summary
+        current = self.currentSession()
+        for session in self.sessions:
+            sessionSummary = session.sampleMetrics(now)
+            if session is current:
+                shown = session.metrics, sessionSummary
+        self.lblMetrics.setText(status_text(shown[1]))
+        if self.metricsPanel.isVisible():
+            self.metricsPanel.showMetrics(shown[0], shown[1], now)
+        counter = self.portCounters.get(self.serialport.portstr)
+        if counter is not None:
+            counter.update(self.serialport.isOpen(), stats['depth'], stats['capacity'],
+                rxBytes = summary['rxTotal'], txBytes = summary['txTotal'],
+                frames = self.metrics.rxChunks.total, errors = summary['errors'],
+                droppedBytes = summary['dropped'])
+        if self.metricsExporter is not None:
+            self.metricsExporter.publish(self.portCounters.values())
+
+    def portCounter(self, port = None):
+        """the run-long counters of a port, the main one by default"""
+        if port is None:
+            port = self.serialport.portstr
+        if port not in self.portCounters:
+            self.portCounters[port] = PortCounters(port)
+        return self.portCounters[port]
+
+    def onExportMetrics(self):
+        if not self.actionExport_Metrics.isChecked():
+            self.stopMetricsExport()
+        elif self.metricsExporter is None:
+            self.startMetricsExport()
+
+    def startMetricsExport(self):
+        try:
+            self.metricsExporter = MetricsExporter(self._metricsExport['HttpPort'],
+                                                   self._metricsExport['Bind'],
+                                                   self._metricsExport['TextFile'],
+                                                   self._metricsExport['Interval'])
+        except (IOError, OSError) as e:
+            print("Exception on startMetricsExport, {}".format(e))
+            self.metricsExporter = None
+            self.actionExport_Metrics.setChecked(False)
+            QMessageBox.critical(self.defaultStyleWidget, "Export Metrics failed", str(e), QMessageBox.Close)
         else:
-            return ts.isoformat() + '.000'
-
-    def onReceive(self, data):
-        self.appendOutputText("\n%s R<-:%s" % (self.timestamp(), data))
+            self.onMetricsTimer()
+
+    def stopMetricsExport(self):
+        if self.metricsExporter is not None:
+            self.metricsExporter.close()
+            self.metricsExporter = None
+
+    def captureRecord(self, data, t, direction, flags):
+        self.capture.append(data, t, direction, flags, record_lines(direction, flags, data))
+        self.renderer.schedule()
+
+    def onReceive(self, data, t):
+        self.metrics.received(len(data), t)
+        if self._renderLagStart is None:
+            self._renderLagStart = t
+        if self.autoLog is not None:
+            self.autoLog.log(t, DIR_RX, self.formatter.flags(), data)
+        if self.capture is not None:
+            self.captureRecord(data, t, DIR_RX, self.formatter.flags())
+        else:
+            text = self.formatter.format(data)
+            if text:
+                self.appendOutputText("\n%s R<-:%s" % (self.timestamp(t), text))
+
+    def onTransmit(self, data, t, flags):
+        self.metrics.transmitted(len(data), t)
+        if self.autoLog is not None:
+            self.autoLog.log(t, DIR_TX, flags, data)
+        if self.capture is not None:
+            self.captureRecord(data, t, DIR_TX, flags)
+        elif not flags & FLAG_HIDDEN:
+            self.appendOutputText("\n%s Tx:%s" % (self.timestamp(t), render_data(flags, data)), Qt.blue)
 
     def appendOutputText(self, data, color=Qt.black):
-        # the qEditText's "append" methon will add a unnecessary newline.
-        # self.txtEdtOutput.append(data.decode('utf-8'))
-
-        tc=self.txtEdtOutput.textColor()
-        self.txtEdtOutput.moveCursor(QtGui.QTextCursor.End)
-        self.txtEdtOutput.setTextColor(QtGui.QColor(color))
-        self.txtEdtOutput.insertPlainText(data)
-        self.txtEdtOutput.moveCursor(QtGui.QTextCursor.End)
-        self.txtEdtOutput.setTextColor(tc)
+        if self.capture is not None:
+            # captured as a note, its own text already starts with a timestamp
+            if data.startswith('\n'):
+                data = data[1:]
+            self.captureRecord(data.encode('utf-8'), now_ns(), DIR_NOTE, int(color))
+        else:
+            # batched by the renderer, handed to txtEdtOutput once per frame
+            self.renderer.append(data, color)
 
     def getPort(self):
         return self.cmbPort.currentText()
 
+    def portConfig(self):
+        """the settings in the port bar"""
+        return PortConfig(self.getPort(), self.cmbBaudRate.currentText(),
+                          self.cmbDataBits.currentText(), self.cmbParity.currentText(),
+                          self.cmbStopBits.currentText(), self.chkRTSCTS.isChecked(),
+                          self.chkXonXoff.isChecked(), self.spnGap.value())
+
+    def currentSession(self):
+        """the session in the current tab, None for the main port"""
+        widget = self.portTabs.currentWidget()
+        return widget if widget in self.sessions else None
+
+    def currentPort(self):
+        """the serial port sends go to"""
+        session = self.currentSession()
+        return self.serialport if session is None else session.serialport
+
+    def openPorts(self):
+        ports = [session.serialport.portstr for session in self.sessions if session.isOpen()]
+        if self.serialport.isOpen():
+            ports.append(self.serialport.portstr)
+        return ports
+
+    def onOpenTab(self):
+        inUse = self.openPorts()
+        ports = [port for port, desc, hwid in sorted(comports()) if port not in inUse]
+        port, ok = QInputDialog.getItem(self.defaultStyleWidget, "Open Port in New Tab",
+            "Port (settings as in the port bar):", ports, 0, True)
+        if not ok or not port:
+            return
+        if port in inUse:
+            QMessageBox.information(self.defaultStyleWidget, "Open Port in New Tab",
+                "%s is already open." % port)
+            return
+        self.openSession(port)
+
+    def openSession(self, port):
+        """open port in a new tab with the port bar's settings"""
+        config = self.portConfig()
+        config.port = port
+        session = PortSession(self.ioMux, config, RX_BUFFER_SIZE, self)
+        session.output.setFont(self.txtEdtOutput.font())
+        session.output.setTabWidth(self.txtEdtOutput.tabWidth())
+        session.output.setLimits(*self.txtEdtOutput.limits())
+        session.renderer.setRate(self.renderer.rate())
+        session.rxBuffer.setPolicy(self.rxBuffer.policy())
+        session.counter = self.portCounter(port)
+        self.applySessionSettings(session)
+        self.updateFramer(session)
+        try:
+            session.open()
+        except Exception as e:
+            session.deleteLater()
+            QMessageBox.critical(self.defaultStyleWidget,
+                "Could not open serial port", str(e), QMessageBox.Close)
+            return None
+        if self.autoLog is not None:
+            session.setAutoLog(self.newAutoLogger(port))
+        self.sessions.append(session)
+        self.portTabs.setCurrentIndex(self.portTabs.addTab(session, session.title()))
+        return session
+
+    def onCloseTab(self, index):
+        session = self.portTabs.widget(index)
+        if session not in self.sessions:
+            return
+        self.stopFileSend(session.serialport)
+        self.stopTransfer(session.serialport)
+        if self._fileSendTarget is session:
+            self._fileSendTarget = None
+        if self._transferTarget is session:
+            self._transferTarget = None
+        self.sessions.remove(session)
+        self.portTabs.removeTab(index)
+        session.close()
+        session.sampleMetrics(now_ns())
+        session.deleteLater()
+
+    def applySessionSettings(self, session):
+        """give a session the main port's view and receive settings"""
+        session.formatter.setViewMode(self.formatter.viewMode())
+        session.formatter.setHexGroup(self.formatter.hexGroup())
+        session.formatter.setTimestampDigits(self.formatter.timestampDigits())
+        session.formatter.setEncoding(self.formatter.encoding())
+        session.reader.setReadMode(READMODE_EVENT if self.actionLow_Latency.isChecked() else READMODE_POLLING)
+        session.reader.setInterByteGap(self.spnGap.value() / 1000.0)
+
     def getDataBits(self):
-        return {'5':serial.FIVEBITS,
-                '6':serial.SIXBITS,
-                '7':serial.SEVENBITS, 
-                '8':serial.EIGHTBITS}[self.cmbDataBits.currentText()]
+        return DATABITS[self.cmbDataBits.currentText()]
 
     def getParity(self):
-        return {'None' :serial.PARITY_NONE,
-                'Even' :serial.PARITY_EVEN,
-                'Odd'  :serial.PARITY_ODD,
-                'Mark' :serial.PARITY_MARK,
-                'Space':serial.PARITY_SPACE}[self.cmbParity.currentText()]
+        return PARITIES[self.cmbParity.currentText()]
 
     def getStopBits(self):
-        return {'1'  :serial.STOPBITS_ONE,
-                '1.5':serial.STOPBITS_ONE_POINT_FIVE,
-                '2'  :serial.STOPBITS_TWO}[self.cmbStopBits.currentText()]
+        return STOPBITS[self.cmbStopBits.currentText()]
 
     def openPort(self):
         if self.serialport.isOpen():
@@ -1195,22 +1912,29 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             QMessageBox.information(self.defaultStyleWidget, "Invalid parameters", "Baudrate is empty.")
             return
 
-        self.serialport.port     = _port
-        self.serialport.baudrate = _baudrate
-        self.serialport.bytesize = self.getDataBits()
-        self.serialport.stopbits = self.getStopBits()
-        self.serialport.parity   = self.getParity()
-        self.serialport.rtscts   = self.chkRTSCTS.isChecked()
-        self.serialport.xonxoff  = self.chkXonXoff.isChecked()
-        self.serialport.timeout  = 0.5
+        if _port in self.openPorts():
+            QMessageBox.information(self.defaultStyleWidget, "Invalid parameters",
+                "%s is already open in another tab." % _port)
+            return
+
         # self.serialport.writeTimeout = 1.0
         try:
+            # a URL gets its handler's class, so the port object is made anew
+            self.serialport = self.portConfig().create()
+            self.portReader.setPort(self.serialport)
+            self.portMonitorThread.setPort(self.serialport)
             self.serialport.open()
         except Exception as e:
             QMessageBox.critical(self.defaultStyleWidget, 
                 "Could not open serial port", str(e), QMessageBox.Close)
         else:
-            self.readerThread.start()
+            self.metrics.reset()
+            self.rxBuffer.resetStats()
+            self._rxDropped = 0
+            self._readerErrors = 0
+            self.portCounter().opened()
+            self.portReader.start()
+            self.portTabs.setTabText(0, self.serialport.portstr)
             self.setWindowTitle("%s on %s [%s, %s%s%s%s%s]" % (
                 appInfo.title,
                 self.serialport.portstr,
@@ -1230,14 +1954,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def closePort(self):
         if self.serialport.isOpen():
             self.stopPeriodicSend()
-            self.readerThread.join()
+            self.stopFileSend(self.serialport)
+            self.stopTransfer(self.serialport)
+            self.portReader.join()
             self.portMonitorThread.join()
             self.serialport.close()
+            self.portTabs.setTabText(0, MAIN_TAB_TEXT)
             self.setWindowTitle(appInfo.title)
             self.cmbPort.setEnabled(True)
             self.cmbPort.setStyleSheet('QComboBox:editable {background: white;}')
             self.btnOpen.setText('Open')
             self.btnOpen.update()
+            # count the session's last bytes before a reopen restarts it
+            self.onMetricsTimer()
 
     #def onTogglePrtCfgPnl(self):
         #if self.actionPort_Config_Panel.isChecked():
@@ -1266,9 +1995,27 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def onVisibleHexPnl(self, visible):
         self.actionSend_Hex_Panel.setChecked(visible)
 
+    def onToggleStatsPnl(self):
+        if self.actionStatistics_Panel.isChecked():
+            self.metricsPanel.show()
+            self.onMetricsTimer()
+        else:
+            self.metricsPanel.hide()
+
+    def onVisibleStatsPnl(self, visible):
+        self.actionStatistics_Panel.setChecked(visible)
+
     def onLocalEcho(self):
         self._localEcho = self.actionLocal_Echo.isChecked()
 
+    def onLowLatency(self):
+        if self.actionLow_Latency.isChecked():
+            self.portReader.setReadMode(READMODE_EVENT)
+        else:
+            self.portReader.setReadMode(READMODE_POLLING)
+        for session in self.sessions:
+            self.applySessionSettings(session)
+
     def onAlwaysOnTop(self):
         if self.actionAlways_On_Top.isChecked():
             style = self.windowFlags()
@@ -1286,15 +2033,138 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.openPort()
 
     def onClear(self):
-        self.txtEdtOutput.clear()
+        session = self.currentSession()
+        if session is not None:
+            session.clear()
+            return
+        self.renderer.discard()
+        if self.capture is not None:
+            self.startCapture()
+        else:
+            self.txtEdtOutput.clear()
+
+    def onCapture(self):
+        if self.actionCapture.isChecked():
+            if self.capture is None:
+                self.startCapture()
+        elif self.capture is not None:
+            self.stopCapture()
+            self.txtEdtOutput.setStore(ScrollbackStore())
+
+    def startCapture(self):
+        """begin a new session capture file and show it in the output pane"""
+        self.stopCapture()
+        name = 'session-%s-%d.cap' % (datetime.datetime.now().strftime('%Y%m%d-%H%M%S'), os.getpid())
+        try:
+            self.capture = CaptureStore(get_capture_path(name))
+        except (IOError, OSError) as e:
+            print("Exception on startCapture, {}".format(e))
+            self.capture = None
+            self.actionCapture.setChecked(False)
+            self.txtEdtOutput.setStore(ScrollbackStore())
+        else:
+            self.txtEdtOutput.setStore(CaptureScrollback(self.capture, self.formatter))
+
+    def stopCapture(self):
+        if self.capture is not None:
+            self.capture.close(remove = True)
+            self.capture = None
+
+    def onAutoLog(self):
+        if self.actionAuto_Log.isChecked():
+            if self.autoLog is None:
+                self.startAutoLog()
+        else:
+            self.stopAutoLog()
+
+    def newAutoLogger(self, port = None):
+        """an AutoLogger with the current settings, its files named after
+        port if given"""
+        rotateMB, rotateMinutes = self._autoLogRotate
+        prefix = appInfo.title.lower()
+        if port is not None:
+            prefix += '-' + re.sub(r'[^0-9A-Za-z]+', '_', os.path.basename(port))
+        return AutoLogger(self._autoLogDir or get_log_dir(), prefix,
+                          maxBytes = rotateMB << 20,
+                          maxSeconds = rotateMinutes * 60,
+                          compression = self._compressionGroup.checkedAction().data(),
+                          hexGroup = self.formatter.hexGroup())
+
+    def startAutoLog(self):
+        try:
+            self.autoLog = self.newAutoLogger()
+            for session in self.sessions:
+                session.setAutoLog(self.newAutoLogger(session.title()))
+        except (IOError, OSError) as e:
+            print("Exception on startAutoLog, {}".format(e))
+            self.stopAutoLog()
+            self.actionAuto_Log.setChecked(False)
+            QMessageBox.critical(self.defaultStyleWidget, "Auto Log failed", str(e), QMessageBox.Close)
+
+    def stopAutoLog(self):
+        if self.autoLog is not None:
+            self.autoLog.close()
+            self.autoLog = None
+        for session in self.sessions:
+            session.setAutoLog(None)
+
+    def onCompressionChanged(self):
+        checked = self._compressionGroup.checkedAction()
+        if checked is not None:
+            for logger in [self.autoLog] + [session.autoLog for session in self.sessions]:
+                if logger is not None:
+                    logger.setCompression(checked.data())
 
     def onSaveLog(self):
-        fileName = QFileDialog.getSaveFileName(self.defaultStyleWidget, "Save as", os.getcwd(),
-            "Log files (*.log);;Text files (*.txt);;All files (*.*)")[0]
-        if fileName:
-            import codecs
-            with codecs.open(fileName, 'w', 'utf-8') as f:
-                f.write(self.txtEdtOutput.toPlainText())
+        if self.saveLogThread.isRunning():
+            QMessageBox.information(self.defaultStyleWidget, "Save Log", "A log is already being saved.")
+            return
+        fileName, selected = QFileDialog.getSaveFileName(self.defaultStyleWidget, "Save as", os.getcwd(),
+            ";;".join(text for text, fmt in EXPORT_FILTERS))
+        if not fileName:
+            return
+        fmt = dict(EXPORT_FILTERS).get(selected, EXPORT_TEXT)
+        self.renderer.flush()
+        session = self.currentSession()
+        if session is not None:
+            if fmt != EXPORT_TEXT:
+                QMessageBox.information(self.defaultStyleWidget, "Save Log",
+                    "Raw and timestamped logs of a further port need Auto Log.")
+                return
+            session.renderer.flush()
+            lines = session.output.store.snapshot()
+            job = lambda progress, cancelled: export_lines(lines, fileName, progress, cancelled)
+        elif self.capture is not None:
+            reader = self.capture.reader()
+            hexGroup = self.formatter.hexGroup()
+            digits = self.formatter.timestampDigits()
+            job = lambda progress, cancelled: export_capture(reader, fmt, fileName,
+                hexGroup, progress, cancelled, digits)
+        elif fmt == EXPORT_TEXT:
+            lines = self.txtEdtOutput.store.snapshot()
+            job = lambda progress, cancelled: export_lines(lines, fileName, progress, cancelled)
+        else:
+            QMessageBox.information(self.defaultStyleWidget, "Save Log",
+                "Raw and timestamped logs need File > Capture Session to Disk.")
+            return
+        self.saveLogProgress = QProgressDialog("Saving %s" % fileName, "Cancel", 0, 100,
+            self.defaultStyleWidget)
+        self.saveLogProgress.setWindowTitle("Save Log")
+        self.saveLogProgress.setMinimumDuration(500)
+        self.saveLogProgress.canceled.connect(self.saveLogThread.cancel)
+        self.saveLogThread.start(job)
+
+    def onSaveLogProgress(self, done, total):
+        if self.saveLogProgress is not None and total:
+            self.saveLogProgress.setValue(done * 100 // total)
+
+    def onSaveLogDone(self, completed, error):
+        if self.saveLogProgress is not None:
+            self.saveLogProgress.reset()
+            self.saveLogProgress.deleteLater()
+            self.saveLogProgress = None
+        if error:
+            QMessageBox.critical(self.defaultStyleWidget, "Save failed", error, QMessageBox.Close)
 
     def moveScreenCenter(self):
         w = self.frameGeometry().width()
@@ -1327,6 +2197,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         idx = self.cmbPort.findText(sel)
         if idx != -1:
             self.cmbPort.setCurrentIndex(idx)
+        elif is_url(sel):
+            # network ports aren't enumerated, keep the one typed in
+            self.cmbPort.insertItem(0, sel)
+            self.cmbPort.setCurrentIndex(0)
 
     def onAbout(self):
         QMessageBox.about(self.defaultStyleWidget, "About MyTerm", appInfo.aboutme)
@@ -1366,6 +2240,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         #self.actionPort_Config_Panel.setChecked(not self.dockWidget_PortConfig.isHidden())
         self.actionQuick_Send_Panel.setChecked(not self.dockWidget_QuickSend.isHidden())
         self.actionSend_Hex_Panel.setChecked(not self.dockWidget_SendHex.isHidden())
+        self.actionStatistics_Panel.setChecked(not self.metricsPanel.isHidden())
 
     def onViewChanged(self):
         checked = self._viewGroup.checkedAction()
@@ -1380,81 +2255,102 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             elif 'UPPERCASE' in checked.text():
                 self._viewMode = VIEWMODE_HEX_UPPERCASE
 
-        self.readerThread.setViewMode(self._viewMode)
-
-def is_hex(s):
-    try:
-        int(s, 16)
-        return True
-    except ValueError:
-        return False
-
-
-
-class ReaderThread(QThread):
-    """loop and copy serial->GUI"""
-    read = pyqtSignal(str)
-    exception = pyqtSignal(str)
-
-    def __init__(self, parent=None):
-        super(ReaderThread, self).__init__(parent)
-        self._alive = False
-        self._stopped = True
-        self._serialport = None
-        self._viewMode = None
-
-    def setPort(self, port):
-        self._serialport = port
-
-    def setViewMode(self, mode):
-        self._viewMode = mode
+        self.formatter.setViewMode(self._viewMode)
+        for session in self.sessions:
+            self.applySessionSettings(session)
 
-    def start(self, priority = QThread.InheritPriority):
-        if not self._alive:
-            self._alive = True
-            super(ReaderThread, self).start(priority)
+    def onOverflowChanged(self):
+        checked = self._overflowGroup.checkedAction()
+        if checked is not None:
+            self.rxBuffer.setPolicy(checked.data())
+            for session in self.sessions:
+                session.rxBuffer.setPolicy(checked.data())
 
-    def __del__(self):
-        if self._alive:
-            self._alive = False
-            if hasattr(self._serialport, 'cancel_read'):
-                self._serialport.cancel_read()
-            else:
-                self._serialport.close()
-        if not self._stopped:
-            self.wait()
+    def onFramingChanged(self):
+        checked = self._framingGroup.checkedAction()
+        if checked is None:
+            return
+        framing = checked.data()
+        options = self.frameOptions(framing)
+        ok = True
+        if framing == FRAMING_DELIMITER:
+            text, ok = QInputDialog.getText(self.defaultStyleWidget, "Custom Delimiter",
+                r"Frames end with (escapes such as \r\n or \x03 allowed):",
+                text = delimiter_text(options['delimiter']))
+            ok = ok and bool(parse_delimiter(text))
+            if ok:
+                options['delimiter'] = parse_delimiter(text)
+        elif framing == FRAMING_FIXED:
+            options['length'], ok = QInputDialog.getInt(self.defaultStyleWidget, "Fixed Length",
+                "Bytes per frame:", options['length'], 1, MAX_FRAME)
+        elif framing == FRAMING_IDLE:
+            options['gapChars'], ok = QInputDialog.getDouble(self.defaultStyleWidget, "Idle Gap",
+                "Frames end after the line is idle for (character times):",
+                options['gapChars'], 0.5, 10000, 1)
+        elif options:
+            text, ok = QInputDialog.getText(self.defaultStyleWidget, checked.text().rstrip('.'),
+                "Options (name=value ...):", text = format_options(options))
+            if ok:
+                try:
+                    options = parse_options(text, options)
+                    create_framer(framing, **options)
+                except ValueError as e:
+                    QMessageBox.critical(self.defaultStyleWidget, "Invalid options", str(e), QMessageBox.Close)
+                    ok = False
+        if not ok:
+            for action in self._framingGroup.actions():
+                action.setChecked(action.data() == self._framing)
+            return
+        if options:
+            self._frameOptions[framing] = options
+        self._framing = framing
+        self.updateFramer()
+        for session in self.sessions:
+            self.updateFramer(session)
+
+    def frameOptions(self, framing):
+        """the options last set for framing, else its defaults"""
+        options = framer_options(framing)
+        options.update(self._frameOptions.get(framing, {}))
+        return options
+
+    def updateFramer(self, session = None):
+        """hand the reader a new framer for the current framing and port
+        settings, the main port's or session's"""
+        if session is None:
+            port, reader, formatter = self.serialport, self.portReader, self.formatter
+        else:
+            port, reader, formatter = session.serialport, session.reader, session.formatter
+        try:
+            charTime = char_time_ns(port.baudrate, port.bytesize, port.parity, port.stopbits)
+        except (TypeError, ValueError, ZeroDivisionError):
+            charTime = 0
+        try:
+            framer = create_framer(self._framing, charTime, port.baudrate,
+                                   **self.frameOptions(self._framing))
+        except ValueError as e:
+            print("Exception on updateFramer, {}".format(e))
+            framer = PassthroughFramer(charTime)
+        reader.setFramer(framer)
+        formatter.setFramed(self._framing != FRAMING_NONE)
+        formatter.setModbus(self._framing == FRAMING_MODBUS)
+
+    def onMicrosecondsChanged(self):
+        self.formatter.setTimestampDigits(6 if self.actionMicroseconds.isChecked() else 3)
+        for session in self.sessions:
+            self.applySessionSettings(session)
+        if self.capture is not None:
+            self.txtEdtOutput.store.invalidate()
+            self.txtEdtOutput.refresh()
+
+    def onEncodingChanged(self):
+        checked = self._encodingGroup.checkedAction()
+        if checked is not None:
+            self.formatter.setEncoding(checked.data())
+            for session in self.sessions:
+                self.applySessionSettings(session)
 
-    def join(self):
-        self.__del__()
 
-    def run(self):
-        self._stopped = False
-        text = str()
-        try:
-            while self._alive:
-                # read all that is there or wait for one byte
-                data = self._serialport.read(self._serialport.inWaiting() or 1)
-                if not self._alive:
-                    return
-                else:
-                    sleep(0.05)
-                if self._serialport.inWaiting():
-                    data = data + self._serialport.read(self._serialport.inWaiting())
-                if data:
-                    try:
-                        if self._viewMode == VIEWMODE_ASCII:
-                            text = data.decode('unicode_escape')
-                        elif self._viewMode == VIEWMODE_HEX_LOWERCASE:
-                            text = ''.join('%02x ' % t for t in data)
-                        elif self._viewMode == VIEWMODE_HEX_UPPERCASE:
-                            text = ''.join('%02X ' % t for t in data)
-                    except UnicodeDecodeError:
-                        pass
-                    else:
-                        self.read.emit(text)
-        except Exception as e:
-            self.exception.emit('{}'.format(e))
-        self._stopped = True
 
 class PortMonitorThread(QThread):
     portPlugOut = pyqtSignal()
@@ -1494,6 +2390,35 @@ class PortMonitorThread(QThread):
                 self.exception.emit('{}'.format(e))
         self._stopped = True
 
+class SaveLogThread(QThread):
+    """run a log export job off the GUI thread"""
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(bool, str)
+
+    def __init__(self, parent=None):
+        super(SaveLogThread, self).__init__(parent)
+        self._job = None
+        self._cancelled = False
+
+    def start(self, job, priority = QThread.InheritPriority):
+        """job(progress, cancelled) returns False if it was cancelled"""
+        if not self.isRunning():
+            self._job = job
+            self._cancelled = False
+            super(SaveLogThread, self).start(priority)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            completed = self._job(self.progress.emit, lambda: self._cancelled)
+        except Exception as e:
+            self.done.emit(False, '{}'.format(e))
+        else:
+            self.done.emit(completed, '')
+        self._job = None
+
 class PeriodThread(QThread):
     trigger = pyqtSignal()
     exception = pyqtSignal(str)
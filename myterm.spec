@@ -7,7 +7,12 @@ a = Analysis(['myterm.py'],
              pathex=[],
              binaries=[],
              datas=[],
-             hiddenimports=[],
+             hiddenimports=['urlhandler.protocol_tcp',
+                            'urlhandler.protocol_socket',
+                            'urlhandler.protocol_udp',
+                            'serial.urlhandler.protocol_rfc2217',
+                            'serial.urlhandler.protocol_loop',
+                            'serial.urlhandler.protocol_spy'],
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+from collections import OrderedDict
+from PyQt5 import QtGui, QtWidgets
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFontMetrics, QPainter, QColor
+from capturestore import DIR_RX, DIR_TX, DIR_NOTE
+from dataformat import render_record, pending_tail, FLAG_HIDDEN
+
+DIRECTION_COLOR = {
+    DIR_RX: Qt.black,
+    DIR_TX: Qt.blue,
+}
+
+# how far back to look for the previous received chunk that may hold the
+# first half of a multi-byte character
+CARRY_LOOKBACK           = 8
+
+
+def text_width(fm, text):
+    """advance of text in pixels"""
+    if hasattr(fm, 'horizontalAdvance'):
+        return fm.horizontalAdvance(text)
+    return fm.width(text)
+
+
+class ScrollbackStore(object):
+    """bounded list of display lines
+
+    A line is a list of (text, color) runs. Lines are appended at the end
+    and evicted from the front once either cap is exceeded, both in O(1)
+    amortized, so memory stays flat however long a session runs.
+    """
+
+    def __init__(self, maxLines = 100000, maxChars = 32 << 20, tabWidth = 4):
+        self._maxLines = maxLines
+        self._maxChars = maxChars
+        self._tabWidth = tabWidth
+        self.clear()
+
+    def clear(self):
+        self._lines = [[]]
+        self._lengths = [0]
+        self._first = 0
+        self._chars = 0
+        self.evicted = 0
+
+    def setLimits(self, maxLines, maxChars):
+        self._maxLines = max(1, maxLines)
+        self._maxChars = max(1, maxChars)
+        self.trim()
+
+    def limits(self):
+        return self._maxLines, self._maxChars
+
+    def setTabWidth(self, n):
+        self._tabWidth = n
+
+    def lineCount(self):
+        return len(self._lines) - self._first
+
+    def line(self, i):
+        return self._lines[self._first + i]
+
+    def lineText(self, i):
+        return ''.join(text for text, color in self._lines[self._first + i])
+
+    def lineLength(self, i):
+        return self._lengths[self._first + i]
+
+    def append(self, text, color):
+        """append text, starting a new line at every '\\n'"""
+        parts = text.replace('\r', '').split('\n')
+        for n, part in enumerate(parts):
+            if n:
+                self._lines.append([])
+                self._lengths.append(0)
+            if part:
+                if '\t' in part:
+                    col = self._lengths[-1] % self._tabWidth
+                    part = (' ' * col + part).expandtabs(self._tabWidth)[col:]
+                runs = self._lines[-1]
+                if runs and runs[-1][1] == color:
+                    runs[-1] = (runs[-1][0] + part, color)
+                else:
+                    runs.append((part, color))
+                self._lengths[-1] += len(part)
+                self._chars += len(part)
+        self.trim()
+
+    def trim(self):
+        while self.lineCount() > 1 and (self.lineCount() > self._maxLines
+                                        or self._chars > self._maxChars):
+            self._chars -= self._lengths[self._first]
+            self._lines[self._first] = None
+            self._first += 1
+            self.evicted += 1
+        if self._first > 1024 and self._first * 2 > len(self._lines):
+            del self._lines[:self._first]
+            del self._lengths[:self._first]
+            self._first = 0
+
+    def snapshot(self):
+        """the current lines, for writing out from another thread"""
+        return self._lines[self._first:]
+
+    def text(self, start = None, end = None):
+        """plain text of lines [start, end), joined with '\\n'"""
+        return '\n'.join(self.lineText(i) for i in range(start or 0,
+            self.lineCount() if end is None else end))
+
+
+class CaptureScrollback(object):
+    """display lines of a CaptureStore, rendered on demand
+
+    Each captured chunk starts a new line, as '\\n<time> R<-:...' did in
+    the live view. Only the chunks behind requested lines are read and
+    formatted; the most recent ones are kept in a small cache.
+    """
+
+    def __init__(self, capture, formatter, tabWidth = 4, cacheSize = 512):
+        self.capture = capture
+        self.formatter = formatter
+        self._tabWidth = tabWidth
+        self._cacheSize = cacheSize
+        self._cache = OrderedDict()
+        self.evicted = 0
+
+    def setTabWidth(self, n):
+        self._tabWidth = n
+        self._cache.clear()
+
+    def setLimits(self, maxLines, maxChars):
+        pass
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def clear(self):
+        self._cache.clear()
+
+    def lineCount(self):
+        return max(1, self.capture.lineCount())
+
+    def carry(self, i, flags):
+        """pending_tail() of the received chunk before chunk i"""
+        for j in range(i - 1, max(-1, i - 1 - CARRY_LOOKBACK), -1):
+            t, direction, prevFlags, data = self.capture.record(j)
+            if direction == DIR_RX and not prevFlags & FLAG_HIDDEN:
+                return pending_tail(prevFlags, data) if prevFlags == flags else b''
+        return b''
+
+    def recordLines(self, i):
+        lines = self._cache.get(i)
+        if lines is not None:
+            self._cache.move_to_end(i)
+            return lines
+        t, direction, flags, data = self.capture.record(i)
+        carry = self.carry(i, flags) if direction == DIR_RX else b''
+        text = render_record(t, direction, flags, data, self.formatter.hexGroup(), carry,
+                             self.formatter.timestampDigits())
+        if direction == DIR_NOTE:
+            color = Qt.GlobalColor(flags)
+        else:
+            color = DIRECTION_COLOR.get(direction, Qt.black)
+        lines = []
+        for part in text.replace('\r', '').split('\n'):
+            if '\t' in part:
+                part = part.expandtabs(self._tabWidth)
+            lines.append(((part, color),) if part else ())
+        self._cache[i] = lines
+        if len(self._cache) > self._cacheSize:
+            self._cache.popitem(last = False)
+        return lines
+
+    def line(self, i):
+        n = self.capture.findLine(i)
+        if n < 0:
+            return ()
+        lines = self.recordLines(n)
+        k = i - self.capture.entry(n)[1]
+        return lines[k] if k < len(lines) else ()
+
+    def lineText(self, i):
+        return ''.join(text for text, color in self.line(i))
+
+    def lineLength(self, i):
+        return sum(len(text) for text, color in self.line(i))
+
+    def text(self, start = None, end = None):
+        return '\n'.join(self.lineText(i) for i in range(start or 0,
+            self.lineCount() if end is None else end))
+
+
+class OutputView(QtWidgets.QAbstractScrollArea):
+    """read-only output pane that paints only the visible lines of a
+    ScrollbackStore"""
+
+    def __init__(self, parent = None):
+        super(OutputView, self).__init__(parent)
+        self.store = ScrollbackStore()
+        self._limits = self.store.limits()
+        self._tabWidth = 4
+        self._anchor = None
+        self._cursor = None
+        self._follow = True
+        self._maxLength = 0
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.setContextMenuPolicy(Qt.DefaultContextMenu)
+        self.verticalScrollBar().valueChanged.connect(self.onScrolled)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def setStore(self, store):
+        """show store, a ScrollbackStore or a CaptureScrollback"""
+        store.setTabWidth(self._tabWidth)
+        store.setLimits(*self._limits)
+        self.store = store
+        self._anchor = self._cursor = None
+        self._maxLength = 0
+        self._follow = True
+        self.refresh()
+
+    def setTabWidth(self, n):
+        self._tabWidth = n
+        self.store.setTabWidth(n)
+
+    def tabWidth(self):
+        return self._tabWidth
+
+    def setLimits(self, maxLines, maxChars):
+        self._limits = (maxLines, maxChars)
+        self.store.setLimits(maxLines, maxChars)
+        self.updateScrollBars()
+
+    def limits(self):
+        return self._limits
+
+    def charWidth(self):
+        return text_width(QFontMetrics(self.font()), '0')
+
+    def lineHeight(self):
+        return QFontMetrics(self.font()).lineSpacing()
+
+    def visibleLines(self):
+        return max(1, self.viewport().height() // self.lineHeight())
+
+    def appendSegments(self, segments):
+        """segments: iterable of (text, color); repaints once"""
+        evicted = self.store.evicted
+        for text, color in segments:
+            self.store.append(text, color)
+        evicted = self.store.evicted - evicted
+        if evicted and self._anchor is not None:
+            self._anchor = (self._anchor[0] - evicted, self._anchor[1])
+            self._cursor = (self._cursor[0] - evicted, self._cursor[1])
+            if self._cursor[0] < 0 and self._anchor[0] < 0:
+                self._anchor = self._cursor = None
+        sb = self.verticalScrollBar()
+        if not self._follow and evicted:
+            sb.setValue(max(0, sb.value() - evicted))
+        self.refresh()
+
+    def refresh(self):
+        """the store has changed, update the scroll range and repaint"""
+        self.updateScrollBars()
+        self.viewport().update()
+
+    def clear(self):
+        self.store.clear()
+        self._anchor = self._cursor = None
+        self._maxLength = 0
+        self._follow = True
+        self.updateScrollBars()
+        self.viewport().update()
+
+    def toPlainText(self):
+        return self.store.text()
+
+    def updateScrollBars(self):
+        sb = self.verticalScrollBar()
+        page = self.visibleLines()
+        sb.blockSignals(True)
+        sb.setRange(0, max(0, self.store.lineCount() - page))
+        sb.setPageStep(page)
+        if self._follow:
+            sb.setValue(sb.maximum())
+        sb.blockSignals(False)
+        hb = self.horizontalScrollBar()
+        cw = self.charWidth()
+        hb.setRange(0, max(0, self._maxLength * cw + 2 * cw - self.viewport().width()))
+        hb.setPageStep(self.viewport().width())
+        hb.setSingleStep(cw)
+
+    def onScrolled(self, value):
+        self._follow = value >= self.verticalScrollBar().maximum()
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super(OutputView, self).resizeEvent(event)
+        self.updateScrollBars()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        fm = QFontMetrics(self.font())
+        lh = self.lineHeight()
+        cw = self.charWidth()
+        x0 = cw // 2 - self.horizontalScrollBar().value()
+        first = self.verticalScrollBar().value()
+        last = min(self.store.lineCount(), first + self.visibleLines() + 1)
+        sel = self.selectionRange()
+        highlight = self.palette().color(QtGui.QPalette.Highlight)
+        highlight.setAlpha(96)
+        longest = self._maxLength
+        for row, i in enumerate(range(first, last)):
+            y = row * lh
+            if sel is not None and sel[0][0] <= i <= sel[1][0]:
+                # wide characters make columns uneven, so measure the line
+                text = self.store.lineText(i)
+                c0 = sel[0][1] if i == sel[0][0] else 0
+                left = text_width(fm, text[:c0])
+                if i == sel[1][0]:
+                    right = text_width(fm, text[:sel[1][1]])
+                else:
+                    right = text_width(fm, text) + cw
+                painter.fillRect(x0 + left, y, right - left, lh, highlight)
+            x = x0
+            for text, color in self.store.line(i):
+                painter.setPen(QColor(color))
+                painter.drawText(x, y + fm.ascent(), text)
+                x += text_width(fm, text)
+            # the scroll range is kept in '0' widths
+            longest = max(longest, -(-(x - x0) // cw))
+        painter.end()
+        if longest > self._maxLength:
+            self._maxLength = longest
+            self.updateScrollBars()
+
+    def posToCell(self, pos):
+        line = self.verticalScrollBar().value() + pos.y() // self.lineHeight()
+        line = max(0, min(self.store.lineCount() - 1, line))
+        cw = self.charWidth()
+        x = pos.x() + self.horizontalScrollBar().value()
+        text = self.store.lineText(line)
+        fm = QFontMetrics(self.font())
+        if text_width(fm, text) == len(text) * cw:
+            # text starts half a char in, so this rounds to the nearest boundary
+            return (line, max(0, min(len(text), x // cw)))
+        # the boundary nearest x, found by measuring prefixes of the line
+        x -= cw // 2
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text_width(fm, text[:mid]) < x:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo and x - text_width(fm, text[:lo - 1]) < text_width(fm, text[:lo]) - x:
+            lo -= 1
+        return (line, lo)
+
+    def selectionRange(self):
+        if self._anchor is None or self._anchor == self._cursor:
+            return None
+        a, b = sorted((self._anchor, self._cursor))
+        return (max(a, (0, 0)), b)
+
+    def selectedText(self):
+        sel = self.selectionRange()
+        if sel is None:
+            return ''
+        (l0, c0), (l1, c1) = sel
+        if l0 == l1:
+            return self.store.lineText(l0)[c0:c1]
+        lines = [self.store.lineText(l0)[c0:]]
+        lines.extend(self.store.lineText(i) for i in range(l0 + 1, l1))
+        lines.append(self.store.lineText(l1)[:c1])
+        return '\n'.join(lines)
+
+    def copy(self):
+        text = self.selectedText()
+        if text:
+            QtWidgets.QApplication.clipboard().setText(text)
+
+    def selectAll(self):
+        last = self.store.lineCount() - 1
+        self._anchor = (0, 0)
+        self._cursor = (last, self.store.lineLength(last))
+        self.viewport().update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._anchor = self._cursor = self.posToCell(event.pos())
+            self.viewport().update()
+        event.accept()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton and self._anchor is not None:
+            self._cursor = self.posToCell(event.pos())
+            self.viewport().update()
+        event.accept()
+
+    def mouseReleaseEvent(self, event):
+        event.accept()
+
+    def keyPressEvent(self, event):
+        if event.matches(QtGui.QKeySequence.Copy):
+            self.copy()
+        elif event.matches(QtGui.QKeySequence.SelectAll):
+            self.selectAll()
+        else:
+            super(OutputView, self).keyPressEvent(event)
+
+    def contextMenuEvent(self, event):
+        menu = QtWidgets.QMenu(self)
+        action = menu.addAction("&Copy")
+        action.setEnabled(self.selectionRange() is not None)
+        action.triggered.connect(self.copy)
+        menu.addAction("Select &All").triggered.connect(self.selectAll)
+        menu.exec_(event.globalPos())
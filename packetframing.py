@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import re
+from framing import Framer, register_framer, MAX_FRAME
+
+FRAMING_SLIP             = 'slip'
+FRAMING_COBS             = 'cobs'
+FRAMING_LENGTH           = 'length'
+FRAMING_STXETX           = 'stxetx'
+
+SLIP_END                 = 0xc0
+SLIP_ESC                 = 0xdb
+SLIP_ESC_END             = 0xdc
+SLIP_ESC_ESC             = 0xdd
+
+
+def slip_decode(packet):
+    """payload of a SLIP packet without its END byte(s); ValueError if an
+    ESC is not followed by ESC_END or ESC_ESC"""
+    escapes = packet.count(SLIP_ESC)
+    if escapes:
+        if escapes != packet.count(b'\xdb\xdc') + packet.count(b'\xdb\xdd'):
+            raise ValueError('bad SLIP escape')
+        # escape pairs never overlap, so two passes decode them exactly
+        packet = packet.replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+    return packet
+
+
+def slip_encode(payload):
+    return b'\xc0' + payload.replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc') + b'\xc0'
+
+
+def cobs_decode(packet):
+    """payload of a COBS packet without its zero delimiter"""
+    out = bytearray()
+    i = 0
+    n = len(packet)
+    while i < n:
+        code = packet[i]
+        if code == 0 or i + code > n:
+            raise ValueError('bad COBS block')
+        out += packet[i + 1:i + code]
+        i += code
+        if code < 0xff and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+def cobs_encode(payload):
+    out = bytearray()
+    for block in payload.split(b'\x00'):
+        while len(block) >= 0xfe:
+            out.append(0xff)
+            out += block[:0xfe]
+            block = block[0xfe:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out) + b'\x00'
+
+
+class DelimitedPacketFramer(Framer):
+    """packets ended by a single delimiter byte, decoded by decode()"""
+
+    delimiter = b'\x00'
+
+    def feed(self, data, t):
+        out = []
+        if not data:
+            return out
+        base = len(self._buf)
+        if self._start is None:
+            self._start = t
+        self._buf += data
+        begin = 0
+        find = self._buf.find
+        i = find(self.delimiter, base)
+        while i >= 0:
+            end = i + 1
+            if i > begin:
+                packet = bytes(self._buf[begin:i])
+                try:
+                    out.append((self.decode(packet), self._start))
+                except ValueError:
+                    self.errors += 1
+                    out.append((packet, self._start))
+            begin = end
+            self._start = self._byteTime(t, end - base)
+            i = find(self.delimiter, end)
+        if begin:
+            del self._buf[:begin]
+        if not self._buf:
+            self._start = None
+        self._overlong(out)
+        return out
+
+    def decode(self, packet):
+        return packet
+
+
+class SlipFramer(DelimitedPacketFramer):
+    """SLIP (RFC 1055) packets; empty packets between END bytes are skipped"""
+
+    delimiter = b'\xc0'
+
+    def decode(self, packet):
+        return slip_decode(packet)
+
+
+class CobsFramer(DelimitedPacketFramer):
+    """COBS packets, each ended by a zero byte"""
+
+    delimiter = b'\x00'
+
+    def decode(self, packet):
+        return cobs_decode(packet)
+
+
+class LengthPrefixFramer(Framer):
+    """packets with a length field: offset bytes of header, a width byte
+    length in big or little endian, then the rest
+
+    The packet is offset + width + length + adjust bytes long, so adjust is
+    negative when the length counts the header too. An impossible length
+    drops one byte to find the next packet. Packets are returned whole,
+    header included.
+    """
+
+    def __init__(self, width = 1, order = 'big', offset = 0, adjust = 0, charTime = 0,
+                 maxFrame = MAX_FRAME):
+        super(LengthPrefixFramer, self).__init__(charTime, maxFrame)
+        if width not in (1, 2, 4):
+            raise ValueError('length width must be 1, 2 or 4')
+        if order not in ('big', 'little'):
+            raise ValueError("byte order must be 'big' or 'little'")
+        self._width = width
+        self._order = order
+        self._offset = max(offset, 0)
+        self._adjust = adjust
+
+    def feed(self, data, t):
+        out = []
+        if not data:
+            return out
+        base = len(self._buf)
+        if self._start is None:
+            self._start = t
+        self._buf += data
+        buf = self._buf
+        header = self._offset + self._width
+        begin = 0
+        while len(buf) - begin >= header:
+            field = buf[begin + self._offset:begin + header]
+            size = header + int.from_bytes(field, self._order) + self._adjust
+            if size < header or size > self._maxFrame:
+                self.errors += 1
+                begin += 1
+                self._start = self._byteTime(t, max(begin - base, 0))
+                continue
+            if len(buf) - begin < size:
+                break
+            out.append((bytes(buf[begin:begin + size]), self._start))
+            begin += size
+            self._start = self._byteTime(t, max(begin - base, 0))
+        if begin:
+            del buf[:begin]
+        if not buf:
+            self._start = None
+        return out
+
+
+class StxEtxFramer(Framer):
+    """packets between STX and ETX, where DLE makes the next byte literal
+
+    Bytes outside a packet are dropped and counted in errors. Set dle to -1
+    for packets with no escapes.
+    """
+
+    def __init__(self, stx = 0x02, etx = 0x03, dle = 0x10, charTime = 0, maxFrame = MAX_FRAME):
+        super(StxEtxFramer, self).__init__(charTime, maxFrame)
+        self._stx = bytes((stx,))
+        self._etx = bytes((etx,))
+        self._dle = dle
+        self._unescape = re.compile(re.escape(bytes((dle,))) + b'(.)', re.S) if dle >= 0 else None
+        self._scan = 0
+        # where the packet starts past begin: 1 skips its STX, 0 after an
+        # overlong packet was split and the rest carries on without one
+        self._body = 1
+
+    def reset(self):
+        super(StxEtxFramer, self).reset()
+        self._scan = 0
+        self._body = 1
+
+    def feed(self, data, t):
+        out = []
+        if not data:
+            return out
+        base = len(self._buf)
+        self._buf += data
+        buf = self._buf
+        begin = 0
+        while True:
+            if self._start is None:
+                # hunting for the next STX
+                i = buf.find(self._stx, begin)
+                if i < 0:
+                    self.errors += len(buf) > begin
+                    begin = len(buf)
+                    break
+                self.errors += i > begin
+                begin = i
+                self._start = self._byteTime(t, max(i - base, 0))
+                self._scan = i + 1
+                self._body = 1
+            i = buf.find(self._etx, self._scan)
+            while i >= 0 and self._dle >= 0 and self._escaped(buf, i, begin + self._body):
+                i = buf.find(self._etx, i + 1)
+            if i < 0:
+                self._scan = len(buf)
+                break
+            packet = bytes(buf[begin + self._body:i])
+            if self._unescape is not None:
+                packet = self._unescape.sub(br'\1', packet)
+            out.append((packet, self._start))
+            begin = i + 1
+            self._start = None
+        if begin:
+            del buf[:begin]
+            self._scan = max(self._scan - begin, 0)
+        held = len(buf)
+        self._overlong(out)
+        if len(buf) < held:
+            self._scan = max(self._scan - (held - len(buf)), 0)
+            self._body = 0
+        return out
+
+    def _escaped(self, buf, i, first):
+        # an odd run of DLE right before it makes the ETX literal
+        n = 0
+        while i - n - 1 >= first and buf[i - n - 1] == self._dle:
+            n += 1
+        return n & 1
+
+
+register_framer('SLIP', FRAMING_SLIP,
+                lambda charTime: SlipFramer(charTime))
+register_framer('COBS', FRAMING_COBS,
+                lambda charTime: CobsFramer(charTime))
+register_framer('Length Prefixed', FRAMING_LENGTH,
+                lambda charTime, **options: LengthPrefixFramer(charTime = charTime, **options),
+                dict(width = 1, order = 'big', offset = 0, adjust = 0))
+register_framer('STX/ETX', FRAMING_STXETX,
+                lambda charTime, **options: StxEtxFramer(charTime = charTime, **options),
+                dict(stx = 0x02, etx = 0x03, dle = 0x10))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import serial
+
+# the port settings as the GUI shows and saves them -> pyserial values
+DATABITS = {
+    '5': serial.FIVEBITS,
+    '6': serial.SIXBITS,
+    '7': serial.SEVENBITS,
+    '8': serial.EIGHTBITS,
+}
+
+PARITIES = {
+    'None': serial.PARITY_NONE,
+    'Even': serial.PARITY_EVEN,
+    'Odd': serial.PARITY_ODD,
+    'Mark': serial.PARITY_MARK,
+    'Space': serial.PARITY_SPACE,
+}
+
+STOPBITS = {
+    '1': serial.STOPBITS_ONE,
+    '1.5': serial.STOPBITS_ONE_POINT_FIVE,
+    '2': serial.STOPBITS_TWO,
+}
+
+READ_TIMEOUT             = 0.5
+
+# our network handlers first, so socket:// gets the tuned one
+if 'urlhandler' not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.insert(0, 'urlhandler')
+
+
+def is_url(port):
+    """port names a pyserial URL handler, e.g. socket://host:port"""
+    return '://' in port
+
+
+def load_settings(path):
+    """the parsed settings file, None if there is none or it is unreadable"""
+    from defusedxml.ElementTree import parse
+    if not os.path.isfile(path):
+        return None
+    try:
+        return parse(path)
+    except Exception as e:
+        print("Exception on load_settings, {}".format(e))
+        return None
+
+
+class PortConfig(object):
+    """serial port settings, kept as the texts saved under
+    GUISettings/PortConfig"""
+
+    def __init__(self, port = '', baudrate = '38400', databits = '8', parity = 'None',
+                 stopbits = '1', rtscts = False, xonxoff = False, interbytegap = 2):
+        self.port = port
+        self.baudrate = baudrate
+        self.databits = databits
+        self.parity = parity
+        self.stopbits = stopbits
+        self.rtscts = rtscts
+        self.xonxoff = xonxoff
+        self.interbytegap = interbytegap
+
+    @classmethod
+    def fromSettings(cls, tree):
+        """the port settings saved in a parsed settings file"""
+        config = cls()
+        if tree is None:
+            return config
+        config.port = tree.findtext('GUISettings/PortConfig/port', default=config.port)
+        config.baudrate = tree.findtext('GUISettings/PortConfig/baudrate', default=config.baudrate)
+        config.databits = tree.findtext('GUISettings/PortConfig/databits', default=config.databits)
+        config.parity = tree.findtext('GUISettings/PortConfig/parity', default=config.parity)
+        config.stopbits = tree.findtext('GUISettings/PortConfig/stopbits', default=config.stopbits)
+        config.rtscts = 'on' == tree.findtext('GUISettings/PortConfig/rtscts', default='off')
+        config.xonxoff = 'on' == tree.findtext('GUISettings/PortConfig/xonxoff', default='off')
+        gap = tree.findtext('GUISettings/PortConfig/interbytegap', default='2')
+        if gap.isdigit():
+            config.interbytegap = int(gap)
+        return config
+
+    def create(self):
+        """a closed port object with these settings, a URL handler's for URLs
+        such as socket://, rfc2217://, udp://, loop:// or spy://; raises
+        ValueError for an unknown one"""
+        if is_url(self.port):
+            serialport = serial.serial_for_url(self.port, do_not_open = True)
+        else:
+            serialport = serial.Serial()
+        self.apply(serialport)
+        return serialport
+
+    def apply(self, serialport):
+        """set up a closed serial.Serial with these settings"""
+        serialport.port     = self.port
+        serialport.baudrate = self.baudrate
+        serialport.bytesize = DATABITS[self.databits]
+        serialport.stopbits = STOPBITS[self.stopbits]
+        serialport.parity   = PARITIES[self.parity]
+        serialport.rtscts   = self.rtscts
+        serialport.xonxoff  = self.xonxoff
+        serialport.timeout  = READ_TIMEOUT
+
+    def __str__(self):
+        return "%s [%s, %s%s%s%s%s]" % (
+            self.port, self.baudrate, self.databits, PARITIES[self.parity], self.stopbits,
+            self.rtscts and ' RTS/CTS' or '', self.xonxoff and ' Xon/Xoff' or '')
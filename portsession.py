@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+import serial
+from iomux import PortChannel
+from outputview import OutputView
+from renderer import RenderScheduler
+from ringbuffer import RingBuffer
+from metrics import SessionMetrics
+from capturestore import DIR_RX, DIR_TX
+from dataformat import Formatter, FLAG_HIDDEN, format_timestamp, render_data
+from timebase import now_ns
+
+
+class PortReader(QObject):
+    """read one port on the window's shared I/O thread
+
+    readyRead is emitted when the buffer gets data, exception when the
+    port fails, after which it is no longer read.
+    """
+    readyRead = pyqtSignal()
+    exception = pyqtSignal(str)
+
+    def __init__(self, mux, parent = None):
+        super(PortReader, self).__init__(parent)
+        self._mux = mux
+        self._channel = PortChannel(onError = self._onError)
+
+    def setPort(self, port):
+        self._channel.setPort(port)
+
+    def setBuffer(self, buffer):
+        """chunks are queued in buffer, readyRead tells the GUI to drain it"""
+        self._channel.setBuffer(buffer)
+        buffer.setReadableCallback(self.readyRead.emit)
+
+    def setReadMode(self, mode):
+        self._channel.setReadMode(mode)
+
+    def setInterByteGap(self, seconds):
+        self._channel.setInterByteGap(seconds)
+
+    def setFramer(self, framer):
+        self._channel.setFramer(framer)
+
+    def framer(self):
+        return self._channel.framer()
+
+    def start(self):
+        self._mux.add(self._channel)
+
+    def join(self):
+        """stop reading; the port can be closed once this returns"""
+        self._mux.remove(self._channel)
+
+    def _onError(self, e):
+        self.exception.emit('{}'.format(e))
+
+
+class PortSession(QtWidgets.QWidget):
+    """a further port, open in a tab of its own
+
+    Shown the plain way, in a capped scrollback; the main window hands it
+    its view, framing and log settings and sends to it while its tab is
+    the current one.
+    """
+
+    def __init__(self, mux, config, bufferSize = 4 << 20, parent = None):
+        super(PortSession, self).__init__(parent)
+        self.config = config
+        self.serialport = serial.Serial()
+        config.apply(self.serialport)
+        self.rxBuffer = RingBuffer(bufferSize)
+        self.reader = PortReader(mux, self)
+        self.reader.setPort(self.serialport)
+        self.reader.setBuffer(self.rxBuffer)
+        self.formatter = Formatter()
+        self.metrics = SessionMetrics()
+        self.counter = None
+        self.autoLog = None
+        self.readerErrors = 0
+        self._rxDropped = 0
+        self._renderLagStart = None
+
+        self.output = OutputView(self)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.output)
+        self.renderer = RenderScheduler(self.output, parent = self)
+
+        self.renderer.rendered.connect(self.onRendered)
+        self.reader.readyRead.connect(self.onReadyRead)
+        self.reader.exception.connect(self.onReaderExcept)
+
+    def title(self):
+        return self.config.port
+
+    def isOpen(self):
+        return self.serialport.isOpen()
+
+    def open(self):
+        """open the port and start reading it, raises if it can't be opened"""
+        # a URL gets its handler's class, so the port object is made here
+        self.serialport = self.config.create()
+        self.reader.setPort(self.serialport)
+        self.serialport.open()
+        self.metrics.reset()
+        self.rxBuffer.resetStats()
+        self._rxDropped = 0
+        self.readerErrors = 0
+        if self.counter is not None:
+            self.counter.opened()
+        self.reader.start()
+        self.appendOutputText("\n%s opened %s" % (self.timestamp(), self.config), Qt.blue)
+
+    def close(self):
+        if self.serialport.isOpen():
+            self.reader.join()
+            self.serialport.close()
+            self.onReadyRead()
+            self.appendOutputText("\n%s closed" % self.timestamp(), Qt.blue)
+        self.setAutoLog(None)
+
+    def setAutoLog(self, autoLog):
+        if self.autoLog is not None:
+            self.autoLog.close()
+        self.autoLog = autoLog
+
+    def clear(self):
+        self.renderer.discard()
+        self.output.clear()
+
+    def timestamp(self, t = None):
+        return format_timestamp(t, self.formatter.timestampDigits())
+
+    def transmit(self, data, flags):
+        """write data, echoing it as flags says; raises as serial.Serial.write()"""
+        self.serialport.write(data)
+        self.onTransmit(bytes(data), now_ns(), flags)
+
+    def onReaderExcept(self, e):
+        self.readerErrors += 1
+        if self.serialport.isOpen():
+            self.serialport.close()
+        self.appendOutputText("\n%s read failed, %s" % (self.timestamp(), e), Qt.red)
+
+    def onReadyRead(self):
+        while True:
+            chunks = self.rxBuffer.get()
+            if not chunks:
+                break
+            for data, t in chunks:
+                self.onReceive(data, t)
+        dropped = self.rxBuffer.droppedBytes
+        if dropped != self._rxDropped:
+            self.appendOutputText("\n%s %d bytes dropped, receive buffer full" % (
+                self.timestamp(), dropped - self._rxDropped), Qt.red)
+            self._rxDropped = dropped
+
+    def onReceive(self, data, t):
+        self.metrics.received(len(data), t)
+        if self._renderLagStart is None:
+            self._renderLagStart = t
+        if self.autoLog is not None:
+            self.autoLog.log(t, DIR_RX, self.formatter.flags(), data)
+        text = self.formatter.format(data)
+        if text:
+            self.appendOutputText("\n%s R<-:%s" % (self.timestamp(t), text))
+
+    def onTransmit(self, data, t, flags):
+        self.metrics.transmitted(len(data), t)
+        if self.autoLog is not None:
+            self.autoLog.log(t, DIR_TX, flags, data)
+        if not flags & FLAG_HIDDEN:
+            self.appendOutputText("\n%s Tx:%s" % (self.timestamp(t), render_data(flags, data)), Qt.blue)
+
+    def appendOutputText(self, data, color = Qt.black):
+        self.renderer.append(data, color)
+
+    def onRendered(self):
+        if self._renderLagStart is not None:
+            now = now_ns()
+            self.metrics.rendered(now - self._renderLagStart, now)
+            self._renderLagStart = None
+
+    def sampleMetrics(self, now):
+        """sample the session metrics, update the port counter, return the summary"""
+        stats = self.rxBuffer.stats()
+        self.metrics.sample(now, stats['depth'], stats['droppedBytes'],
+                            self.readerErrors + self.reader.framer().errors)
+        summary = self.metrics.summary(now)
+        if self.counter is not None:
+            self.counter.update(self.serialport.isOpen(), stats['depth'], stats['capacity'],
+                rxBytes = summary['rxTotal'], txBytes = summary['txTotal'],
+                frames = self.metrics.rxChunks.total, errors = summary['errors'],
+                droppedBytes = summary['dropped'])
+        return summary
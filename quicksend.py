@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+from dataformat import VIEWMODE_ASCII, VIEWMODE_HEX_UPPERCASE, make_flags
+from hexparse import parse_hex
+
+FORM_HEX                 = 'H'
+FORM_ASCII               = 'A'
+FORM_ASCII_ESCAPED       = 'AS'
+FORM_HEX_FILE            = 'HF'
+FORM_ASCII_FILE          = 'AF'
+FORM_BINARY_FILE         = 'BF'
+
+FILE_FORMS = (FORM_HEX_FILE, FORM_ASCII_FILE, FORM_BINARY_FILE)
+
+_ESCAPES = [
+    (r'\r', '\r'),
+    (r'\n', '\n'),
+    (r'\t', '\t'),
+    (r"\'", "'"),
+    (r'\"', '"'),
+    (r'\\', '\\'),
+]
+
+
+def hex_payload(text):
+    """bytes of hex text such as "31 32 FF" or "0x31,0x32"; raises
+    HexParseError (a ValueError) locating the first bad token"""
+    return parse_hex(text)
+
+
+def ascii_payload(text):
+    """bytes of text, one per character"""
+    return text.encode('latin-1')
+
+
+def escaped_payload(text):
+    r"""bytes of text with \r \n \t \' \" \\ turned into the characters"""
+    for escape, char in _ESCAPES:
+        text = text.replace(escape, char)
+    return ascii_payload(text)
+
+
+def compile_payload(form, text):
+    """the bytes a quick-send row sends, None for the file forms, which are
+    read when sent"""
+    if form == FORM_HEX:
+        return hex_payload(text)
+    if form == FORM_ASCII:
+        return ascii_payload(text)
+    if form == FORM_ASCII_ESCAPED:
+        return escaped_payload(text)
+    return None
+
+
+def payload_flags(form, modbus = False):
+    """flags to echo a payload sent in form"""
+    if form == FORM_HEX:
+        return make_flags(VIEWMODE_HEX_UPPERCASE, modbus = modbus)
+    return make_flags(VIEWMODE_ASCII, 'latin-1')
+
+
+class QuickSendCache(object):
+    """quick-send rows compiled to bytes once, when they are edited or
+    loaded, so sending one is a single write
+
+    Each row holds (form, payload, text, error): payload is None for the
+    file forms, error the message of a row that didn't compile.
+    """
+
+    def __init__(self):
+        self._rows = {}
+
+    def compile(self, row, form, text):
+        try:
+            entry = (form, compile_payload(form, text), text, None)
+        except ValueError as e:
+            entry = (form, None, text, str(e))
+        self._rows[row] = entry
+        return entry
+
+    def get(self, row):
+        """the compiled row, None if it hasn't been"""
+        return self._rows.get(row)
+
+    def invalidate(self, row = None):
+        """forget a row, or all of them"""
+        if row is None:
+            self._rows.clear()
+        else:
+            self._rows.pop(row, None)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+class RenderScheduler(QObject):
+    """collect output segments and hand them to the view at a capped frame
+    rate
+
+    Segments appended between two frames are merged by color and passed to
+    view.appendSegments() in one call, so the view is updated once per
+    frame instead of once per received chunk. A segment waits at most one
+    frame interval. Views that read their own store (e.g. a capture)
+    are just told to refresh once per frame after schedule().
+
+    rendered is emitted after each frame that changed the view.
+    """
+    rendered = pyqtSignal()
+
+    def __init__(self, view, rate = 30, parent = None):
+        super(RenderScheduler, self).__init__(parent)
+        self._view = view
+        self._pending = []
+        self._dirty = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.setRate(rate)
+
+    def setRate(self, rate):
+        """frames per second, at least 1"""
+        self._rate = max(1, rate)
+        self._timer.setInterval(int(1000 / self._rate))
+
+    def rate(self):
+        return self._rate
+
+    def append(self, text, color = Qt.black):
+        if self._pending and self._pending[-1][1] == color:
+            self._pending[-1][0].append(text)
+        else:
+            self._pending.append(([text], color))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def schedule(self):
+        """refresh the view at the next frame"""
+        self._dirty = True
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self):
+        self._timer.stop()
+        self._pending = []
+        self._dirty = False
+
+    def flush(self):
+        self._timer.stop()
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._view.appendSegments((''.join(texts), color) for texts, color in pending)
+        elif self._dirty:
+            self._view.refresh()
+        else:
+            return
+        self._dirty = False
+        self.rendered.emit()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+import os
+import threading
+import tempfile
+from collections import deque
+
+OVERFLOW_BLOCK           = 0
+OVERFLOW_DROP_OLDEST     = 1
+OVERFLOW_SPILL           = 2
+
+# (menu text, policy)
+OVERFLOW_POLICIES = [
+    ('Block Reader', OVERFLOW_BLOCK),
+    ('Drop Oldest', OVERFLOW_DROP_OLDEST),
+    ('Spill to Disk', OVERFLOW_SPILL),
+]
+
+
+class RingBuffer(object):
+    """fixed-capacity FIFO of timestamped chunks between the reader thread
+    and the GUI
+
+    The bytes live in one preallocated bytearray; a deque of
+    [length, timestamp] keeps the chunk boundaries. What happens when a
+    chunk does not fit depends on the overflow policy:
+      OVERFLOW_BLOCK       put() waits for the consumer, up to a timeout
+      OVERFLOW_DROP_OLDEST the oldest chunks are discarded and counted
+      OVERFLOW_SPILL       chunks go to a temporary file until the
+                           consumer has drained everything before them
+    Once chunks are spilled, later ones are spilled after them under any
+    policy until the consumer catches up; Drop Oldest then drops spilled
+    chunks.
+
+    onReadable is called from put(), outside the lock, whenever a chunk
+    goes into an empty buffer, so the consumer only needs waking once per
+    drain.
+    """
+
+    def __init__(self, capacity = 4 << 20, policy = OVERFLOW_DROP_OLDEST, spillDir = None,
+                 onReadable = None):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._capacity = capacity
+        self._policy = policy
+        self._spillDir = spillDir
+        self._onReadable = onReadable
+        self._head = 0
+        self._size = 0
+        self._chunks = deque()
+        self._spill = None
+        self._spillChunks = deque()
+        self._spillReadPos = 0
+        self._spillSize = 0
+        self._cond = threading.Condition()
+        self.droppedBytes = 0
+        self.droppedChunks = 0
+        self.spilledBytes = 0
+        self.highWater = 0
+
+    def capacity(self):
+        return self._capacity
+
+    def policy(self):
+        return self._policy
+
+    def setReadableCallback(self, onReadable):
+        self._onReadable = onReadable
+
+    def setPolicy(self, policy):
+        with self._cond:
+            self._policy = policy
+            self._cond.notify_all()
+
+    def depth(self):
+        """bytes waiting to be consumed, including spilled ones"""
+        with self._cond:
+            return self._size + self._spillSize
+
+    def stats(self):
+        with self._cond:
+            return dict(capacity = self._capacity,
+                        depth = self._size + self._spillSize,
+                        highWater = self.highWater,
+                        droppedBytes = self.droppedBytes,
+                        droppedChunks = self.droppedChunks,
+                        spilledBytes = self.spilledBytes)
+
+    def put(self, data, t, timeout = None):
+        """queue data read at time t, return the number of bytes accepted
+
+        Less than len(data) is only returned by OVERFLOW_BLOCK when the
+        timeout(sec) expires; the caller retries with the rest.
+        """
+        accepted = 0
+        readable = False
+        with self._cond:
+            for i in range(0, len(data), self._capacity):
+                piece = data[i:i+self._capacity]
+                wasEmpty = self._putPiece(piece, t, timeout)
+                if wasEmpty is None:
+                    break
+                readable = readable or wasEmpty
+                accepted += len(piece)
+            if self._size > self.highWater:
+                self.highWater = self._size
+            self._cond.notify_all()
+        if readable and self._onReadable is not None:
+            self._onReadable()
+        return accepted
+
+    def _putPiece(self, data, t, timeout):
+        # whether the buffer was empty when data went in, None on timeout;
+        # checked after any wait, which lets the consumer drain it meanwhile
+        n = len(data)
+        if self._spillChunks or (self._policy == OVERFLOW_SPILL and self._capacity - self._size < n):
+            # whatever the policy now, chunks follow the ones already
+            # spilled until the consumer has drained them
+            wasEmpty = self._size == 0 and not self._spillChunks
+            self._spillPiece(data, t)
+            if self._policy == OVERFLOW_DROP_OLDEST:
+                self._trimSpill()
+            return wasEmpty
+        if self._capacity - self._size < n:
+            if self._policy == OVERFLOW_BLOCK:
+                if not self._cond.wait_for(lambda: self._capacity - self._size >= n
+                                           or self._policy != OVERFLOW_BLOCK, timeout):
+                    return None
+                if self._policy != OVERFLOW_BLOCK:
+                    return self._putPiece(data, t, timeout)
+            else:
+                while self._capacity - self._size < n:
+                    length, _ = self._chunks.popleft()
+                    self._head = (self._head + length) % self._capacity
+                    self._size -= length
+                    self.droppedBytes += length
+                    self.droppedChunks += 1
+        wasEmpty = self._size == 0 and not self._spillChunks
+        tail = (self._head + self._size) % self._capacity
+        first = min(n, self._capacity - tail)
+        self._view[tail:tail+first] = data[:first]
+        if first < n:
+            self._view[0:n-first] = data[first:]
+        self._size += n
+        self._chunks.append((n, t))
+        return wasEmpty
+
+    def _spillPiece(self, data, t):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix = 'myterm-spill-', dir = self._spillDir)
+        self._spill.seek(0, os.SEEK_END)
+        self._spill.write(data)
+        self._spillChunks.append((len(data), t))
+        self._spillSize += len(data)
+        self.spilledBytes += len(data)
+
+    def _trimSpill(self):
+        # Drop Oldest bounds the spilled chunks to the capacity, dropping
+        # them oldest first; the ring ahead of them is left alone
+        while self._spillSize > self._capacity and len(self._spillChunks) > 1:
+            length, _ = self._spillChunks.popleft()
+            self._spillReadPos += length
+            self._spillSize -= length
+            self.droppedBytes += length
+            self.droppedChunks += 1
+
+    def get(self, maxBytes = 1 << 20):
+        """take whole chunks, oldest first, until about maxBytes are collected
+
+        Returns a list of (data, t), empty if nothing is queued.
+        """
+        out = []
+        total = 0
+        with self._cond:
+            while self._chunks and total < maxBytes:
+                length, t = self._chunks.popleft()
+                end = self._head + length
+                if end <= self._capacity:
+                    data = bytes(self._view[self._head:end])
+                else:
+                    data = bytes(self._view[self._head:]) + bytes(self._view[:end - self._capacity])
+                self._head = end % self._capacity
+                self._size -= length
+                out.append((data, t))
+                total += length
+            if not self._chunks:
+                while self._spillChunks and total < maxBytes:
+                    length, t = self._spillChunks.popleft()
+                    self._spill.seek(self._spillReadPos)
+                    data = self._spill.read(length)
+                    self._spillReadPos += length
+                    self._spillSize -= length
+                    out.append((data, t))
+                    total += length
+                if not self._spillChunks and self._spill is not None:
+                    self._spill.seek(0)
+                    self._spill.truncate()
+                    self._spillReadPos = 0
+            if self._size == 0 and not self._spillChunks:
+                self._head = 0
+            self._cond.notify_all()
+        return out
+
+    def clear(self):
+        with self._cond:
+            self._head = 0
+            self._size = 0
+            self._chunks.clear()
+            self._spillChunks.clear()
+            self._spillSize = 0
+            self._spillReadPos = 0
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+            self._cond.notify_all()
+
+    def resetStats(self):
+        with self._cond:
+            self.droppedBytes = 0
+            self.droppedChunks = 0
+            self.spilledBytes = 0
+            self.highWater = self._size
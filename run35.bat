@@ -1,4 +0,0 @@
-@echo off
-set PATH=D:\Python\Python35-32\;%PATH%
-
-cmd /k
\ No newline at end of file
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import os
+import select
+from time import sleep
+from timebase import now_ns, reanchor
+from framing import PassthroughFramer
+
+READMODE_POLLING         = 0
+READMODE_EVENT           = 1
+
+READER_MAX_CHUNK         = 4096
+
+
+class SerialReader(object):
+    """copy an open serial port into a RingBuffer, chunk by chunk
+
+    run() loops in the caller's thread until stop() is called from another
+    one, and lets exceptions from the port propagate. Each chunk is stamped
+    with now_ns() when its first byte is read, then cut into frames by the
+    framer before it is queued. No Qt here: the GUI wraps this in a QThread
+    and the headless capture runs it on a plain thread.
+    """
+
+    def __init__(self, port = None, buffer = None):
+        self._alive = False
+        self._serialport = port
+        self._buffer = buffer
+        self._readMode = READMODE_EVENT
+        self._interByteGap = 0.002
+        self._framer = PassthroughFramer()
+        self._fd = None
+        self._wakeup = None
+
+    def setPort(self, port):
+        self._serialport = port
+
+    def setBuffer(self, buffer):
+        self._buffer = buffer
+
+    def setReadMode(self, mode):
+        self._readMode = mode
+
+    def setInterByteGap(self, seconds):
+        self._interByteGap = seconds
+
+    def setFramer(self, framer):
+        """frames are cut in the reading thread and queued one per chunk; a
+        frame left incomplete by the old framer is queued as it is"""
+        self._framer = framer
+
+    def framer(self):
+        return self._framer
+
+    def isAlive(self):
+        return self._alive
+
+    def start(self):
+        """get ready for run(), with a fresh clock anchor"""
+        self._alive = True
+        reanchor()
+
+    def stop(self):
+        """make run() return soon"""
+        if self._alive:
+            self._alive = False
+            if self._wakeup is not None:
+                os.write(self._wakeup[1], b'\0')
+            if hasattr(self._serialport, 'cancel_read'):
+                self._serialport.cancel_read()
+            else:
+                self._serialport.close()
+
+    def openWaitHandle(self):
+        """select() on the port's fd where the platform allows it, else poll"""
+        self._fd = None
+        if os.name == 'posix' and hasattr(self._serialport, 'fileno'):
+            try:
+                self._fd = self._serialport.fileno()
+            except Exception:
+                self._fd = None
+        if self._fd is not None:
+            if self._wakeup is None:
+                self._wakeup = os.pipe()
+                os.set_blocking(self._wakeup[0], False)
+            try:
+                os.read(self._wakeup[0], 64)
+            except BlockingIOError:
+                pass
+
+    def waitReadable(self, timeout):
+        """block until the port has data or timeout(sec) elapses"""
+        if self._fd is not None:
+            r = select.select([self._fd, self._wakeup[0]], [], [], timeout)[0]
+            if self._wakeup[0] in r:
+                return False
+            return self._fd in r
+        if self._serialport.inWaiting():
+            return True
+        sleep(timeout)
+        return self._serialport.inWaiting() > 0
+
+    def pollChunk(self):
+        """return (data, time the first byte was read)"""
+        # read all that is there or wait for one byte
+        data = self._serialport.read(self._serialport.inWaiting() or 1)
+        t = now_ns()
+        if not self._alive:
+            return data, t
+        else:
+            sleep(0.05)
+        if self._serialport.inWaiting():
+            data = data + self._serialport.read(self._serialport.inWaiting())
+        return data, t
+
+    def eventChunk(self, timeout, gap):
+        """wait up to timeout(sec) for the first byte, then keep reading until
+        the line has been idle for gap(sec); return (data, time the first byte
+        was read)"""
+        if self._fd is None:
+            data = self._serialport.read(self._serialport.inWaiting() or 1)
+        elif self.waitReadable(timeout):
+            data = self._serialport.read(self._serialport.inWaiting() or 1)
+        else:
+            return b'', None
+        t = now_ns()
+        if data:
+            data = bytearray(data)
+            while self._alive and len(data) < READER_MAX_CHUNK \
+                    and self.waitReadable(gap):
+                data += self._serialport.read(self._serialport.inWaiting() or 1)
+        return bytes(data), t
+
+    def queueFrames(self, frames):
+        for data, t in frames:
+            while data and self._alive:
+                # only a blocking buffer accepts less than all of it
+                data = data[self._buffer.put(data, t, 0.1):]
+
+    def run(self):
+        framer = self._framer
+        self.openWaitHandle()
+        while self._alive:
+            if self._readMode == READMODE_EVENT:
+                timeout, gap = self._serialport.timeout, self._interByteGap
+                # wake up in time to end a frame on an idle line
+                deadline = framer.deadline()
+                if deadline is not None:
+                    timeout = min(timeout, max(deadline - now_ns(), 0) / 1e9)
+                if framer.idleGap() is not None:
+                    gap = min(gap, framer.idleGap() / 1e9)
+                data, t = self.eventChunk(timeout, gap)
+            else:
+                data, t = self.pollChunk()
+            if not self._alive:
+                break
+            if framer is not self._framer:
+                self.queueFrames(framer.flush())
+                framer = self._framer
+            self.queueFrames(framer.feed(data, t) if data else [])
+            self.queueFrames(framer.poll(now_ns()))
+        for data, t in framer.flush():
+            self._buffer.put(data, t, 0)
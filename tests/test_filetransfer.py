@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+"""End to end XMODEM, XMODEM-1K, YMODEM and ZMODEM transfers over a pty
+pair: a pyserial port on the slave side, the master fd on the other.
+
+usage: python3 -m unittest discover tests
+"""
+
+import os, sys, pty, tty, fcntl, struct, termios, select, random, shutil, tempfile, threading, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import serial
+from filetransfer import PROTO_XMODEM, PROTO_XMODEM1K, PROTO_YMODEM, PROTO_ZMODEM, \
+    TransferError, send_files, receive_files
+
+TIMEOUT = 120       # s a side may take before the test gives up on it
+
+
+class MasterPort(object):
+    """the pty master as much of a serial port as filetransfer uses,
+    flipping a byte in some of the writes of more than 16 bytes if
+    corrupt > 0"""
+
+    def __init__(self, fd, corrupt = 0.0, seed = 1):
+        self.fd = fd
+        self.timeout = None
+        self._corrupt = corrupt
+        self._random = random.Random(seed)
+        self.damaged = 0
+
+    @property
+    def in_waiting(self):
+        return struct.unpack('I', fcntl.ioctl(self.fd, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+    def read(self, n):
+        if not select.select([self.fd], [], [], self.timeout)[0]:
+            return b''
+        return os.read(self.fd, n)
+
+    def write(self, data):
+        if self._corrupt and len(data) > 16 and self._random.random() < self._corrupt:
+            data = bytearray(data)
+            data[self._random.randrange(len(data))] ^= 0x5a
+            self.damaged += 1
+        view = memoryview(data)
+        while view:
+            select.select([], [self.fd], [])
+            view = view[os.write(self.fd, view):]
+        return len(data)
+
+
+def run_both(a, b):
+    """run a() and b() at once, return what each returned or raised"""
+    results = [None, None]
+
+    def run(i, f):
+        try:
+            results[i] = f()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target = run, args = (i, f), daemon = True) for i, f in enumerate((a, b))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+        if thread.is_alive():
+            raise AssertionError('transfer hung')
+    return results
+
+
+@unittest.skipUnless(hasattr(os, 'openpty'), 'needs a pty')
+class TransferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix = 'myterm-test-')
+        self.source = os.path.join(self.dir, 'source')
+        self.target = os.path.join(self.dir, 'target')
+        os.makedirs(self.source)
+        os.makedirs(self.target)
+        rng = random.Random(2)
+        self.files = []
+        for name, size in (('a.bin', 100000), ('odd.bin', 129), ('empty.bin', 0), ('k.bin', 4096)):
+            data = bytes(rng.getrandbits(8) for i in range(size))
+            if data.endswith(b'\x1a'):
+                # XMODEM pads the last block with SUB
+                data = data[:-1] + b'\0'
+            path = os.path.join(self.source, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.files.append(path)
+        self.ports = []
+
+    def tearDown(self):
+        for port in self.ports:
+            port.close()
+        shutil.rmtree(self.dir, ignore_errors = True)
+
+    def pair(self, corrupt = 0.0):
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        port = serial.Serial(os.ttyname(slave), 115200, timeout = 0.5)
+        os.close(slave)
+        self.ports.append(port)
+        self.addCleanup(os.close, master)
+        return MasterPort(master, corrupt), port
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def assertReceived(self, sent, received):
+        self.assertEqual([os.path.basename(p) for p in received], [os.path.basename(p) for p in sent])
+        for a, b in zip(sent, received):
+            self.assertEqual(self.read(a), self.read(b), b)
+
+    def xmodem(self, protocol, corrupt = 0.0):
+        master, port = self.pair(corrupt)
+        out = os.path.join(self.target, 'x.bin')
+        sent, received = run_both(lambda: send_files(master, protocol, self.files[:1]),
+                                  lambda: receive_files(port, protocol, out))
+        self.assertEqual(sent, self.files[:1])
+        self.assertEqual(received, [out])
+        self.assertEqual(self.read(out).rstrip(b'\x1a'), self.read(self.files[0]))
+        return master
+
+    def batch(self, protocol, corrupt = 0.0, fromMaster = True):
+        master, port = self.pair(corrupt)
+        sender, receiver = (master, port) if fromMaster else (port, master)
+        target = tempfile.mkdtemp(dir = self.target)
+        sent, received = run_both(lambda: send_files(sender, protocol, self.files),
+                                  lambda: receive_files(receiver, protocol, target))
+        self.assertNotIsInstance(sent, Exception)
+        self.assertNotIsInstance(received, Exception)
+        self.assertReceived(self.files, received)
+        return master
+
+    def test_xmodem(self):
+        self.xmodem(PROTO_XMODEM)
+
+    def test_xmodem1k(self):
+        self.xmodem(PROTO_XMODEM1K)
+
+    def test_ymodem(self):
+        self.batch(PROTO_YMODEM)
+
+    def test_zmodem(self):
+        self.batch(PROTO_ZMODEM)
+
+    def test_zmodem_receive(self):
+        self.batch(PROTO_ZMODEM, fromMaster = False)
+
+    def test_xmodem_corrupted(self):
+        self.assertGreater(self.xmodem(PROTO_XMODEM1K, corrupt = 0.05).damaged, 0)
+
+    def test_ymodem_corrupted(self):
+        self.assertGreater(self.batch(PROTO_YMODEM, corrupt = 0.05).damaged, 0)
+
+    def test_zmodem_corrupted(self):
+        # damages data from the sender, then the receiver's replies
+        self.assertGreater(self.batch(PROTO_ZMODEM, corrupt = 0.05).damaged, 0)
+        self.assertGreater(self.batch(PROTO_ZMODEM, corrupt = 0.05, fromMaster = False).damaged, 0)
+
+    def test_cancel(self):
+        for protocol in (PROTO_XMODEM, PROTO_YMODEM, PROTO_ZMODEM):
+            master, port = self.pair()
+            stop = threading.Event()
+
+            def progress(name, done, total):
+                if done >= 20000:
+                    stop.set()
+
+            target = self.target if protocol != PROTO_XMODEM else os.path.join(self.target, 'c.bin')
+            sent, received = run_both(
+                lambda: send_files(master, protocol, self.files[:1], progress, stop.is_set),
+                lambda: receive_files(port, protocol, target))
+            # both ends give up, the receiver told by the cancel sequence
+            self.assertIsInstance(sent, TransferError, protocol)
+            self.assertIsInstance(received, TransferError, protocol)
+
+
+if __name__ == '__main__':
+    unittest.main()
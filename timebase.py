@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import time
+import datetime
+
+_NS_PER_SEC = 1000000000
+
+# wall clock and monotonic clock read together; every timestamp is the
+# wall time of the anchor plus the monotonic time elapsed since it
+# (time_ns() and monotonic_ns() need python 3.7)
+_anchor = (time.time_ns(), time.monotonic_ns())
+
+
+def reanchor():
+    """take a fresh wall clock reading, e.g. when a port is opened
+
+    Timestamps taken before and after are each steady, but the wall clock
+    may have been stepped in between.
+    """
+    global _anchor
+    _anchor = (time.time_ns(), time.monotonic_ns())
+
+
+def from_monotonic(mono_ns):
+    """wall clock time(ns since the epoch) of a time.monotonic_ns() reading"""
+    wall, mono = _anchor
+    return wall + mono_ns - mono
+
+
+def now_ns():
+    """the current time(ns since the epoch), steady between anchors"""
+    return from_monotonic(time.monotonic_ns())
+
+
+def to_datetime(t_ns):
+    """local datetime of t(ns since the epoch), to the microsecond"""
+    sec, ns = divmod(t_ns, _NS_PER_SEC)
+    return datetime.datetime.fromtimestamp(sec).replace(microsecond = ns // 1000)
+
+
+def to_seconds(t_ns):
+    return t_ns / _NS_PER_SEC
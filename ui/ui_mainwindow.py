@@ -227,11 +227,31 @@ class Ui_MainWindow(object):
         self.chkXonXoff.setText("Xon/Xoff")
         self.chkXonXoff.setObjectName("chkXonXoff")
         self.horizontalLayout_4.addWidget(self.chkXonXoff)
+        self.label_6 = QtWidgets.QLabel(self.frame_PortCfg)
+        self.label_6.setMinimumSize(QtCore.QSize(0, 20))
+        self.label_6.setMaximumSize(QtCore.QSize(16777215, 20))
+        self.label_6.setToolTip("Inter-byte gap that ends a received chunk")
+        self.label_6.setStatusTip("Inter-byte gap that ends a received chunk")
+        self.label_6.setText("Gap")
+        self.label_6.setAlignment(QtCore.Qt.AlignCenter)
+        self.label_6.setObjectName("label_6")
+        self.horizontalLayout_4.addWidget(self.label_6)
+        self.spnGap = QtWidgets.QSpinBox(self.frame_PortCfg)
+        self.spnGap.setMinimumSize(QtCore.QSize(0, 23))
+        self.spnGap.setMaximumSize(QtCore.QSize(16777215, 23))
+        self.spnGap.setToolTip("Inter-byte gap that ends a received chunk")
+        self.spnGap.setStatusTip("Inter-byte gap that ends a received chunk")
+        self.spnGap.setSuffix("ms")
+        self.spnGap.setMinimum(0)
+        self.spnGap.setMaximum(1000)
+        self.spnGap.setProperty("value", 2)
+        self.spnGap.setObjectName("spnGap")
+        self.horizontalLayout_4.addWidget(self.spnGap)
         spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.horizontalLayout_4.addItem(spacerItem)
         self.horizontalLayout_3.addLayout(self.horizontalLayout_4)
         self.verticalLayout_2.addWidget(self.frame_PortCfg)
-        self.txtEdtOutput = QtWidgets.QTextEdit(self.centerFrame)
+        self.txtEdtOutput = OutputView(self.centerFrame)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(3)
@@ -452,4 +472,5 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         self.btnPeriodicSend.setText(_translate("MainWindow", " Periodic Send "))
+from outputview import OutputView
 
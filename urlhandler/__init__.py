@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+"""pyserial URL handlers for network consoles
+
+portconfig puts this package ahead of pyserial's own handlers:
+
+    socket://host:port[?nodelay=0&keepalive=1]   raw TCP, also tcp://
+    udp://host:port[?local=port]                 UDP to a device
+    udp://:port                                  UDP, answering the last sender
+
+rfc2217://, loop://, spy:// and the rest still come from pyserial.
+"""
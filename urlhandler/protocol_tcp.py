@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import socket
+import struct
+import urllib.parse
+from serial.serialutil import SerialException, PortNotOpenError
+from serial.urlhandler import protocol_socket
+
+try:
+    import fcntl
+    import termios
+except ImportError:
+    fcntl = None
+
+SCHEMES = ('socket', 'tcp')
+
+
+def parse_flag(values, name):
+    if values[-1] in ('1', 'on', 'yes', 'true', ''):
+        return True
+    if values[-1] in ('0', 'off', 'no', 'false'):
+        return False
+    raise ValueError('%s takes 0 or 1, not %r' % (name, values[-1]))
+
+
+class Serial(protocol_socket.Serial):
+    """raw TCP like pyserial's socket://, tuned for interactive consoles
+
+    TCP_NODELAY is set unless ?nodelay=0 asks for Nagle batching of small
+    writes; ?keepalive=1 turns on TCP keepalives. in_waiting counts the
+    bytes the socket holds, so a reader takes them in one read instead of
+    one byte per wakeup.
+    """
+
+    def open(self):
+        self._nodelay = True
+        self._keepalive = False
+        super(Serial, self).open()
+        try:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self._nodelay))
+            if self._keepalive:
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except OSError as e:
+            self.close()
+            raise SerialException("Could not set up {}: {}".format(self.portstr, e))
+
+    def close(self):
+        # as pyserial's, without its 0.3 s sleep
+        if self.is_open:
+            if self._socket:
+                try:
+                    self._socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                self._socket.close()
+                self._socket = None
+            self.is_open = False
+
+    def from_url(self, url):
+        """(host, port) of a socket:// or tcp:// URL"""
+        parts = urllib.parse.urlsplit(url)
+        form = '"%s://<host>:<port>[?nodelay=0|1&keepalive=0|1]"' % (parts.scheme or 'tcp')
+        if parts.scheme not in SCHEMES:
+            raise SerialException('expected a string in the form %s: not starting with '
+                                  'socket:// or tcp:// (%r)' % (form, parts.scheme))
+        try:
+            for option, values in urllib.parse.parse_qs(parts.query, True).items():
+                if option == 'nodelay':
+                    self._nodelay = parse_flag(values, option)
+                elif option == 'keepalive':
+                    self._keepalive = parse_flag(values, option)
+                elif option == 'logging':
+                    protocol_socket.Serial.from_url(self, 'socket://%s?logging=%s' % (
+                        parts.netloc, values[0]))
+                else:
+                    raise ValueError('unknown option: %r' % option)
+            if parts.port is None or not 0 <= parts.port < 65536:
+                raise ValueError('port not in range 0...65535')
+        except ValueError as e:
+            raise SerialException('expected a string in the form %s: %s' % (form, e))
+        return (parts.hostname, parts.port)
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        if fcntl is not None:
+            try:
+                return struct.unpack('i', fcntl.ioctl(self._socket, termios.FIONREAD,
+                                                      struct.pack('i', 0)))[0]
+            except OSError:
+                pass
+        return super(Serial, self).in_waiting
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+#
+#############################################################################
+##
+## Copyright (c) 2013-2020, gamesun
+## All right reserved.
+##
+## This file is part of MyTerm.
+##
+## MyTerm is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## MyTerm is distributed in the hope that it will be useful, but
+## WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with MyTerm.  If not, see <http://www.gnu.org/licenses/>.
+##
+#############################################################################
+
+
+
+
+import select
+import socket
+import urllib.parse
+from serial.serialutil import SerialBase, SerialException, PortNotOpenError, Timeout, to_bytes
+
+MAX_DATAGRAM             = 65535
+
+
+class Serial(SerialBase):
+    """a UDP endpoint as a serial port
+
+    udp://host:port sends to host:port, from ?local=port if given, and
+    reads what comes back. udp://:port listens on port and answers
+    whoever sent last. Port settings are ignored.
+    """
+
+    BAUDRATES = (50, 75, 110, 134, 150, 200, 300, 600, 1200, 1800, 2400, 4800,
+                 9600, 19200, 38400, 57600, 115200)
+
+    def open(self):
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        self._peer = None
+        self._rx = bytearray()
+        remote, local = self.from_url(self.portstr)
+        self._connected = remote is not None
+        try:
+            family, kind, proto, name, address = socket.getaddrinfo(
+                remote[0] if remote else None, remote[1] if remote else local,
+                0, socket.SOCK_DGRAM, 0, socket.AI_PASSIVE)[0]
+            self._socket = socket.socket(family, socket.SOCK_DGRAM)
+            if local:
+                self._socket.bind(('::' if family == socket.AF_INET6 else '0.0.0.0', local))
+            if remote:
+                self._socket.connect(address)
+                self._peer = address
+            self._socket.setblocking(False)
+        except OSError as e:
+            self._socket = None
+            raise SerialException("Could not open port {}: {}".format(self.portstr, e))
+        self.is_open = True
+
+    def _reconfigure_port(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            if self._socket:
+                self._socket.close()
+                self._socket = None
+            self.is_open = False
+
+    def from_url(self, url):
+        """((host, port) or None, local port or None) of a udp:// URL"""
+        parts = urllib.parse.urlsplit(url)
+        form = '"udp://<host>:<port>[?local=<port>]" or "udp://:<port>"'
+        if parts.scheme != 'udp':
+            raise SerialException('expected a string in the form %s: not starting with '
+                                  'udp:// (%r)' % (form, parts.scheme))
+        try:
+            local = None
+            for option, values in urllib.parse.parse_qs(parts.query, True).items():
+                if option == 'local':
+                    local = int(values[-1])
+                else:
+                    raise ValueError('unknown option: %r' % option)
+            if parts.port is None or not 0 < parts.port < 65536:
+                raise ValueError('port not in range 1...65535')
+        except ValueError as e:
+            raise SerialException('expected a string in the form %s: %s' % (form, e))
+        if not parts.hostname:
+            return None, parts.port
+        return (parts.hostname, parts.port), local
+
+    def _receive(self):
+        """move waiting datagrams into the read buffer"""
+        while True:
+            try:
+                data, peer = self._socket.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except (ConnectionRefusedError, ConnectionResetError):
+                # ICMP port unreachable, the device isn't listening yet
+                # (Windows reports it as WSAECONNRESET)
+                continue
+            except OSError as e:
+                raise SerialException('read failed: {}'.format(e))
+            self._rx += data
+            if not self._connected:
+                self._peer = peer
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        self._receive()
+        return len(self._rx)
+
+    def read(self, size = 1):
+        if not self.is_open:
+            raise PortNotOpenError()
+        timeout = Timeout(self._timeout)
+        self._receive()
+        while len(self._rx) < size and not timeout.expired():
+            if not select.select([self._socket], [], [], timeout.time_left())[0]:
+                break
+            self._receive()
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        data = to_bytes(data)
+        if self._peer is None:
+            raise SerialException('nothing to answer yet on {}'.format(self.portstr))
+        try:
+            if self._connected:
+                self._socket.send(data)
+            else:
+                self._socket.sendto(data, self._peer)
+        except (ConnectionRefusedError, ConnectionResetError):
+            pass
+        except OSError as e:
+            raise SerialException('write failed: {}'.format(e))
+        return len(data)
+
+    def reset_input_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        self._receive()
+        self._rx = bytearray()
+
+    def reset_output_buffer(self):
+        pass
+
+    def send_break(self, duration = 0.25):
+        pass
+
+    def _update_break_state(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    def _update_dtr_state(self):
+        pass
+
+    @property
+    def cts(self):
+        return True
+
+    @property
+    def dsr(self):
+        return True
+
+    @property
+    def ri(self):
+        return False
+
+    @property
+    def cd(self):
+        return True
+
+    def fileno(self):
+        return self._socket.fileno()